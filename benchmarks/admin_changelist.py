@@ -0,0 +1,68 @@
+"""
+Списки броней и номеров в админке на больших таблицах
+
+Создаёт --rooms номеров по --per-room броней и измеряет время и число
+запросов страниц /admin/bookings/booking/ и /admin/rooms/room/ (первая,
+последняя, с сортировкой и поиском) под временным суперпользователем.
+
+    python -m benchmarks.admin_changelist --rooms 10000 --per-room 50
+"""
+
+import argparse
+
+from benchmarks.common import Timer, cleanup, report, seed_bookings, seed_rooms, setup_django
+
+PAGES = {
+    "bookings": "/admin/bookings/booking/",
+    "bookings_last_page": "/admin/bookings/booking/?p=100",
+    "bookings_by_duration": "/admin/bookings/booking/?o=-6",
+    "bookings_of_room": "/admin/bookings/booking/?room_id={room_id}",
+    "rooms": "/admin/rooms/room/",
+    "rooms_search": "/admin/rooms/room/?q=benchmark",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--per-room", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    user = User.objects.create_superuser("benchmark-admin", "benchmark@example.com", None)
+    try:
+        with Timer() as seeding:
+            room_ids = seed_rooms(args.rooms)
+            bookings = seed_bookings(room_ids, args.per_room)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE bookings; ANALYZE rooms")
+
+        client = Client()
+        client.force_login(user)
+        results = {**vars(args), "bookings": bookings, "seed_seconds": round(seeding.elapsed, 2)}
+        for name, url in PAGES.items():
+            url = url.format(room_id=room_ids[len(room_ids) // 2])
+            timings = []
+            for _ in range(args.repeat):
+                with CaptureQueriesContext(connection) as queries, Timer() as timer:
+                    response = client.get(url)
+                assert response.status_code == 200, response.status_code
+                timings.append(timer.elapsed)
+            results[f"{name}_seconds"] = round(min(timings), 3)
+            results[f"{name}_queries"] = len(queries)
+    finally:
+        user.delete()
+        cleanup()
+
+    report("admin_changelist", results)
+
+
+if __name__ == "__main__":
+    main()
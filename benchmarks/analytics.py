@@ -0,0 +1,80 @@
+"""
+Отчёты /analytics/* по живым броням и по сводке RoomMonthStats
+
+Создаёт --rooms номеров по --per-room броней подряд (несколько лет
+истории) и измеряет GET /analytics/revenue и /analytics/occupancy за
+--months месяцев: агрегирующим запросом по броням и из сводки после
+полного пересчёта (manage.py refresh_analytics).
+
+    python -m benchmarks.analytics --rooms 2000 --per-room 200
+"""
+
+import argparse
+from datetime import date
+from unittest.mock import patch
+
+from benchmarks.common import Timer, cleanup, report, seed_bookings, seed_rooms, setup_django
+
+
+def measure(view, request, repeat):
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            response = view(request)
+        assert response.status_code == 200, response.content
+        timings.append(timer.elapsed)
+    return round(min(timings) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--per-room", type=int, default=200)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import RequestFactory
+    from bookings import analytics
+    from bookings.models import RoomMonthStats
+    from bookings.views import occupancy_analytics, revenue_analytics
+
+    start = date(date.today().year - 3, 1, 1)
+    try:
+        with Timer() as seeding:
+            room_ids = seed_rooms(args.rooms)
+            bookings = seed_bookings(room_ids, args.per_room, start=start)
+        results = {**vars(args), "bookings": bookings, "seed_seconds": round(seeding.elapsed, 2)}
+
+        last = start
+        for _ in range(args.months - 1):
+            last = analytics.next_month(last)
+        factory = RequestFactory()
+        requests = {
+            "revenue": (revenue_analytics, factory.get("/analytics/revenue", {
+                "from": start.strftime("%Y-%m"), "to": last.strftime("%Y-%m"),
+            })),
+            "occupancy": (occupancy_analytics, factory.get("/analytics/occupancy", {
+                "from": start.strftime("%Y-%m"), "to": last.strftime("%Y-%m"),
+            })),
+        }
+        for name, (view, request) in requests.items():
+            results[f"{name}_live_ms"] = measure(view, request, args.repeat)
+
+        with Timer() as refreshing:
+            analytics.refresh_all()
+        results["refresh_seconds"] = round(refreshing.elapsed, 2)
+        results["summary_rows"] = RoomMonthStats.objects.count()
+        with patch.object(analytics, "analytics_summary", analytics.AnalyticsSummary()):
+            for name, (view, request) in requests.items():
+                results[f"{name}_summary_ms"] = measure(view, request, args.repeat)
+    finally:
+        # сводка удаляется каскадом вместе с номерами
+        cleanup()
+
+    report("analytics", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Стоимость запроса к API: полный стек middleware против API_MIDDLEWARE
+и JsonResponse против FastJsonResponse
+
+Запросы идут через WSGI-обработчики Django напрямую, без сети. Для
+каждого пути печатается медиана времени запроса на полном стеке
+(MIDDLEWARE) и на урезанном (API_MIDDLEWARE). Отдельно сравнивается
+сериализация --rows номеров через JsonResponse и FastJsonResponse.
+
+    python -m benchmarks.api_stack --rooms 1000 --requests 2000
+"""
+
+import argparse
+import statistics
+
+from benchmarks.common import Timer, cleanup, report, seed_rooms, setup_django
+
+
+def make_start_response(statuses):
+    def start_response(status, headers):
+        statuses.append(status)
+    return start_response
+
+
+def run(handler, environ, count):
+    statuses = []
+    start_response = make_start_response(statuses)
+    with Timer() as timer:
+        for _ in range(count):
+            response = handler(dict(environ), start_response)
+            b"".join(response)
+            response.close()
+    assert all(status.startswith("200") for status in statuses), statuses[-1]
+    return timer.elapsed / count * 1e6
+
+
+def serialize(response_class, data, count, **kwargs):
+    with Timer() as timer:
+        for _ in range(count):
+            response_class(data, **kwargs)
+    return timer.elapsed / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.http import JsonResponse
+    from django.test import RequestFactory
+    from hotel_booking.handlers import ApiWSGIHandler
+    from hotel_booking.responses import FastJsonResponse
+    from rooms.models import Room
+    from rooms.views import room_to_dict
+
+    handlers = {"full": WSGIHandler(), "api": ApiWSGIHandler()}
+    factory = RequestFactory()
+    paths = [
+        # из кэша: почти вся стоимость - middleware
+        "/rooms/list?limit=50",
+        "/rooms/list?limit=200&sort_by=price_per_night&order=desc",
+    ]
+
+    room_ids = seed_rooms(args.rooms)
+    try:
+        for path in paths:
+            environ = factory.get(path).environ
+            samples = {name: [] for name in handlers}
+            for _ in range(args.rounds):
+                for name, handler in handlers.items():
+                    samples[name].append(run(handler, environ, args.requests))
+            full = statistics.median(samples["full"])
+            api = statistics.median(samples["api"])
+            report("api_stack", {
+                "path": path,
+                "full_stack_us": round(full, 1),
+                "api_stack_us": round(api, 1),
+                "saved_us": round(full - api, 1),
+                "saved_pct": round((full - api) / full * 100, 2),
+            })
+
+        rooms = list(Room.objects.filter(id__in=room_ids[:args.rows]))
+        native = [room_to_dict(room) for room in rooms]
+        # прежний формат для JsonResponse: Decimal и datetime строками
+        strings = [
+            {**row, "price_per_night": str(row["price_per_night"]),
+             "created_at": row["created_at"].isoformat()}
+            for row in native
+        ]
+        count = max(1, args.requests // 10)
+        stdlib = statistics.median(
+            serialize(JsonResponse, strings, count, safe=False) for _ in range(args.rounds)
+        )
+        fast = statistics.median(
+            serialize(FastJsonResponse, native, count) for _ in range(args.rounds)
+        )
+        report("api_stack_serialization", {
+            "rows": len(native),
+            "json_response_us": round(stdlib, 1),
+            "fast_json_response_us": round(fast, 1),
+            "speedup": round(stdlib / fast, 2),
+        })
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
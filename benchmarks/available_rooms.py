@@ -0,0 +1,74 @@
+"""
+Задержка GET /rooms/available в зависимости от числа номеров
+
+Номера досеваются до каждого размера из --sizes, половина из них получает
+бронь, пересекающую искомый период. Для каждого размера печатается
+медиана и p95 времени ответа.
+
+    python -m benchmarks.available_rooms --sizes 100,1000,10000,100000
+"""
+
+import argparse
+import random
+import statistics
+from datetime import date, timedelta
+
+from benchmarks.common import Timer, cleanup, percentile, report, seed_rooms, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import RequestFactory
+    from bookings.models import Booking
+    from rooms.views import available_rooms
+
+    rnd = random.Random(0)
+    date_start = date.today() + timedelta(days=30)
+    date_end = date_start + timedelta(days=3)
+    request = RequestFactory().get("/rooms/available", {
+        "date_start": date_start.isoformat(),
+        "date_end": date_end.isoformat(),
+        "sort_by": "price_per_night",
+        "price_max": "15000",
+    })
+
+    seeded = 0
+    try:
+        for size in map(int, args.sizes.split(",")):
+            room_ids = seed_rooms(size - seeded, seed=seeded)
+            seeded = size
+            Booking.objects.bulk_create(
+                [
+                    Booking(
+                        room_id=room_id,
+                        date_start=date_start + timedelta(days=rnd.randrange(-2, 3)),
+                        date_end=date_end + timedelta(days=rnd.randrange(0, 3)),
+                    )
+                    for room_id in room_ids[::2]
+                ],
+                batch_size=5000,
+            )
+
+            samples = []
+            for _ in range(args.repeat):
+                with Timer() as timer:
+                    response = available_rooms(request)
+                assert response.status_code == 200, response.content
+                samples.append(timer.elapsed * 1000)
+
+            report("available_rooms", {
+                "rooms": size,
+                "median_ms": round(statistics.median(samples), 2),
+                "p95_ms": round(percentile(samples, 0.95), 2),
+            })
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Микробенчмарки горячих путей на pytest-benchmark
+
+    pytest benchmarks/bench_views.py --ds=hotel_booking.settings --benchmark-json=out.json
+
+Обычно запускаются через python -m benchmarks.suite, который сравнивает
+результат с сохранённой базовой линией.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from bookings import services
+from bookings.models import Booking
+from bookings.views import list_bookings
+from rooms.cache import room_list_cache
+from rooms.models import Room
+from rooms.views import available_rooms, list_rooms
+
+pytestmark = pytest.mark.django_db
+
+
+def ok(response):
+    assert response.status_code == 200, response.content
+    return response
+
+
+def test_check_availability(benchmark, seeded):
+    room = Room.objects.get(id=seeded[0])
+    start = date.today() + timedelta(days=10)
+    booking = Booking(room=room, date_start=start, date_end=start + timedelta(days=3))
+    benchmark(booking.check_availability)
+
+
+def test_list_rooms_page(benchmark, seeded, rf):
+    request = rf.get("/rooms/list", {"limit": 100, "sort_by": "price_per_night"})
+    # без кэша: измеряется запрос к базе и сериализация
+    benchmark.pedantic(
+        lambda: ok(list_rooms(request)), setup=room_list_cache.clear, rounds=200
+    )
+
+
+def test_list_rooms_cached(benchmark, seeded, rf):
+    request = rf.get("/rooms/list", {"limit": 100})
+    ok(list_rooms(request))
+    benchmark(lambda: ok(list_rooms(request)))
+
+
+def test_list_rooms_all(benchmark, seeded, rf):
+    request = rf.get("/rooms/list")
+    benchmark.pedantic(
+        lambda: ok(list_rooms(request)), setup=room_list_cache.clear, rounds=20
+    )
+
+
+def test_list_bookings(benchmark, seeded, rf):
+    request = rf.get("/bookings/list", {"room_id": seeded[0]})
+    benchmark(lambda: ok(list_bookings(request)))
+
+
+def test_available_rooms(benchmark, seeded, rf):
+    start = date.today() + timedelta(days=15)
+    request = rf.get("/rooms/available", {
+        "date_start": start.isoformat(),
+        "date_end": (start + timedelta(days=3)).isoformat(),
+        "limit": 100,
+    })
+    benchmark(lambda: ok(available_rooms(request)))
+
+
+def test_create_booking(benchmark, seeded):
+    # каждый раунд - новый период после всех сидированных броней
+    periods = iter(
+        date.today() + timedelta(days=3650 + 2 * day) for day in range(100000)
+    )
+
+    def create():
+        start = next(periods)
+        services.create_booking(seeded[1], start, start + timedelta(days=1))
+
+    benchmark.pedantic(create, rounds=200)
@@ -0,0 +1,104 @@
+"""
+Стресс-тест конкурентного создания бронирований
+
+Несколько потоков одновременно бронируют случайные периоды в небольшом
+наборе номеров. Скрипт измеряет брони в секунду и проверяет, что в базе
+нет ни одного пересечения. Имеет смысл на PostgreSQL: SQLite допускает
+только одного писателя и большая часть попыток упрётся в блокировку.
+
+    python -m benchmarks.booking_concurrency --workers 16 --rooms 10 --attempts 500
+"""
+
+import argparse
+import random
+import sys
+import threading
+from datetime import date, timedelta
+
+from benchmarks.common import Timer, cleanup, report, seed_rooms, setup_django
+
+
+def worker(room_ids, attempts, horizon, seed, counters, lock):
+    from django.db import connection
+    from bookings import services
+
+    rnd = random.Random(seed)
+    local = {"created": 0, "conflicts": 0, "errors": 0}
+    today = date.today()
+    try:
+        for _ in range(attempts):
+            start = today + timedelta(days=rnd.randrange(1, horizon))
+            end = start + timedelta(days=rnd.randrange(1, 7))
+            try:
+                services.create_booking(rnd.choice(room_ids), start, end)
+                local["created"] += 1
+            except services.BookingConflict:
+                local["conflicts"] += 1
+            except Exception:
+                local["errors"] += 1
+    finally:
+        connection.close()
+    with lock:
+        for key, value in local.items():
+            counters[key] += value
+
+
+def count_double_bookings(room_ids):
+    from bookings.models import Booking
+
+    overlaps = 0
+    for room_id in room_ids:
+        previous_end = None
+        for date_start, date_end in (
+            Booking.objects.filter(room_id=room_id)
+            .order_by('date_start')
+            .values_list('date_start', 'date_end')
+        ):
+            if previous_end is not None and date_start < previous_end:
+                overlaps += 1
+            previous_end = max(previous_end or date_end, date_end)
+    return overlaps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--attempts", type=int, default=200, help="попыток на поток")
+    parser.add_argument("--horizon", type=int, default=365, help="дней вперёд")
+    args = parser.parse_args()
+
+    setup_django()
+    room_ids = seed_rooms(args.rooms)
+    counters = {"created": 0, "conflicts": 0, "errors": 0}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(room_ids, args.attempts, args.horizon, seed, counters, lock),
+        )
+        for seed in range(args.workers)
+    ]
+    try:
+        with Timer() as timer:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        double_bookings = count_double_bookings(room_ids)
+    finally:
+        cleanup()
+
+    report("booking_concurrency", {
+        **vars(args),
+        **counters,
+        "seconds": round(timer.elapsed, 3),
+        "bookings_per_sec": round(counters["created"] / timer.elapsed, 1),
+        "attempts_per_sec": round(args.workers * args.attempts / timer.elapsed, 1),
+        "double_bookings": double_bookings,
+    })
+    return 1 if double_bookings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Пакетное создание броней против цикла по POST /bookings/create
+
+Одни и те же N броней создаются сначала по одной через create_booking,
+затем одним запросом к bulk_create_bookings. Печатается время и число
+SQL-запросов для каждого способа.
+
+    python -m benchmarks.bulk_bookings --items 500 --rooms 50
+"""
+
+import argparse
+import json
+from datetime import date, timedelta
+
+from benchmarks.common import Timer, cleanup, report, seed_rooms, setup_django
+
+
+def make_items(room_ids, count, offset):
+    start = date.today() + timedelta(days=1 + offset)
+    items = []
+    for i in range(count):
+        # у каждого номера брони идут подряд без пересечений
+        day = start + timedelta(days=(i // len(room_ids)) * 2)
+        items.append({
+            "room_id": room_ids[i % len(room_ids)],
+            "date_start": day.isoformat(),
+            "date_end": (day + timedelta(days=2)).isoformat(),
+        })
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--rooms", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from bookings.views import bulk_create_bookings, create_booking
+
+    factory = RequestFactory()
+    room_ids = seed_rooms(args.rooms)
+    # второй набор сдвинут за пределы первого, чтобы не было конфликтов
+    horizon = (args.items // args.rooms + 1) * 2
+    loop_items = make_items(room_ids, args.items, 0)
+    bulk_items = make_items(room_ids, args.items, horizon)
+
+    try:
+        with CaptureQueriesContext(connection) as loop_queries, Timer() as loop:
+            for item in loop_items:
+                response = create_booking(factory.post("/bookings/create", item))
+                assert response.status_code == 201, response.content
+
+        request = factory.post(
+            "/bookings/bulk_create",
+            json.dumps(bulk_items),
+            content_type="application/json",
+        )
+        with CaptureQueriesContext(connection) as bulk_queries, Timer() as bulk:
+            response = bulk_create_bookings(request)
+        assert response.status_code == 201, response.content
+    finally:
+        cleanup()
+
+    report("bulk_bookings", {
+        **vars(args),
+        "loop_seconds": round(loop.elapsed, 3),
+        "loop_queries": len(loop_queries),
+        "bulk_seconds": round(bulk.elapsed, 3),
+        "bulk_queries": len(bulk_queries),
+        "speedup": round(loop.elapsed / bulk.elapsed, 1),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Общие помощники для бенчмарков
+
+Бенчмарки запускаются из корня проекта против базы из настроек Django:
+    python -m benchmarks.booking_concurrency --workers 16
+"""
+
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hotel_booking.settings")
+    import django
+    django.setup()
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+
+
+def report(name, results):
+    """Печатает результаты одной строкой JSON"""
+    print(json.dumps({"benchmark": name, **results}, ensure_ascii=False, default=str))
+
+
+BENCH_DESCRIPTION = "benchmark"
+
+
+def seed_rooms(count, batch_size=5000, seed=0):
+    """Создаёт count номеров пачками через bulk_create, возвращает их id"""
+    from rooms.models import Room
+
+    rnd = random.Random(seed)
+    ids = []
+    for offset in range(0, count, batch_size):
+        batch = [
+            Room(description=BENCH_DESCRIPTION, price=rnd.randrange(1000, 20000))
+            for _ in range(min(batch_size, count - offset))
+        ]
+        ids.extend(room.id for room in Room.objects.bulk_create(batch))
+    return ids
+
+
+def seed_bookings(room_ids, per_room, start=None, batch_size=5000, seed=0):
+    """
+    Создаёт per_room непересекающихся броней на каждый номер подряд от
+    start (по умолчанию завтра) с паузами 0-4 дня, возвращает их число
+    """
+    from bookings.models import Booking
+
+    rnd = random.Random(seed)
+    start = start or date.today() + timedelta(days=1)
+    batch = []
+    created = 0
+    for room_id in room_ids:
+        day = start
+        for _ in range(per_room):
+            day += timedelta(days=rnd.randrange(0, 5))
+            end = day + timedelta(days=rnd.randrange(1, 8))
+            batch.append(Booking(room_id=room_id, date_start=day, date_end=end))
+            day = end
+            if len(batch) >= batch_size:
+                Booking.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+    if batch:
+        Booking.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def cleanup():
+    """Удаляет всё, что насоздавали бенчмарки"""
+    from bookings.models import Booking
+    from rooms.models import Room
+
+    Booking.objects.filter(room__description=BENCH_DESCRIPTION).delete()
+    Room.objects.filter(description=BENCH_DESCRIPTION).delete()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
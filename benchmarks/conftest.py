@@ -0,0 +1,26 @@
+"""
+Общие фикстуры микробенчмарков pytest-benchmark (benchmarks/bench_*.py)
+
+Размер данных задаётся переменными BENCH_ROOMS и BENCH_BOOKINGS_PER_ROOM.
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hotel_booking.settings")
+
+BENCH_ROOMS = int(os.environ.get("BENCH_ROOMS", 1000))
+BENCH_BOOKINGS_PER_ROOM = int(os.environ.get("BENCH_BOOKINGS_PER_ROOM", 10))
+
+
+@pytest.fixture(scope="session")
+def seeded(django_db_setup, django_db_blocker):
+    """id номеров, созданных один раз на всю сессию вне транзакций тестов"""
+    from benchmarks.common import cleanup, seed_bookings, seed_rooms
+
+    with django_db_blocker.unblock():
+        room_ids = seed_rooms(BENCH_ROOMS)
+        seed_bookings(room_ids, BENCH_BOOKINGS_PER_ROOM)
+        yield room_ids
+        cleanup()
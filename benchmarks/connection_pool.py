@@ -0,0 +1,134 @@
+"""
+Запросы в секунду и открытия соединений с PostgreSQL в зависимости от
+режима соединений
+
+Для каждого режима из --modes запускается отдельный процесс с нужными
+переменными окружения:
+- close: DB_CONN_MAX_AGE=0, новое соединение на каждый запрос;
+- persistent: DB_CONN_MAX_AGE=60, соединение на поток;
+- pool: DB_POOL=true, пул psycopg на процесс.
+
+Процесс в --threads потоках (как gunicorn --threads) в течение
+--duration секунд гоняет GET /rooms/available через WSGI-обработчик
+Django. Печатаются запросы в секунду, p99 задержки и число новых сессий
+PostgreSQL (pg_stat_database.sessions, нужен PostgreSQL 14+).
+
+    DB_HOST=localhost DB_PORT=5433 python -m benchmarks.connection_pool --threads 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import cleanup, percentile, report, seed_rooms, setup_django
+
+MODES = {
+    'close': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'False'},
+    'persistent': {'DB_CONN_MAX_AGE': '60', 'DB_POOL': 'False'},
+    'pool': {'DB_CONN_MAX_AGE': '0', 'DB_POOL': 'True'},
+}
+
+
+def sessions_opened():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT sessions FROM pg_stat_database WHERE datname = current_database()"
+        )
+        return cursor.fetchone()[0]
+
+
+def load(threads, duration):
+    """Нагрузка в текущем процессе, возвращает (запросов, задержки)"""
+    from django.db.backends.signals import connection_created
+    from django.test import RequestFactory
+    from hotel_booking.handlers import ApiWSGIHandler
+
+    handler = ApiWSGIHandler()
+    date_start = date.today() + timedelta(days=30)
+    environ = RequestFactory().get("/rooms/available", {
+        "date_start": date_start.isoformat(),
+        "date_end": (date_start + timedelta(days=3)).isoformat(),
+        "limit": 20,
+    }).environ
+    connects = []
+    connection_created.connect(lambda **kwargs: connects.append(1), weak=False)
+
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        def start_response(status, headers):
+            if not status.startswith("200"):
+                errors.append(status)
+
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = handler(dict(environ), start_response)
+            b"".join(response)
+            response.close()
+            latencies.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, errors, len(connects)
+
+
+def child(args):
+    setup_django()
+    latencies, errors, connects = load(args.threads, args.duration)
+    print(json.dumps({
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / args.duration, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        "django_connects": connects,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    setup_django()
+    seed_rooms(args.rooms)
+    try:
+        for mode in args.modes.split(","):
+            before = sessions_opened()
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.connection_pool", "--child",
+                 "--threads", str(args.threads), "--duration", str(args.duration)],
+                env={**os.environ, **MODES[mode]},
+                check=True, capture_output=True, text=True,
+            ).stdout
+            report("connection_pool", {
+                "mode": mode,
+                "threads": args.threads,
+                **json.loads(output.splitlines()[-1]),
+                "pg_sessions_opened": sessions_opened() - before,
+            })
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Скорость и память выгрузки бронирований
+
+Создаёт --rooms номеров по --bookings-per-room броней и прогоняет
+export_stream во всех форматах с gzip и без. Печатаются строки в
+секунду, размер выгрузки и пик памяти Python (tracemalloc, отдельным
+прогоном: он сильно замедляет выгрузку), который не должен расти с
+числом строк.
+
+    python -m benchmarks.export_bookings --rooms 10000 --bookings-per-room 20
+"""
+
+import argparse
+import tracemalloc
+
+from benchmarks.common import Timer, cleanup, report, seed_bookings, seed_rooms, setup_django
+
+
+def run(queryset, output_format, compress):
+    from bookings.export import export_stream
+
+    size = 0
+    for chunk in export_stream(queryset, output_format, compress):
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--bookings-per-room", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from bookings.export import FORMATS, export_queryset
+
+    room_ids = seed_rooms(args.rooms)
+    rows = seed_bookings(room_ids, args.bookings_per_room)
+    try:
+        for output_format in FORMATS:
+            for compress in (False, True):
+                with Timer() as timer:
+                    size = run(export_queryset(), output_format, compress)
+                tracemalloc.start()
+                run(export_queryset(), output_format, compress)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                report("export_bookings", {
+                    "format": output_format,
+                    "gzip": compress,
+                    "rows": rows,
+                    "seconds": round(timer.elapsed, 2),
+                    "rows_per_second": round(rows / timer.elapsed),
+                    "mb": round(size / 2**20, 1),
+                    "peak_memory_mb": round(peak / 2**20, 1),
+                })
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
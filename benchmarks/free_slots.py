@@ -0,0 +1,58 @@
+"""
+Поиск свободных окон на больших объёмах броней
+
+Создаёт --rooms номеров по --per-room броней подряд (паузы 0-4 дня) и
+измеряет GET /rooms/free_slots для разного числа ночей.
+
+    python -m benchmarks.free_slots --rooms 10000 --per-room 50
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from benchmarks.common import Timer, cleanup, report, seed_bookings, seed_rooms, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--per-room", type=int, default=50)
+    parser.add_argument("--nights", default="1,3,7")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import RequestFactory
+    from rooms.views import room_free_slots
+
+    try:
+        with Timer() as seeding:
+            room_ids = seed_rooms(args.rooms)
+            bookings = seed_bookings(room_ids, args.per_room)
+
+        results = {**vars(args), "bookings": bookings, "seed_seconds": round(seeding.elapsed, 2)}
+        factory = RequestFactory()
+        date_from = date.today()
+        for nights in args.nights.split(","):
+            request = factory.get("/rooms/free_slots", {
+                "nights": nights,
+                "from": date_from.isoformat(),
+                "to": (date_from + timedelta(days=366)).isoformat(),
+                "limit": args.limit,
+            })
+            timings = []
+            for _ in range(args.repeat):
+                with Timer() as timer:
+                    response = room_free_slots(request)
+                assert response.status_code == 200, response.content
+                timings.append(timer.elapsed)
+            results[f"nights_{nights}_seconds"] = round(min(timings), 3)
+    finally:
+        cleanup()
+
+    report("free_slots", results)
+
+
+if __name__ == "__main__":
+    main()
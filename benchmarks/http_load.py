@@ -0,0 +1,201 @@
+"""
+Нагрузочный генератор HTTP на asyncio
+
+Держит --concurrency одновременных клиентов, которые в течение --duration
+секунд запрашивают пути из --paths по кругу, и печатает запросы в
+секунду, p50/p99 задержки и число ошибок. Django не нужен, поэтому так
+можно сравнить любые развёртывания, например WSGI и ASGI:
+
+    gunicorn hotel_booking.wsgi:application -w 4 -b 127.0.0.1:8000
+    uvicorn hotel_booking.asgi:application --workers 4 --port 8001
+
+    python -m benchmarks.http_load --url http://127.0.0.1:8000 --paths /rooms/list?limit=50
+    python -m benchmarks.http_load --url http://127.0.0.1:8001 --paths /rooms/list?limit=50
+
+--scenario mixed вместо --paths ходит по всем эндпоинтам номеров и
+броней (включая создание брони) на номерах, которые уже есть в базе,
+например после python -m benchmarks.seed, и печатает ещё и строку на
+каждый эндпоинт.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+from urllib.request import urlopen
+
+from benchmarks.common import percentile, report
+
+
+class Request:
+    __slots__ = ("name", "method", "path", "body", "ok_statuses")
+
+    def __init__(self, name, method, path, body=b"", ok_statuses=(200,)):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.ok_statuses = ok_statuses
+
+    def encode(self, host):
+        head = f"{self.method} {self.path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n"
+        if self.method == "POST":
+            head += (
+                "Content-Type: application/x-www-form-urlencoded\r\n"
+                f"Content-Length: {len(self.body)}\r\n"
+            )
+        return (head + "\r\n").encode() + self.body
+
+
+def get(name, path, **params):
+    return Request(name, "GET", f"{path}?{urlencode(params)}" if params else path)
+
+
+def mixed_requests(url, seed=0):
+    """Бесконечная смесь запросов ко всем эндпоинтам"""
+    with urlopen(f"{url}/rooms/list?limit=1000") as response:
+        room_ids = [row["room_id"] for row in json.load(response)["results"]]
+    if not room_ids:
+        raise SystemExit("В базе нет номеров, сначала python -m benchmarks.seed")
+
+    rnd = random.Random(seed)
+    today = date.today()
+    # далеко в будущем, чтобы создание редко упиралось в занятые даты
+    booking_days = itertools.count(rnd.randrange(3650, 7300))
+    while True:
+        start = today + timedelta(days=rnd.randrange(1, 120))
+        end = start + timedelta(days=rnd.randrange(1, 8))
+        room_id = rnd.choice(room_ids)
+        yield get("rooms/list", "/rooms/list", limit=50,
+                  sort_by=rnd.choice(["price_per_night", "created_at"]))
+        yield get("rooms/available", "/rooms/available",
+                  date_start=start.isoformat(), date_end=end.isoformat(), limit=50)
+        yield get("bookings/list", "/bookings/list", room_id=room_id)
+        yield get("rooms/calendar", "/rooms/calendar",
+                  **{"from": start.isoformat(), "to": (start + timedelta(days=30)).isoformat()})
+        booking_start = today + timedelta(days=next(booking_days))
+        yield Request("bookings/create", "POST", "/bookings/create", urlencode({
+            "room_id": room_id,
+            "date_start": booking_start.isoformat(),
+            "date_end": (booking_start + timedelta(days=1)).isoformat(),
+        }).encode(), ok_statuses=(201, 400))
+
+
+async def read_response(reader):
+    """Читает ответ, возвращает (status, keep_alive)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("соединение закрыто")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def client(host, port, requests, deadline, latencies, errors):
+    connection = None
+    for request in requests:
+        if time.perf_counter() >= deadline:
+            break
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection(host, port)
+            reader, writer = connection
+            writer.write(request.encode(host))
+            status, keep_alive = await read_response(reader)
+            if status not in request.ok_statuses:
+                errors[request.name].append(status)
+            else:
+                latencies[request.name].append(time.perf_counter() - started)
+            if not keep_alive:
+                writer.close()
+                connection = None
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors[request.name].append("connection")
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def run(url, requests, concurrency, duration):
+    """requests - общий для всех клиентов итератор; возвращает (время, задержки, ошибки) по эндпоинтам"""
+    parts = urlsplit(url)
+    latencies, errors = defaultdict(list), defaultdict(list)
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        client(parts.hostname, parts.port or 80, requests, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    return time.perf_counter() - started, latencies, errors
+
+
+def summary(elapsed, latencies, errors):
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def load(url, scenario, paths, concurrency, duration):
+    """Прогон нагрузки, возвращает {"total": {...}, эндпоинт: {...}}"""
+    if scenario == "mixed":
+        requests = mixed_requests(url)
+    else:
+        requests = itertools.cycle([get(path.split("?")[0].strip("/"), path) for path in paths])
+    elapsed, latencies, errors = asyncio.run(run(url, requests, concurrency, duration))
+    results = {"total": summary(
+        elapsed,
+        list(itertools.chain.from_iterable(latencies.values())),
+        list(itertools.chain.from_iterable(errors.values())),
+    )}
+    for name in sorted(latencies.keys() | errors.keys()):
+        results[name] = summary(elapsed, latencies[name], errors[name])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--paths", default="/rooms/list?limit=50", help="через запятую")
+    parser.add_argument("--scenario", choices=["paths", "mixed"], default="paths")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    results = load(args.url, args.scenario, args.paths.split(","), args.concurrency, args.duration)
+    report("http_load", {**vars(args), **results.pop("total")})
+    if args.scenario == "mixed":
+        for name, endpoint in results.items():
+            report("http_load", {"endpoint": name, **endpoint})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Проверка занятости через индекс в памяти против запроса к базе
+
+У одного номера создаётся --bookings броней подряд, затем --checks
+случайных периодов проверяются через Room.objects.filter(...).exists()
+и через bookings.intervals.IntervalIndex.
+
+    python -m benchmarks.interval_index --bookings 10000 --checks 5000
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+
+from benchmarks.common import Timer, cleanup, report, seed_rooms, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookings", type=int, default=10000)
+    parser.add_argument("--checks", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from bookings.intervals import IntervalIndex
+    from bookings.models import Booking
+
+    rnd = random.Random(0)
+    start = date.today() + timedelta(days=1)
+    room_id = seed_rooms(1)[0]
+    Booking.objects.bulk_create(
+        [
+            Booking(
+                room_id=room_id,
+                date_start=start + timedelta(days=i * 3),
+                date_end=start + timedelta(days=i * 3 + 2),
+            )
+            for i in range(args.bookings)
+        ],
+        batch_size=5000,
+    )
+    periods = []
+    for _ in range(args.checks):
+        day = start + timedelta(days=rnd.randrange(args.bookings * 3))
+        periods.append((day, day + timedelta(days=rnd.randrange(1, 4))))
+
+    try:
+        with Timer() as orm:
+            orm_answers = [
+                not Booking.objects.filter(
+                    room_id=room_id, date_start__lt=date_end, date_end__gt=date_start
+                ).exists()
+                for date_start, date_end in periods
+            ]
+
+        index = IntervalIndex(ttl=3600)
+        with Timer() as load:
+            index.get(room_id)
+        with Timer() as memory:
+            index_answers = [
+                index.is_available(room_id, date_start, date_end)
+                for date_start, date_end in periods
+            ]
+    finally:
+        cleanup()
+
+    assert orm_answers == index_answers
+    report("interval_index", {
+        **vars(args),
+        "orm_us_per_check": round(orm.elapsed / args.checks * 1e6, 1),
+        "index_load_ms": round(load.elapsed * 1000, 1),
+        "index_us_per_check": round(memory.elapsed / args.checks * 1e6, 2),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Фоновые задачи: время ответа с пересчётом сводки в запросе и в очереди
+
+Включает сводку аналитики (ANALYTICS_SUMMARY) на номерах с --per-room
+бронями и измеряет POST /bookings/create без очереди (пересчёт сводки
+номера выполняется после коммита в запросе) и с очередью (JOB_QUEUE, в
+запросе только INSERT в jobs). Затем выполняет накопленные задачи
+analytics.refresh воркером и меряет его пропускную способность.
+
+    python -m benchmarks.job_queue --requests 200 --per-room 200
+"""
+
+import argparse
+import statistics
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from benchmarks.common import (
+    Timer, cleanup, percentile, report, seed_bookings, seed_rooms, setup_django,
+)
+
+
+def measure(client, room_ids, start):
+    timings = []
+    for room_id in room_ids:
+        with Timer() as timer:
+            response = client.post("/bookings/create", {
+                "room_id": room_id,
+                "date_start": start.isoformat(),
+                "date_end": (start + timedelta(days=3)).isoformat(),
+            })
+        assert response.status_code == 201, response.content
+        timings.append(timer.elapsed * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--per-room", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from bookings.analytics import AnalyticsSummary
+    from bookings.jobs import JobQueue
+    from bookings.models import Job
+
+    client = Client()
+    queue = JobQueue(args.batch_size, max_attempts=5, retry_delay=10, lease=300)
+    summary = AnalyticsSummary()
+    results = vars(args).copy()
+    try:
+        room_ids = seed_rooms(args.requests * 2)
+        # брони идут подряд от завтра, новые - после них
+        seed_bookings(room_ids, args.per_room)
+        start = date.today() + timedelta(days=args.per_room * 12)
+        with patch("bookings.analytics.analytics_summary", summary), \
+                patch("bookings.services.analytics_summary", summary):
+            results["inline"] = measure(client, room_ids[:args.requests], start)
+            with patch("bookings.jobs.job_queue", queue):
+                results["queued"] = measure(client, room_ids[args.requests:], start)
+
+        results["jobs"] = Job.objects.filter(name="analytics.refresh").count()
+        totals = queue.work(0, once=True)
+        results["worker_jobs_per_second"] = round(
+            (totals["done"] + totals["failed"]) / totals["busy_seconds"]
+        )
+    finally:
+        Job.objects.filter(name="analytics.refresh").delete()
+        cleanup()
+
+    report("job_queue", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Накладные расходы MetricsMiddleware
+
+Один и тот же набор запросов прогоняется через полный стек middleware
+тестовым клиентом Django с METRICS включёнными и выключенными, по очереди
+несколько раундов. Печатается медиана времени запроса для каждого пути
+и разница в микросекундах и процентах.
+
+    python -m benchmarks.metrics_overhead --rooms 1000 --requests 2000
+"""
+
+import argparse
+import statistics
+from datetime import date, timedelta
+
+from benchmarks.common import Timer, cleanup, report, seed_rooms, setup_django
+
+
+def run(client, path, count):
+    with Timer() as timer:
+        for _ in range(count):
+            response = client.get(path)
+    assert response.status_code == 200, response.content
+    return timer.elapsed / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client, override_settings
+
+    date_start = date.today() + timedelta(days=30)
+    paths = [
+        # из кэша: запрос почти ничего не стоит, видна чистая стоимость middleware
+        "/rooms/list?limit=50",
+        f"/rooms/available?date_start={date_start}&date_end={date_start + timedelta(days=3)}",
+    ]
+
+    clients = {}
+    for enabled in (True, False):
+        with override_settings(METRICS={"ENABLED": enabled}):
+            client = Client()
+            client.get(paths[0])  # middleware собирается при первом запросе
+        clients[enabled] = client
+
+    seed_rooms(args.rooms)
+    try:
+        for path in paths:
+            samples = {True: [], False: []}
+            for _ in range(args.rounds):
+                for enabled, client in clients.items():
+                    samples[enabled].append(run(client, path, args.requests))
+            on = statistics.median(samples[True])
+            off = statistics.median(samples[False])
+            report("metrics_overhead", {
+                "path": path,
+                "rooms": args.rooms,
+                "metrics_on_us": round(on, 1),
+                "metrics_off_us": round(off, 1),
+                "overhead_us": round(on - off, 1),
+                "overhead_pct": round((on - off) / off * 100, 2),
+            })
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Календарь занятости на больших объёмах
+
+Создаёт --rooms номеров с бронями на год вперёд (в среднем --occupancy
+занятых ночей) и измеряет GET /rooms/calendar за --days дней в обоих
+форматах.
+
+    python -m benchmarks.occupancy_calendar --rooms 10000 --days 365
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+
+from benchmarks.common import Timer, cleanup, report, seed_rooms, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--occupancy", type=float, default=0.6)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import RequestFactory
+    from bookings.models import Booking
+    from rooms.views import room_calendar
+
+    rnd = random.Random(0)
+    date_from = date.today() + timedelta(days=1)
+    date_to = date_from + timedelta(days=args.days)
+    room_ids = seed_rooms(args.rooms)
+
+    bookings = []
+    for room_id in room_ids:
+        day = date_from - timedelta(days=rnd.randrange(0, 5))
+        while day < date_to:
+            nights = rnd.randrange(1, 8)
+            # пауза такой длины, чтобы в среднем получилась заданная загрузка
+            gap = max(0, round(nights * (1 - args.occupancy) / args.occupancy * rnd.uniform(0.5, 1.5)))
+            bookings.append(Booking(
+                room_id=room_id, date_start=day, date_end=day + timedelta(days=nights)
+            ))
+            day += timedelta(days=nights + gap)
+
+    try:
+        with Timer() as seeding:
+            Booking.objects.bulk_create(bookings, batch_size=5000)
+
+        results = {**vars(args), "bookings": len(bookings), "seed_seconds": round(seeding.elapsed, 2)}
+        factory = RequestFactory()
+        for output_format in ("ranges", "bitmap"):
+            request = factory.get("/rooms/calendar", {
+                "from": date_from.isoformat(),
+                "to": date_to.isoformat(),
+                "format": output_format,
+            })
+            with Timer() as timer:
+                response = room_calendar(request)
+            assert response.status_code == 200, response.content
+            results[f"{output_format}_seconds"] = round(timer.elapsed, 3)
+            results[f"{output_format}_mb"] = round(len(response.content) / 2**20, 2)
+    finally:
+        cleanup()
+
+    report("occupancy_calendar", results)
+
+
+if __name__ == "__main__":
+    main()
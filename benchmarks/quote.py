@@ -0,0 +1,90 @@
+"""
+Стоимость проживания по тарифам: календари цен против расчёта по ночам
+
+Создаёт --rooms номеров с сезонными тарифами и тарифом выходных и
+измеряет GET /rooms/quote на --nights ночей: одиночный запрос и пакет на
+--batch номеров, с календарями цен в памяти и без них (RATE_CALENDARS
+выключены, цены считаются по ночам на каждый запрос).
+
+    python -m benchmarks.quote --rooms 2000 --nights 14,90,300
+"""
+
+import argparse
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from benchmarks.common import Timer, cleanup, report, seed_rooms, setup_django
+
+
+def seed_rates(room_ids, start):
+    from rooms.models import WEEKEND, RoomRate
+
+    rates = []
+    for room_id in room_ids:
+        for season in range(0, 360, 90):
+            rates.append(RoomRate(
+                room_id=room_id,
+                date_start=start + timedelta(days=season),
+                date_end=start + timedelta(days=season + 60),
+                price=150 + season,
+            ))
+        rates.append(RoomRate(
+            room_id=room_id, date_start=start, date_end=start + timedelta(days=365),
+            price=400, weekdays=WEEKEND, priority=1,
+        ))
+    RoomRate.objects.bulk_create(rates, batch_size=5000)
+    return len(rates)
+
+
+def measure(view, request, repeat):
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            response = view(request)
+        assert response.status_code == 200, response.content
+        timings.append(timer.elapsed)
+    return round(min(timings) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--nights", default="14,90,300")
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import RequestFactory
+    from rooms.rates import RateCalendars
+    from rooms.views import room_quote
+
+    try:
+        start = date.today()
+        with Timer() as seeding:
+            room_ids = seed_rooms(args.rooms)
+            rates = seed_rates(room_ids, start)
+
+        results = {**vars(args), "rates": rates, "seed_seconds": round(seeding.elapsed, 2)}
+        factory = RequestFactory()
+        batch = ",".join(map(str, room_ids[:args.batch]))
+        calendars = RateCalendars(ttl=3600, days=400, max_rooms=len(room_ids))
+        for mode, cache in (("calendar", calendars), ("direct", None)):
+            with patch("rooms.rates.rate_calendars", cache):
+                for nights in args.nights.split(","):
+                    params = {
+                        "date_start": start.isoformat(),
+                        "date_end": (start + timedelta(days=int(nights))).isoformat(),
+                    }
+                    single = factory.get("/rooms/quote", {**params, "room_id": room_ids[0]})
+                    many = factory.get("/rooms/quote", {**params, "room_ids": batch})
+                    results[f"{mode}_{nights}_single_ms"] = measure(room_quote, single, args.repeat)
+                    results[f"{mode}_{nights}_batch_ms"] = measure(room_quote, many, args.repeat)
+    finally:
+        cleanup()
+
+    report("quote", results)
+
+
+if __name__ == "__main__":
+    main()
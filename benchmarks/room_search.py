@@ -0,0 +1,92 @@
+"""
+Полнотекстовый поиск номеров против ILIKE по описанию
+
+Создаёт --rooms номеров со случайными описаниями из словаря и измеряет
+GET /rooms/search для нескольких запросов: по индексу (PostgreSQL
+tsvector или SQLite FTS5) и через icontains, как поиск по
+search_fields до него.
+
+    python -m benchmarks.room_search --rooms 100000
+"""
+
+import argparse
+import random
+from contextlib import nullcontext
+from unittest.mock import patch
+
+from benchmarks.common import BENCH_DESCRIPTION, Timer, cleanup, report, setup_django
+
+WORDS = (
+    "люкс стандарт семейный номер вид море парк горы балкон терраса кровать "
+    "двуспальная душ ванна кухня завтрак тихий просторный светлый окна двор "
+    "мансарда камин сауна джакузи кондиционер сейф мини-бар диван гостиная"
+).split()
+# редкое слово - в одном описании из RARE_EVERY
+RARE_WORD = "пентхаус"
+RARE_EVERY = 1000
+QUERIES = (RARE_WORD, "камин", "вид море", "джакузи сауна терраса")
+
+
+def seed_described_rooms(count, batch_size=5000, seed=0):
+    """Номера с описанием из BENCH_DESCRIPTION и 8-15 случайных слов (+ RARE_WORD)"""
+    from rooms.models import Room
+
+    rnd = random.Random(seed)
+    for offset in range(0, count, batch_size):
+        Room.objects.bulk_create([
+            Room(
+                description=" ".join([
+                    BENCH_DESCRIPTION,
+                    *rnd.sample(WORDS, rnd.randrange(8, 16)),
+                    *([RARE_WORD] if (offset + i) % RARE_EVERY == 0 else []),
+                ]),
+                price=rnd.randrange(1000, 20000)
+            )
+            for i in range(min(batch_size, count - offset))
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test import RequestFactory
+    from rooms.models import Room
+    from rooms.search import search_backend
+    from rooms.views import room_search
+
+    try:
+        with Timer() as seeding:
+            seed_described_rooms(args.rooms)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE rooms")
+
+        results = {**vars(args), "backend": search_backend(connection), "seed_seconds": round(seeding.elapsed, 2)}
+        factory = RequestFactory()
+        for mode in ("index", "ilike"):
+            like = patch("rooms.search.search_backend", return_value="like") if mode == "ilike" else nullcontext()
+            with like:
+                for query in QUERIES:
+                    request = factory.get("/rooms/search", {"q": query, "limit": args.limit})
+                    timings = []
+                    for _ in range(args.repeat):
+                        with Timer() as timer:
+                            response = room_search(request)
+                        assert response.status_code == 200, response.content
+                        timings.append(timer.elapsed)
+                    results[f"{mode}_{query.replace(' ', '_')}_ms"] = round(min(timings) * 1000, 2)
+    finally:
+        Room.objects.filter(description__startswith=f"{BENCH_DESCRIPTION} ").delete()
+        cleanup()
+
+    report("room_search", results)
+
+
+if __name__ == "__main__":
+    main()
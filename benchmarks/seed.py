@@ -0,0 +1,44 @@
+"""
+Наполнение базы тестовыми данными: N номеров по M броней
+
+Данные помечены как бенчмарочные и удаляются через --cleanup, поэтому
+так можно подготовить базу и для http_load против живого сервера:
+
+    python -m benchmarks.seed --rooms 10000 --bookings-per-room 20
+    python -m benchmarks.http_load --scenario mixed
+    python -m benchmarks.seed --cleanup
+"""
+
+import argparse
+
+from benchmarks.common import Timer, cleanup, report, seed_bookings, seed_rooms, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--bookings-per-room", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cleanup", action="store_true", help="только удалить ранее созданные данные")
+    args = parser.parse_args()
+
+    setup_django()
+    if args.cleanup:
+        with Timer() as timer:
+            cleanup()
+        report("seed_cleanup", {"seconds": round(timer.elapsed, 2)})
+        return
+
+    with Timer() as timer:
+        room_ids = seed_rooms(args.rooms, seed=args.seed)
+        bookings = seed_bookings(room_ids, args.bookings_per_room, seed=args.seed)
+    report("seed", {
+        "rooms": len(room_ids),
+        "bookings": bookings,
+        "seconds": round(timer.elapsed, 2),
+        "rows_per_second": round((len(room_ids) + bookings) / timer.elapsed),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Набор бенчмарков с сравнением против базовой линии
+
+Запускает микробенчмарки benchmarks/bench_views.py (pytest-benchmark) и,
+если задан --url, нагрузку http_load --scenario mixed против живого
+сервера. Результаты пишутся в --output JSON вида
+{"имя": {"метрика": значение}} и сравниваются с --baseline: метрика
+с суффиксом _ms считается хуже при росте, остальные (rps, ops) - при
+падении. Если хоть одна метрика хуже базовой больше чем на --threshold,
+код выхода 1.
+
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --url http://127.0.0.1:8000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import report
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline.json"
+
+
+def run_micro(pytest_args):
+    with tempfile.TemporaryDirectory() as directory:
+        output = Path(directory) / "micro.json"
+        subprocess.run(
+            [sys.executable, "-m", "pytest", str(BENCHMARKS_DIR / "bench_views.py"),
+             "-q", "-p", "no:cacheprovider", f"--benchmark-json={output}", *pytest_args],
+            check=True,
+        )
+        data = json.loads(output.read_text())
+    return {
+        f"micro.{bench['name']}": {
+            "median_ms": round(bench["stats"]["median"] * 1000, 4),
+            "ops": round(bench["stats"]["ops"], 1),
+        }
+        for bench in data["benchmarks"]
+    }
+
+
+def run_load(url, concurrency, duration):
+    from benchmarks.http_load import load
+
+    results = load(url, "mixed", [], concurrency, duration)
+    return {
+        f"http.{name}": {"rps": endpoint["rps"], "p50_ms": endpoint["p50_ms"], "p99_ms": endpoint["p99_ms"]}
+        for name, endpoint in results.items()
+    }
+
+
+def compare(results, baseline, threshold):
+    """Печатает изменения метрик, возвращает список регрессий"""
+    regressions = []
+    for name, metrics in sorted(results.items()):
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if value is None or not base:
+                continue
+            change = (value - base) / base
+            worse = change > threshold if metric.endswith("_ms") else change < -threshold
+            report("compare", {
+                "name": name, "metric": metric, "baseline": base, "current": value,
+                "change_pct": round(change * 100, 1), "regression": worse,
+            })
+            if worse:
+                regressions.append((name, metric))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="записать результат в --baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="допустимое ухудшение, доля")
+    parser.add_argument("--url", help="сервер для http_load --scenario mixed")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    args, pytest_args = parser.parse_known_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hotel_booking.settings")
+    results = run_micro(pytest_args)
+    if args.url:
+        results.update(run_load(args.url, args.concurrency, args.duration))
+
+    # пустые метрики в файл не пишем
+    results = {
+        name: {metric: value for metric, value in metrics.items() if value is not None}
+        for name, metrics in results.items()
+    }
+    Path(args.output).write_text(json.dumps(results, indent=2, sort_keys=True))
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(results, indent=2, sort_keys=True))
+        report("suite", {"baseline": args.baseline, "saved": len(results)})
+        return
+
+    if not Path(args.baseline).exists():
+        report("suite", {"baseline": args.baseline, "error": "нет базовой линии, запустите с --save-baseline"})
+        return
+    regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+    report("suite", {"output": args.output, "regressions": len(regressions)})
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,49 @@
 from django.contrib import admin
+from django.db.models import F
+from hotel_booking.pagination import EstimatedCountPaginator
 from .models import Booking
 
+
+class RoomIdFilter(admin.SimpleListFilter):
+    """
+    Фильтр по номеру без списка всех номеров в боковой панели: показывает
+    только выбранный номер (ссылка "Количество бронирований" в списке
+    номеров ведёт сюда с ?room_id=...)
+    """
+    title = 'Номер'
+    parameter_name = 'room_id'
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if value and value.isdigit():
+            return [(value, f'Номер {value}')]
+        return []
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(room_id=value)
+        return queryset
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ('id', 'room', 'date_start', 'date_end', 'created_at', 'duration_days')
-    list_filter = ('date_start', 'date_end', 'created_at', 'room')
+    list_filter = ('date_start', 'date_end', 'created_at', RoomIdFilter)
+    list_select_related = ('room',)
     search_fields = ('room__description',)
-    ordering = ('-created_at',)
+    # по id, а не по created_at: у bookings нет индекса по created_at,
+    # а порядок id совпадает с порядком создания
+    ordering = ('-id',)
     readonly_fields = ('created_at',)
+    autocomplete_fields = ('room',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(duration=F('date_end') - F('date_start'))
 
     def duration_days(self, obj):
-        return (obj.date_end - obj.date_start).days
+        return obj.duration.days
     duration_days.short_description = 'Дней'
-
-
-
+    duration_days.admin_order_field = 'duration'
@@ -0,0 +1,271 @@
+"""
+Выручка и загрузка номеров по месяцам (GET /analytics/revenue и
+GET /analytics/occupancy)
+
+Ночи считаются в базе одним запросом с группировкой по номеру: на каждый
+месяц периода - SUM(LEAST(выезд, конец месяца) - GREATEST(заезд, начало
+месяца)) по броням, пересекающим месяц, так что бронь на стыке месяцев
+делится между ними. Выручка - ночи * текущая цена номера.
+
+При ANALYTICS_SUMMARY['ENABLED'] отчёты читаются из сводки RoomMonthStats
+(ночи номера за месяц), и их стоимость зависит от числа номеров и
+месяцев, а не от числа броней. Сводка пересчитывается после коммита
+по затронутым номерам и месяцам тем же агрегирующим запросом: сигналы
+моделей для одиночных изменений, bulk_create_bookings и импорт вызывают
+пересчёт сами. Пересчёт - событие analytics.refresh (bookings.jobs), при
+включённой очереди его выполняет воркер. Полный пересчёт - manage.py
+refresh_analytics.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Greatest, Least
+from django.db.models.signals import post_delete, post_save
+
+from .jobs import handler, publish_on_commit
+from .models import Booking, RoomMonthStats
+
+DEFAULTS = {
+    'ENABLED': False,
+}
+
+MAX_ANALYTICS_MONTHS = 36
+REFRESH_CHUNK_SIZE = 1000
+ZERO = Decimal('0.00')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def month_bounds(first, last):
+    """Начала месяцев с first по last включительно и начало следующего за last"""
+    bounds = [month_start(first)]
+    while bounds[-1] <= last:
+        bounds.append(next_month(bounds[-1]))
+    return bounds
+
+
+def live_nights(bounds, room_ids=None):
+    """
+    (room_id, price, month, nights) по броням за месяцы bounds[:-1],
+    один запрос; месяцы без ночей пропускаются
+    """
+    months = list(zip(bounds, bounds[1:]))
+    bookings = Booking.objects.filter(date_start__lt=bounds[-1], date_end__gt=bounds[0])
+    if room_ids is not None:
+        bookings = bookings.filter(room_id__in=room_ids)
+    rows = bookings.order_by().values('room_id', 'room__price').annotate(**{
+        f'month_{i}': Sum(
+            Least(F('date_end'), Value(end)) - Greatest(F('date_start'), Value(start)),
+            filter=Q(date_start__lt=end, date_end__gt=start)
+        )
+        for i, (start, end) in enumerate(months)
+    })
+    for row in rows:
+        for i, (start, _) in enumerate(months):
+            nights = row[f'month_{i}']
+            if nights:
+                yield row['room_id'], row['room__price'], start, nights.days
+
+
+def summary_nights(bounds, room_ids=None):
+    """То же, что live_nights, но из сводки RoomMonthStats"""
+    stats = RoomMonthStats.objects.filter(month__gte=bounds[0], month__lt=bounds[-1], nights__gt=0)
+    if room_ids is not None:
+        stats = stats.filter(room_id__in=room_ids)
+    yield from stats.values_list('room_id', 'room__price', 'month', 'nights').iterator()
+
+
+def room_month_nights(first, last, room_id=None):
+    bounds = month_bounds(first, last)
+    room_ids = [room_id] if room_id is not None else None
+    if analytics_summary is not None:
+        return summary_nights(bounds, room_ids)
+    return live_nights(bounds, room_ids)
+
+
+def days_in_month(month):
+    return (next_month(month) - month).days
+
+
+def revenue_report(first, last, room_id=None):
+    """Ночи и выручка по месяцам и по номерам за месяцы с first по last"""
+    months = {month: [0, ZERO] for month in month_bounds(first, last)[:-1]}
+    rooms = defaultdict(lambda: [0, ZERO])
+    for room, price, month, nights in room_month_nights(first, last, room_id):
+        revenue = price * nights
+        for totals in (months[month], rooms[room]):
+            totals[0] += nights
+            totals[1] += revenue
+    return {
+        "total": {
+            "nights": sum(nights for nights, _ in months.values()),
+            "revenue": sum((revenue for _, revenue in months.values()), ZERO),
+        },
+        "months": [
+            {"month": month.strftime('%Y-%m'), "nights": nights, "revenue": revenue}
+            for month, (nights, revenue) in months.items()
+        ],
+        "rooms": [
+            {"room_id": room, "nights": nights, "revenue": revenue}
+            for room, (nights, revenue) in sorted(rooms.items())
+        ],
+    }
+
+
+def occupancy_report(first, last, rooms_count, room_id=None):
+    """
+    Доля занятых ночей по месяцам (от rooms_count номеров) и по номерам
+    (от числа дней периода) за месяцы с first по last
+    """
+    bounds = month_bounds(first, last)
+    months = dict.fromkeys(bounds[:-1], 0)
+    rooms = defaultdict(int)
+    for room, _, month, nights in room_month_nights(first, last, room_id):
+        months[month] += nights
+        rooms[room] += nights
+    days = (bounds[-1] - bounds[0]).days
+    return {
+        "rooms_count": rooms_count,
+        "months": [
+            {
+                "month": month.strftime('%Y-%m'),
+                "nights": nights,
+                "rate": round(nights / (rooms_count * days_in_month(month)), 4) if rooms_count else 0
+            }
+            for month, nights in months.items()
+        ],
+        "rooms": [
+            {"room_id": room, "nights": nights, "rate": round(nights / days, 4)}
+            for room, nights in sorted(rooms.items())
+        ],
+    }
+
+
+def refresh_rooms(room_ids, date_from=None, date_to=None):
+    """
+    Пересчёт сводки номеров за месяцы, задевающие [date_from, date_to),
+    без периода - за все месяцы номера
+    """
+    from rooms.models import Room
+
+    with transaction.atomic():
+        # пересчёты одного номера идут по очереди; удалённые номера отпадают
+        room_ids = list(
+            Room.objects.select_for_update()
+            .filter(id__in=room_ids)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        if not room_ids:
+            return
+        stats = RoomMonthStats.objects.filter(room_id__in=room_ids)
+        if date_from is None:
+            span = Booking.objects.filter(room_id__in=room_ids).aggregate(
+                first=Min('date_start'), last=Max('date_end')
+            )
+            stats.delete()
+            if span['first'] is None:
+                return
+            date_from, date_to = span['first'], span['last']
+        else:
+            stats.filter(month__gte=month_start(date_from), month__lt=date_to).delete()
+
+        # последний день - ночь перед date_to
+        bounds = month_bounds(date_from, date_to - timedelta(days=1))
+        rows = []
+        for offset in range(0, len(bounds) - 1, MAX_ANALYTICS_MONTHS):
+            rows.extend(
+                RoomMonthStats(room_id=room_id, month=month, nights=nights)
+                for room_id, _, month, nights
+                in live_nights(bounds[offset:offset + MAX_ANALYTICS_MONTHS + 1], room_ids)
+            )
+        RoomMonthStats.objects.bulk_create(rows, batch_size=5000)
+
+
+def refresh_many(room_ids, chunk_size=REFRESH_CHUNK_SIZE):
+    """Полный пересчёт сводки номеров пачками по chunk_size номеров"""
+    room_ids = sorted(room_ids)
+    for offset in range(0, len(room_ids), chunk_size):
+        refresh_rooms(room_ids[offset:offset + chunk_size])
+    return len(room_ids)
+
+
+def refresh_all(chunk_size=REFRESH_CHUNK_SIZE):
+    from rooms.models import Room
+
+    return refresh_many(Room.objects.values_list('id', flat=True), chunk_size)
+
+
+@handler('analytics.refresh')
+def refresh_event(payload):
+    """payload: room_ids и, для пересчёта части месяцев, date_from и date_to"""
+    if 'date_from' in payload:
+        refresh_rooms(
+            payload['room_ids'],
+            date.fromisoformat(payload['date_from']),
+            date.fromisoformat(payload['date_to'])
+        )
+    else:
+        refresh_many(payload['room_ids'])
+
+
+class AnalyticsSummary:
+    """Пересчёт сводки после коммита изменений броней"""
+
+    def bookings_changed(self, periods):
+        """periods - (room_id, date_start, date_end) созданных или удалённых броней"""
+        by_room = defaultdict(list)
+        for room_id, date_start, date_end in periods:
+            by_room[room_id].append((date_start, date_end))
+        publish_on_commit(
+            ('analytics.refresh', {
+                "room_ids": [room_id],
+                "date_from": min(start for start, _ in dates).isoformat(),
+                "date_to": max(end for _, end in dates).isoformat(),
+            })
+            for room_id, dates in by_room.items()
+        )
+
+    def rooms_changed(self, room_ids):
+        publish_on_commit([('analytics.refresh', {"room_ids": list(room_ids)})])
+
+    def on_booking_saved(self, sender, instance, created, **kwargs):
+        if created:
+            self.bookings_changed([(instance.room_id, instance.date_start, instance.date_end)])
+        else:
+            # прежние даты неизвестны, номер пересчитывается целиком
+            self.rooms_changed([instance.room_id])
+
+    def on_booking_deleted(self, sender, instance, **kwargs):
+        self.bookings_changed([(instance.room_id, instance.date_start, instance.date_end)])
+
+    def connect(self):
+        # как у bookings.intervals: обработчик post_delete отключает быстрое
+        # каскадное удаление, поэтому подключается только при включённой сводке
+        post_save.connect(self.on_booking_saved, sender='bookings.Booking')
+        post_delete.connect(self.on_booking_deleted, sender='bookings.Booking')
+
+    def disconnect(self):
+        post_save.disconnect(self.on_booking_saved, sender='bookings.Booking')
+        post_delete.disconnect(self.on_booking_deleted, sender='bookings.Booking')
+
+
+def build_summary():
+    options = {**DEFAULTS, **getattr(settings, 'ANALYTICS_SUMMARY', {})}
+    if not options['ENABLED']:
+        return None
+    return AnalyticsSummary()
+
+
+analytics_summary = build_summary()
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class BookingsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "bookings"
+
+    def ready(self):
+        from hotel_booking.versions import list_versions
+        from .analytics import analytics_summary
+        from .intervals import interval_index
+
+        if interval_index is not None:
+            interval_index.connect()
+        if analytics_summary is not None:
+            analytics_summary.connect()
+        if list_versions is not None:
+            list_versions.connect()
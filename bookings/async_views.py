@@ -0,0 +1,136 @@
+"""
+Асинхронные варианты представлений bookings.views для запуска под ASGI
+
+Создание брони идёт через bookings.services в потоке: INSERT ... SELECT
+выполняется сырым SQL в точке сохранения, которых нет в async ORM.
+Пакетное создание отдаётся синхронным представлением, Django сам
+выполнит его в потоке.
+"""
+
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from hotel_booking.idempotency import idempotent
+from hotel_booking.pagination import alist_response
+from hotel_booking.versions import achanged, list_condition
+from rooms.cache import room_list_cache
+from rooms.models import Room
+from . import services
+from .export import aexport_stream, export_queryset
+from .jobs import apublish, booking_event
+from .models import Booking
+from .views import (
+    booking_to_dict,
+    create_booking_error,
+    error_response,
+    export_response,
+    list_version,
+    parse_booking_fields,
+    parse_booking_id,
+    parse_export_params,
+    parse_list_room_id,
+    success_response,
+)
+# без асинхронного варианта, Django выполнит его в потоке
+from .views import bulk_create_bookings  # noqa: F401
+# отчёты - один агрегирующий запрос и расчёт в Python, тоже в потоке
+from .views import occupancy_analytics, revenue_analytics  # noqa: F401
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+async def create_booking(request):
+    """POST /bookings/create, см. bookings.views.create_booking"""
+    try:
+        try:
+            room_id, date_start, date_end = parse_booking_fields(request.POST)
+        except ValueError as e:
+            return error_response(str(e))
+
+        try:
+            booking = await sync_to_async(services.create_booking)(
+                room_id, date_start, date_end
+            )
+        except Exception as e:
+            return create_booking_error(e, date_start, date_end)
+
+        return success_response({
+            "booking_id": booking.id
+        }, status=201)
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def delete_booking(request):
+    """POST /bookings/delete, см. bookings.views.delete_booking"""
+    try:
+        try:
+            booking_id = parse_booking_id(request.POST)
+        except ValueError as e:
+            return error_response(str(e))
+
+        try:
+            booking = await Booking.objects.aget(id=booking_id)
+        except Booking.DoesNotExist:
+            return error_response("Бронирование не найдено", status=404)
+
+        event = booking_event(booking)
+        await booking.adelete()
+        # вне транзакции: запись уже зафиксирована
+        room_list_cache.invalidate()
+        await achanged([booking.room_id])
+        await apublish([('booking.deleted', event)])
+
+        return success_response({
+            "message": f"Бронирование {booking_id} удалено"
+        })
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+@list_condition(list_version)
+async def list_bookings(request):
+    """GET /bookings/list, см. bookings.views.list_bookings"""
+    try:
+        try:
+            room_id = parse_list_room_id(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+
+        if not await Room.objects.filter(id=room_id).aexists():
+            return error_response("Номер не найден", status=404)
+
+        try:
+            return await alist_response(
+                request.GET,
+                Booking.objects.filter(room_id=room_id),
+                ['date_start', 'id'],
+                booking_to_dict
+            )
+        except ValueError as e:
+            return error_response(str(e))
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+async def export_bookings(request):
+    """GET /bookings/export, см. bookings.views.export_bookings"""
+    try:
+        try:
+            output_format, date_from, date_to, compress = parse_export_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+
+        return export_response(
+            aexport_stream(export_queryset(date_from, date_to), output_format, compress),
+            output_format,
+            compress
+        )
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
@@ -0,0 +1,176 @@
+"""
+Выгрузка бронирований вместе с данными номера (GET /bookings/export и
+manage.py export_bookings)
+
+Строки читаются одним запросом с JOIN на номер через .iterator(), на
+PostgreSQL это серверный курсор, и кодируются пачками по chunk_size
+строк, так что память не зависит от объёма выгрузки. Длительность и
+выручка (цена за ночь * число ночей) считаются по ходу.
+
+Форматы: csv, jsonl; в команде ещё parquet (нужен pyarrow, в
+зависимости проекта не входит). gzip сжимает поток по мере выдачи.
+"""
+
+import csv
+import io
+import zlib
+
+from hotel_booking.responses import dumps
+from .importer import chunked
+from .models import Booking
+
+EXPORT_CHUNK_SIZE = 5000
+FORMATS = ('csv', 'jsonl')
+
+COLUMNS = (
+    'booking_id',
+    'room_id',
+    'room_description',
+    'price_per_night',
+    'date_start',
+    'date_end',
+    'duration_days',
+    'revenue',
+    'created_at',
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def export_queryset(date_from=None, date_to=None):
+    """Брони с заездом в [date_from, date_to), любая граница необязательна"""
+    bookings = Booking.objects.all()
+    if date_from:
+        bookings = bookings.filter(date_start__gte=date_from)
+    if date_to:
+        bookings = bookings.filter(date_start__lt=date_to)
+    # values(), а не values_list(): aiterator() по values_list в Django 5.2
+    # выполняет запрос прямо в event loop
+    return bookings.order_by('id').values(
+        'id', 'room_id', 'room__description', 'room__price',
+        'date_start', 'date_end', 'created_at'
+    )
+
+
+def export_row(values):
+    """Строка запроса -> значения COLUMNS"""
+    price = values['room__price']
+    # как Booking.get_duration_days, но без экземпляра модели
+    duration = (values['date_end'] - values['date_start']).days
+    return (
+        values['id'], values['room_id'], values['room__description'], price,
+        values['date_start'], values['date_end'], duration, price * duration,
+        values['created_at'],
+    )
+
+
+def encode_csv(rows, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows(
+        (*row[:8], row[8].isoformat()) for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+def encode_jsonl(rows, header=False):
+    return b''.join(dumps(dict(zip(COLUMNS, row))) + b'\n' for row in rows)
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'jsonl': encode_jsonl,
+}
+
+
+class Gzip:
+    """Потоковое сжатие в формат gzip"""
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+
+class Identity:
+    def compress(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+
+def encode_chunk(encode, compressor, rows, first):
+    return compressor.compress(encode([export_row(values) for values in rows], header=first))
+
+
+def export_stream(queryset, output_format, compress=False, chunk_size=EXPORT_CHUNK_SIZE, on_chunk=None):
+    """bytes выгрузки частями; on_chunk(число строк) вызывается на каждую пачку"""
+    encode = ENCODERS[output_format]
+    compressor = Gzip() if compress else Identity()
+    first = True
+    for rows in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        yield encode_chunk(encode, compressor, rows, first)
+        first = False
+        if on_chunk:
+            on_chunk(len(rows))
+    if first:
+        yield compressor.compress(encode([], header=True))
+    yield compressor.flush()
+
+
+async def aexport_stream(queryset, output_format, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Асинхронный вариант export_stream для ASGI"""
+    encode = ENCODERS[output_format]
+    compressor = Gzip() if compress else Identity()
+    first = True
+    rows = []
+    async for values in queryset.aiterator(chunk_size=chunk_size):
+        rows.append(values)
+        if len(rows) >= chunk_size:
+            yield encode_chunk(encode, compressor, rows, first)
+            first = False
+            rows = []
+    if rows or first:
+        yield encode_chunk(encode, compressor, rows, first)
+    yield compressor.flush()
+
+
+def write_parquet(queryset, path, chunk_size=EXPORT_CHUNK_SIZE):
+    """Запись в Parquet группами строк по chunk_size, возвращает число строк"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Для формата parquet нужен пакет pyarrow")
+
+    schema = pa.schema([
+        ('booking_id', pa.int64()),
+        ('room_id', pa.int64()),
+        ('room_description', pa.string()),
+        ('price_per_night', pa.decimal128(10, 2)),
+        ('date_start', pa.date32()),
+        ('date_end', pa.date32()),
+        ('duration_days', pa.int32()),
+        ('revenue', pa.decimal128(18, 2)),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+            columns = zip(*(export_row(values) for values in rows))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            count += len(rows)
+    return count
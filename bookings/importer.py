@@ -0,0 +1,276 @@
+"""
+Массовая загрузка бронирований (manage.py import_bookings и seed)
+
+Вход читается потоком и обрабатывается пачками по chunk_size строк,
+каждая пачка - в своей транзакции. Проверка идёт по пачке целиком:
+- формат и порядок дат - по строкам, без full_clean() и без запросов;
+- существование номеров - одним запросом на новые номера пачки, они же
+  блокируются SELECT ... FOR UPDATE;
+- пересечения - строки пачки сортируются по (номер, заезд) и
+  просматриваются подряд против занятых периодов номера. Занятые периоды
+  номера загружаются из базы одним запросом при первой встрече номера
+  и дальше пополняются импортированными строками - только после фиксации
+  пачки, так что откаченная пачка не оставляет фантомных периодов.
+
+Прошедшие даты разрешены: импортируется в том числе история.
+
+Вставка - COPY на PostgreSQL (psycopg 3), иначе bulk_create. Занятые
+периоды хранятся в памяти на всё время импорта, поэтому импорт
+рассчитан на базу без параллельной записи; на PostgreSQL пересечения
+всё равно не пропустит ограничение bookings_no_overlap.
+"""
+
+import csv
+import json
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from datetime import date
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+from hotel_booking.versions import changed_on_commit
+from rooms.cache import room_list_cache
+from rooms.models import Room
+from .analytics import analytics_summary
+from .intervals import interval_index
+from .models import Booking
+from .services import conflict_message, reserve
+
+CHUNK_SIZE = 10000
+MAX_REPORTED_ERRORS = 100
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportRowError(Exception):
+    """Строка не прошла проверку в строгом режиме"""
+
+
+def read_csv(stream):
+    """Строки CSV с заголовком room_id,date_start,date_end"""
+    yield from csv.DictReader(stream)
+
+
+def read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+
+
+def detect_format(path):
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def parse_row(row):
+    """(room_id, date_start, date_end) или ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError("Строка должна быть объектом с room_id, date_start, date_end")
+    try:
+        room_id = int(row['room_id'])
+        date_start = date.fromisoformat(str(row['date_start']))
+        date_end = date.fromisoformat(str(row['date_end']))
+    except KeyError as e:
+        raise ValueError(f"Поле {e} обязательно")
+    except (TypeError, ValueError):
+        raise ValueError("Неверный формат room_id или дат (YYYY-MM-DD)")
+    if date_start >= date_end:
+        raise ValueError("Дата окончания должна быть позже даты начала")
+    return room_id, date_start, date_end
+
+
+def copy_supported():
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+def copy_bookings(rows):
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        with cursor.copy(
+            'COPY bookings (room_id, date_start, date_end, created_at) FROM STDIN'
+        ) as copy:
+            for room_id, date_start, date_end in rows:
+                copy.write_row((room_id, date_start, date_end, now))
+
+
+def bulk_create_bookings(rows, batch_size=2000):
+    Booking.objects.bulk_create(
+        [Booking(room_id=room_id, date_start=date_start, date_end=date_end)
+         for room_id, date_start, date_end in rows],
+        batch_size=batch_size
+    )
+
+
+def insert_bookings(rows, method):
+    """Вставка уже проверенных (room_id, date_start, date_end)"""
+    if method == 'copy':
+        copy_bookings(rows)
+    else:
+        bulk_create_bookings(rows)
+
+
+def resolve_method(method):
+    if method == 'auto':
+        return 'copy' if copy_supported() else 'bulk'
+    if method == 'copy' and not copy_supported():
+        raise ValueError("COPY доступен только на PostgreSQL с psycopg 3")
+    return method
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.seconds) if self.seconds else 0
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def invalidate_caches(room_ids):
+    """Сброс кэшей после вставки броней в номера room_ids"""
+    room_list_cache.invalidate()
+    changed_on_commit(room_ids)
+    if interval_index is not None:
+        interval_index.clear()
+    if analytics_summary is not None:
+        analytics_summary.rooms_changed(room_ids)
+
+
+class BookingImporter:
+    """
+    strict=True: первая ошибка отменяет весь импорт (одна транзакция),
+    иначе неверные строки пропускаются и попадают в stats.errors.
+    """
+
+    def __init__(self, method='auto', chunk_size=CHUNK_SIZE, strict=False, on_chunk=None):
+        self.method = resolve_method(method)
+        self.chunk_size = chunk_size
+        self.strict = strict
+        self.on_chunk = on_chunk
+        self.busy = {}
+        self.missing_rooms = set()
+        self.stats = ImportStats()
+
+    def run(self, rows):
+        started = time.perf_counter()
+        written = set()
+        try:
+            with transaction.atomic() if self.strict else nullcontext():
+                for chunk in chunked(enumerate(rows, 1), self.chunk_size):
+                    with transaction.atomic():
+                        periods = self.import_chunk(chunk)
+                    self.busy.update(periods)
+                    written.update(periods)
+                    if self.on_chunk:
+                        self.on_chunk(self.stats)
+        except Exception:
+            if self.strict:
+                # откатился весь импорт
+                self.busy = {}
+                self.stats.imported = 0
+                written.clear()
+            raise
+        finally:
+            self.stats.seconds = time.perf_counter() - started
+            if written:
+                invalidate_caches(written)
+        return self.stats
+
+    def reject(self, line, message):
+        if self.strict:
+            raise ImportRowError(f"Строка {line}: {message}")
+        self.stats.reject(line, message)
+
+    def import_chunk(self, chunk):
+        """
+        Проверяет и вставляет пачку; возвращает {room_id: занятые периоды}
+        номеров с новыми бронями для self.busy после фиксации пачки
+        """
+        self.stats.rows += len(chunk)
+        parsed = []
+        for line, row in chunk:
+            try:
+                parsed.append((*parse_row(row), line))
+            except ValueError as e:
+                self.reject(line, str(e))
+
+        self.load_rooms({room_id for room_id, _, _, _ in parsed})
+
+        accepted = []
+        periods = {}
+        parsed.sort()
+        for room_id, date_start, date_end, line in parsed:
+            if room_id in self.missing_rooms:
+                self.reject(line, "Номер не найден")
+                continue
+            if room_id not in periods:
+                periods[room_id] = list(self.busy[room_id])
+            if not reserve(periods[room_id], date_start, date_end):
+                self.reject(line, conflict_message(date_start, date_end))
+            else:
+                accepted.append((room_id, date_start, date_end))
+
+        if accepted:
+            insert_bookings(accepted, self.method)
+            self.stats.imported += len(accepted)
+        return {room_id: periods[room_id] for room_id, _, _ in accepted}
+
+    def load_rooms(self, room_ids):
+        """Блокирует номера пачки и загружает занятость ещё не встречавшихся"""
+        if not room_ids:
+            return
+        existing = set(
+            Room.objects.select_for_update()
+            .filter(id__in=room_ids)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        new_rooms = existing - self.busy.keys()
+        self.missing_rooms.update(room_ids - existing)
+
+        busy = defaultdict(list)
+        if new_rooms:
+            rows = (
+                Booking.objects.filter(room_id__in=new_rooms)
+                .order_by('room_id', 'date_start')
+                .values_list('room_id', 'date_start', 'date_end')
+            )
+            for room_id, date_start, date_end in rows.iterator(chunk_size=self.chunk_size):
+                busy[room_id].append((date_start, date_end))
+        for room_id in new_rooms:
+            self.busy[room_id] = busy[room_id]
+
+
+def open_input(path, stdin):
+    if path == '-':
+        return stdin
+    return open(path, encoding='utf-8', newline='')
@@ -0,0 +1,238 @@
+"""
+Индекс занятых периодов номеров в памяти процесса
+
+Брони одного номера не пересекаются, поэтому отсортированные по дате
+заезда периоды отсортированы и по дате выезда, и пересечение с любым
+периодом проверяется двоичным поиском за O(log n) без запроса к базе.
+
+Индекс включается настройкой BOOKING_INTERVAL_INDEX['ENABLED']. Периоды
+номера загружаются из базы при первом обращении и обновляются сигналами
+моделей после коммита. Записи других процессов индекс не видит, поэтому
+загруженный номер перечитывается не реже раза в TTL секунд. Решение о
+создании брони всегда принимается по базе (bookings.services), индекс
+используется только для чтения: Booking.check_availability,
+Room.is_available, GET /rooms/available (кандидаты по цене - из базы,
+занятость - по индексу) и GET /rooms/free_slots (окна номеров - по
+индексу вместо соединения с бронями). Номера, которых нет в индексе,
+загружаются пачками по LOAD_CHUNK_SIZE одним запросом.
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+DEFAULTS = {
+    'ENABLED': False,
+    'TTL': 30,
+}
+
+LOAD_CHUNK_SIZE = 1000
+
+
+class RoomIntervals:
+    """Отсортированные по date_start непересекающиеся брони одного номера"""
+
+    __slots__ = ('ids', 'starts', 'ends', 'loaded_at')
+
+    def __init__(self, rows, loaded_at):
+        self.ids = [row[0] for row in rows]
+        self.starts = [row[1] for row in rows]
+        self.ends = [row[2] for row in rows]
+        self.loaded_at = loaded_at
+
+    def __len__(self):
+        return len(self.ids)
+
+    def overlaps(self, date_start, date_end):
+        # брони с заездом раньше date_end; у последней из них самый поздний выезд
+        i = bisect.bisect_left(self.starts, date_end)
+        return i > 0 and self.ends[i - 1] > date_start
+
+    def add(self, booking_id, date_start, date_end):
+        i = bisect.bisect_right(self.starts, date_start)
+        self.ids.insert(i, booking_id)
+        self.starts.insert(i, date_start)
+        self.ends.insert(i, date_end)
+
+    def remove(self, booking_id):
+        try:
+            i = self.ids.index(booking_id)
+        except ValueError:
+            return
+        del self.ids[i], self.starts[i], self.ends[i]
+
+    def free_windows(self, date_from, date_to, min_nights=1):
+        """Свободные периоды внутри [date_from, date_to) не короче min_nights"""
+        # брони, выехавшие до date_from, пропускаются двоичным поиском
+        first = bisect.bisect_right(self.ends, date_from)
+        periods = ((self.starts[i], self.ends[i]) for i in range(first, len(self.starts)))
+        return free_windows(periods, date_from, date_to, min_nights)
+
+
+def free_windows(periods, date_from, date_to, min_nights=1):
+    """
+    Свободные периоды внутри [date_from, date_to) не короче min_nights
+
+    periods - занятые (date_start, date_end) одного номера по возрастанию
+    date_start, просматриваются один раз.
+    """
+    min_length = timedelta(days=min_nights)
+    windows = []
+    cursor = date_from
+    for date_start, date_end in periods:
+        if date_start >= date_to:
+            break
+        if date_end <= cursor:
+            continue
+        if date_start - cursor >= min_length:
+            windows.append((cursor, date_start))
+        cursor = date_end
+    if date_to - cursor >= min_length:
+        windows.append((cursor, date_to))
+    return windows
+
+
+class IntervalIndex:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.rooms = {}
+        # счётчик изменений номера: загрузка, начатая до изменения, не сохраняется
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def load(self, room_ids):
+        """Периоды номеров room_ids одним запросом"""
+        from .models import Booking
+
+        with self.lock:
+            generations = {room_id: self.generations.get(room_id, 0) for room_id in room_ids}
+        rows = defaultdict(list)
+        for room_id, *row in (
+            Booking.objects.filter(room_id__in=room_ids)
+            .order_by('room_id', 'date_start')
+            .values_list('room_id', 'id', 'date_start', 'date_end')
+        ):
+            rows[room_id].append(row)
+        loaded_at = time.monotonic()
+        loaded = {room_id: RoomIntervals(rows[room_id], loaded_at) for room_id in room_ids}
+        with self.lock:
+            for room_id, intervals in loaded.items():
+                if self.generations.get(room_id, 0) == generations[room_id]:
+                    self.rooms[room_id] = intervals
+        return loaded
+
+    def get_many(self, room_ids):
+        """{room_id: RoomIntervals}; недостающие и устаревшие номера загружаются пачками"""
+        now = time.monotonic()
+        result = {}
+        missing = []
+        for room_id in room_ids:
+            intervals = self.rooms.get(room_id)
+            if intervals is None or now - intervals.loaded_at > self.ttl:
+                missing.append(room_id)
+            else:
+                result[room_id] = intervals
+        for offset in range(0, len(missing), LOAD_CHUNK_SIZE):
+            result.update(self.load(missing[offset:offset + LOAD_CHUNK_SIZE]))
+        return result
+
+    def get(self, room_id):
+        return self.get_many([room_id])[room_id]
+
+    def is_available(self, room_id, date_start, date_end):
+        return room_id in self.available([room_id], date_start, date_end)
+
+    def available(self, room_ids, date_start, date_end):
+        """Множество номеров из room_ids, свободных на период"""
+        rooms = self.get_many(room_ids)
+        with self.lock:
+            return {
+                room_id for room_id, intervals in rooms.items()
+                if not intervals.overlaps(date_start, date_end)
+            }
+
+    def free_windows(self, room_id, date_from, date_to, min_nights=1):
+        return self.free_windows_many([room_id], date_from, date_to, min_nights)[room_id]
+
+    def free_windows_many(self, room_ids, date_from, date_to, min_nights=1):
+        """{room_id: свободные окна}, см. RoomIntervals.free_windows"""
+        rooms = self.get_many(room_ids)
+        with self.lock:
+            return {
+                room_id: intervals.free_windows(date_from, date_to, min_nights)
+                for room_id, intervals in rooms.items()
+            }
+
+    def touch(self, room_id):
+        self.generations[room_id] = self.generations.get(room_id, 0) + 1
+        return self.rooms.get(room_id)
+
+    def booking_added(self, booking_id, room_id, date_start, date_end):
+        with self.lock:
+            intervals = self.touch(room_id)
+            if intervals is not None:
+                intervals.add(booking_id, date_start, date_end)
+
+    def booking_removed(self, booking_id, room_id):
+        with self.lock:
+            intervals = self.touch(room_id)
+            if intervals is not None:
+                intervals.remove(booking_id)
+
+    def invalidate(self, room_id):
+        with self.lock:
+            self.touch(room_id)
+            self.rooms.pop(room_id, None)
+
+    def clear(self):
+        with self.lock:
+            for room_id in list(self.rooms):
+                self.touch(room_id)
+            self.rooms.clear()
+
+    # значения берутся сразу: после delete() у instance уже нет id
+    def on_booking_saved(self, sender, instance, created, **kwargs):
+        booking_id, room_id = instance.id, instance.room_id
+        if created:
+            date_start, date_end = instance.date_start, instance.date_end
+            transaction.on_commit(
+                lambda: self.booking_added(booking_id, room_id, date_start, date_end)
+            )
+        else:
+            transaction.on_commit(lambda: self.invalidate(room_id))
+
+    def on_booking_deleted(self, sender, instance, **kwargs):
+        booking_id, room_id = instance.id, instance.room_id
+        transaction.on_commit(lambda: self.booking_removed(booking_id, room_id))
+
+    def on_room_deleted(self, sender, instance, **kwargs):
+        room_id = instance.id
+        transaction.on_commit(lambda: self.invalidate(room_id))
+
+    def connect(self):
+        # обработчик post_delete у Booking отключает быстрое каскадное удаление,
+        # поэтому сигналы подключаются только при включённом индексе
+        post_save.connect(self.on_booking_saved, sender='bookings.Booking')
+        post_delete.connect(self.on_booking_deleted, sender='bookings.Booking')
+        post_delete.connect(self.on_room_deleted, sender='rooms.Room')
+
+    def disconnect(self):
+        post_save.disconnect(self.on_booking_saved, sender='bookings.Booking')
+        post_delete.disconnect(self.on_booking_deleted, sender='bookings.Booking')
+        post_delete.disconnect(self.on_room_deleted, sender='rooms.Room')
+
+
+def build_index():
+    options = {**DEFAULTS, **getattr(settings, 'BOOKING_INTERVAL_INDEX', {})}
+    if not options['ENABLED']:
+        return None
+    return IntervalIndex(options['TTL'])
+
+
+interval_index = build_index()
@@ -0,0 +1,239 @@
+"""
+Очередь фоновых задач в базе для побочных действий записи
+
+Побочное действие записи - событие, которое место записи публикует
+после коммита (publish_on_commit), и его обработчик, зарегистрированный
+декоратором @handler(имя события); обработчик получает payload (словарь,
+пригодный для JSON). Создание и удаление броней и номеров всегда
+публикуют события EVENTS (booking.created, booking.deleted,
+room.created, room.deleted), на которые подписываются интеграции;
+сводка аналитики пересчитывается по analytics.refresh
+(bookings/analytics.py). Событие, на которое никто не подписан, не
+публикуется и ничего не стоит: ни задачи в jobs, ни вызова после
+коммита. Имя, которого нет ни в EVENTS, ни среди обработчиков, - ошибка
+при публикации (опечатка в месте записи), а не тихий пропуск.
+
+При JOB_QUEUE['ENABLED'] событие - строка таблицы jobs, которую
+выполняет manage.py run_worker, и время ответа не зависит от стоимости
+обработчиков. Иначе обработчики выполняются сразу после коммита, в
+запросе.
+
+Воркер берёт пачку готовых задач (run_at <= now):
+- на PostgreSQL - SELECT ... FOR UPDATE SKIP LOCKED в транзакции, так что
+  несколько воркеров не ждут друг друга и не берут одну задачу дважды;
+- на базах без SKIP LOCKED (SQLite) - одним UPDATE помечает пачку своей
+  меткой и сдвигает run_at на LEASE секунд; задачи упавшего воркера
+  вернутся в очередь по истечении аренды.
+Каждая задача выполняется в своей точке сохранения. Выполненные задачи
+удаляются, упавшие откладываются с экспоненциальной задержкой, после
+MAX_ATTEMPTS попыток задача остаётся в таблице с failed_at. Обработчики
+должны допускать повторное выполнение.
+"""
+
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Job
+
+DEFAULTS = {
+    'ENABLED': False,
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 10,
+    'LEASE': 300,
+}
+
+MAX_RETRY_DELAY = 60 * 60
+
+# события записей, которые публикуются всегда, даже без обработчиков
+EVENTS = frozenset({'booking.created', 'booking.deleted', 'room.created', 'room.deleted'})
+
+# имя события -> обработчики
+handlers = defaultdict(list)
+
+
+def handler(name):
+    """Декоратор обработчика события name: func(payload)"""
+    def register(func):
+        handlers[name].append(func)
+        return func
+    return register
+
+
+def check_handlers(name):
+    if not handlers[name]:
+        raise LookupError(f"Нет обработчиков события {name}")
+
+
+def subscribed(events):
+    """Те из (имя, payload), на которые есть обработчики"""
+    result = []
+    for name, payload in events:
+        if handlers.get(name):
+            result.append((name, payload))
+        elif name not in EVENTS:
+            raise LookupError(f"Неизвестное событие {name}")
+    return result
+
+
+def run_handlers(name, payload):
+    check_handlers(name)
+    for func in handlers[name]:
+        func(payload)
+
+
+class JobQueue:
+    def __init__(self, batch_size, max_attempts, retry_delay, lease):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+
+    def enqueue(self, events):
+        Job.objects.bulk_create([Job(name=name, payload=payload) for name, payload in events])
+
+    def ready(self, now):
+        return Job.objects.filter(failed_at__isnull=True, run_at__lte=now).order_by('run_at', 'id')
+
+    def claim(self, now):
+        """Пачка задач под арендой воркера, для баз без SKIP LOCKED"""
+        token = uuid.uuid4().hex
+        lease_until = now + timedelta(seconds=self.lease)
+        Job.objects.filter(
+            id__in=self.ready(now).values('id')[:self.batch_size]
+        ).update(worker=token, run_at=lease_until)
+        return list(
+            Job.objects.filter(failed_at__isnull=True, run_at=lease_until, worker=token).order_by('id')
+        )
+
+    def run_batch(self):
+        """Выполняет одну пачку задач, возвращает (выполнено, с ошибкой)"""
+        now = timezone.now()
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                jobs = list(self.ready(now).select_for_update(skip_locked=True)[:self.batch_size])
+                return self.process(jobs)
+        return self.process(self.claim(now))
+
+    def process(self, jobs):
+        done = []
+        failed = []
+        for job in jobs:
+            try:
+                with transaction.atomic():
+                    run_handlers(job.name, job.payload)
+            except Exception as e:
+                self.retry_later(job, e)
+                failed.append(job)
+            else:
+                done.append(job.id)
+        if done:
+            Job.objects.filter(id__in=done).delete()
+        if failed:
+            Job.objects.bulk_update(failed, ['attempts', 'last_error', 'worker', 'run_at', 'failed_at'])
+        return len(done), len(failed)
+
+    def retry_later(self, job, error):
+        job.attempts += 1
+        job.last_error = f'{type(error).__name__}: {error}'
+        job.worker = ''
+        if job.attempts >= self.max_attempts:
+            job.failed_at = timezone.now()
+        else:
+            delay = min(self.retry_delay * 2 ** (job.attempts - 1), MAX_RETRY_DELAY)
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+
+    def stats(self):
+        """Число задач в очереди и отменённых после всех попыток"""
+        return Job.objects.aggregate(
+            pending=Count('id', filter=Q(failed_at__isnull=True)),
+            failed=Count('id', filter=Q(failed_at__isnull=False)),
+        )
+
+    def work(self, poll_interval, once=False, report=None, report_interval=10):
+        """
+        Цикл воркера: пачка за пачкой, при пустой очереди - пауза
+        poll_interval секунд (с once - выход). report(totals) вызывается
+        не чаще раза в report_interval секунд и в конце.
+        """
+        totals = {"done": 0, "failed": 0, "busy_seconds": 0.0}
+        reported = time.monotonic()
+        try:
+            while True:
+                started = time.monotonic()
+                done, failed = self.run_batch()
+                totals["done"] += done
+                totals["failed"] += failed
+                if done or failed:
+                    totals["busy_seconds"] += time.monotonic() - started
+                elif once:
+                    break
+                else:
+                    time.sleep(poll_interval)
+                if report is not None and time.monotonic() - reported >= report_interval:
+                    report(totals)
+                    reported = time.monotonic()
+        finally:
+            if report is not None:
+                report(totals)
+        return totals
+
+
+def queue_options():
+    return {**DEFAULTS, **getattr(settings, 'JOB_QUEUE', {})}
+
+
+def build_queue():
+    options = queue_options()
+    if not options['ENABLED']:
+        return None
+    return JobQueue(options['BATCH_SIZE'], options['MAX_ATTEMPTS'], options['RETRY_DELAY'], options['LEASE'])
+
+
+job_queue = build_queue()
+
+
+def publish(events):
+    """
+    events - (имя, payload): строки jobs при включённой очереди, иначе
+    обработчики выполняются сразу
+    """
+    events = subscribed(events)
+    if not events:
+        return
+    if job_queue is not None:
+        job_queue.enqueue(events)
+        return
+    for name, payload in events:
+        run_handlers(name, payload)
+
+
+def publish_on_commit(events):
+    # ошибка в имени события видна в месте записи, а не после коммита
+    events = subscribed(events)
+    if events:
+        transaction.on_commit(lambda: publish(events))
+
+
+async def apublish(events):
+    """publish для асинхронных представлений (вне транзакции)"""
+    events = subscribed(events)
+    if events:
+        await sync_to_async(publish)(events)
+
+
+def booking_event(booking):
+    return {
+        "booking_id": booking.id,
+        "room_id": booking.room_id,
+        "date_start": booking.date_start.isoformat(),
+        "date_end": booking.date_end.isoformat(),
+    }
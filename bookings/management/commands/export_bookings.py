@@ -0,0 +1,60 @@
+"""
+manage.py export_bookings --format csv --from 2025-01-01 --to 2025-02-01 -o bookings.csv.gz --gzip
+"""
+
+import sys
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.export import EXPORT_CHUNK_SIZE, FORMATS, export_queryset, export_stream, write_parquet
+
+
+class Command(BaseCommand):
+    help = "Выгружает бронирования с данными номера в CSV, JSONL или Parquet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=[*FORMATS, 'parquet'], default='csv')
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat,
+                            help="даты заезда с (включительно)")
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat,
+                            help="даты заезда по (не включая)")
+        parser.add_argument('-o', '--output', default='-', help="файл или - для stdout")
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = export_queryset(options['date_from'], options['date_to'])
+        started = time.perf_counter()
+
+        if options['format'] == 'parquet':
+            if options['output'] == '-' or options['gzip']:
+                raise CommandError("parquet пишется только в файл и без --gzip")
+            try:
+                rows = write_parquet(queryset, options['output'], options['chunk_size'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.report(rows, started)
+            return
+
+        counts = []
+        chunks = export_stream(
+            queryset, options['format'], options['gzip'], options['chunk_size'], on_chunk=counts.append
+        )
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        self.report(sum(counts), started)
+
+    def report(self, rows, started):
+        seconds = time.perf_counter() - started
+        self.stderr.write(
+            f"Выгружено строк: {rows}, {seconds:.2f} с, "
+            f"{round(rows / seconds) if seconds else 0} строк/с"
+        )
@@ -0,0 +1,73 @@
+"""
+manage.py import_bookings bookings.csv
+manage.py import_bookings - --format jsonl < bookings.jsonl
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.importer import (
+    CHUNK_SIZE,
+    FORMATS,
+    READERS,
+    BookingImporter,
+    ImportRowError,
+    detect_format,
+    open_input,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает бронирования из CSV (заголовок room_id,date_start,date_end) "
+        "или JSONL пачками через COPY/bulk_create. Строки в отчёте об ошибках "
+        "нумеруются с 1 без заголовка"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="файл или - для stdin")
+        parser.add_argument('--format', choices=FORMATS, help="по умолчанию по расширению файла")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--method', choices=['auto', 'copy', 'bulk'], default='auto')
+        parser.add_argument(
+            '--strict', action='store_true',
+            help="отменить весь импорт при первой неверной строке"
+        )
+
+    def handle(self, *args, **options):
+        output_format = options['format'] or detect_format(options['path'])
+        try:
+            importer = BookingImporter(
+                method=options['method'],
+                chunk_size=options['chunk_size'],
+                strict=options['strict'],
+                on_chunk=self.progress if options['verbosity'] > 1 else None,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        try:
+            stream = open_input(options['path'], sys.stdin)
+        except OSError as e:
+            raise CommandError(f"Не удалось открыть {options['path']}: {e}")
+
+        try:
+            stats = importer.run(READERS[output_format](stream))
+        except ImportRowError as e:
+            raise CommandError(f"{e}. Импорт отменён")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for line, message in stats.errors:
+            self.stderr.write(f"Строка {line}: {message}")
+        if stats.rejected > len(stats.errors):
+            self.stderr.write(f"... и ещё {stats.rejected - len(stats.errors)} ошибок")
+        self.stdout.write(
+            f"Строк: {stats.rows}, загружено: {stats.imported}, отклонено: {stats.rejected}, "
+            f"{stats.seconds:.2f} с, {stats.rows_per_second} строк/с ({importer.method})"
+        )
+
+    def progress(self, stats):
+        self.stdout.write(f"... {stats.rows} строк, загружено {stats.imported}")
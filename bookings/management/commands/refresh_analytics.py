@@ -0,0 +1,26 @@
+"""
+manage.py refresh_analytics [--room 1 --room 2]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.analytics import REFRESH_CHUNK_SIZE, refresh_all, refresh_many
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает сводку ночей по номерам и месяцам (ANALYTICS_SUMMARY)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room', dest='rooms', type=int, action='append',
+                            help="пересчитать только эти номера")
+        parser.add_argument('--chunk-size', type=int, default=REFRESH_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['rooms']:
+            count = refresh_many(options['rooms'], options['chunk_size'])
+        else:
+            count = refresh_all(options['chunk_size'])
+        self.stdout.write(f"Номеров пересчитано: {count}, {time.perf_counter() - started:.2f} с")
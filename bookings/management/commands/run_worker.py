@@ -0,0 +1,46 @@
+"""
+manage.py run_worker [--once] [--batch-size 100] [--poll-interval 1]
+"""
+
+from django.core.management.base import BaseCommand
+
+from bookings.jobs import JobQueue, queue_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет фоновые задачи из таблицы jobs (JOB_QUEUE) и печатает "
+        "пропускную способность"
+    )
+
+    def add_arguments(self, parser):
+        options = queue_options()
+        parser.add_argument('--once', action='store_true', help="выйти, когда очередь опустеет")
+        parser.add_argument('--batch-size', type=int, default=options['BATCH_SIZE'])
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="пауза при пустой очереди, секунды")
+        parser.add_argument('--report-interval', type=float, default=10.0,
+                            help="как часто печатать статистику, секунды")
+
+    def handle(self, *args, **options):
+        settings = queue_options()
+        self.queue = JobQueue(
+            options['batch_size'], settings['MAX_ATTEMPTS'], settings['RETRY_DELAY'], settings['LEASE']
+        )
+        try:
+            self.queue.work(
+                options['poll_interval'],
+                once=options['once'],
+                report=self.report,
+                report_interval=options['report_interval'],
+            )
+        except KeyboardInterrupt:
+            pass
+
+    def report(self, totals):
+        busy = totals['busy_seconds']
+        rate = (totals['done'] + totals['failed']) / busy if busy else 0
+        self.stdout.write(
+            f"Задач выполнено: {totals['done']}, с ошибкой: {totals['failed']}, "
+            f"{rate:.0f} задач/с, в очереди: {self.queue.stats()['pending']}"
+        )
@@ -0,0 +1,71 @@
+"""
+manage.py seed --rooms 100000 --bookings-per-room 20
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bookings.importer import CHUNK_SIZE, chunked, insert_bookings, invalidate_caches, resolve_method
+from rooms.models import Room
+
+
+def generate_bookings(room_ids, per_room, start, rnd):
+    """per_room непересекающихся броней на номер подряд от start с паузами 0-4 дня"""
+    for room_id in room_ids:
+        day = start
+        for _ in range(per_room):
+            day += timedelta(days=rnd.randrange(0, 5))
+            end = day + timedelta(days=rnd.randrange(1, 8))
+            yield room_id, day, end
+            day = end
+
+
+class Command(BaseCommand):
+    help = "Создаёт номера и непересекающиеся брони для нагрузочных данных"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=1000)
+        parser.add_argument('--bookings-per-room', type=int, default=10)
+        parser.add_argument('--start', type=date.fromisoformat, help="первая дата броней, по умолчанию завтра")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--method', choices=['auto', 'copy', 'bulk'], default='auto')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            method = resolve_method(options['method'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        rnd = random.Random(options['seed'])
+        chunk_size = options['chunk_size']
+        start = options['start'] or date.today() + timedelta(days=1)
+
+        started = time.perf_counter()
+        room_ids = []
+        for offset in range(0, options['rooms'], chunk_size):
+            rooms = Room.objects.bulk_create([
+                Room(description=f"Номер {offset + i + 1}", price=rnd.randrange(1000, 20000))
+                for i in range(min(chunk_size, options['rooms'] - offset))
+            ])
+            room_ids.extend(room.id for room in rooms)
+        rooms_seconds = time.perf_counter() - started
+
+        bookings = 0
+        rows = generate_bookings(room_ids, options['bookings_per_room'], start, rnd)
+        for chunk in chunked(rows, chunk_size):
+            with transaction.atomic():
+                insert_bookings(chunk, method)
+            bookings += len(chunk)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"... {bookings} броней")
+        seconds = time.perf_counter() - started
+        invalidate_caches(room_ids)
+
+        self.stdout.write(
+            f"Номеров: {len(room_ids)} ({rooms_seconds:.2f} с), броней: {bookings}, "
+            f"{seconds:.2f} с, {round((len(room_ids) + bookings) / seconds) if seconds else 0} строк/с ({method})"
+        )
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+# Ограничение только для PostgreSQL: на SQLite брони сериализуются
+# блокировкой записи в bookings.services.create_booking
+CREATE_CONSTRAINT = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE bookings ADD CONSTRAINT bookings_no_overlap
+    EXCLUDE USING gist (
+        room_id WITH =,
+        daterange(date_start, date_end, '[)') WITH &&
+    );
+"""
+
+DROP_CONSTRAINT = """
+ALTER TABLE bookings DROP CONSTRAINT IF EXISTS bookings_no_overlap;
+"""
+
+
+def add_no_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_CONSTRAINT)
+
+
+def remove_no_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_no_overlap_constraint, remove_no_overlap_constraint),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0003_booking_room_dates_index"),
+        ("rooms", "0003_room_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoomMonthStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(verbose_name="Месяц")),
+                (
+                    "nights",
+                    models.PositiveIntegerField(default=0, verbose_name="Ночей"),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="month_stats",
+                        to="rooms.room",
+                        verbose_name="Номер",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сводка номера за месяц",
+                "verbose_name_plural": "Сводки номеров по месяцам",
+                "db_table": "room_month_stats",
+                "indexes": [
+                    models.Index(fields=["month"], name="room_month_stats_month_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("room", "month"),
+                        name="room_month_stats_room_month_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
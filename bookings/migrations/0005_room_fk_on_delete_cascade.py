@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+# Только для PostgreSQL: внешние ключи броней и сводки на rooms получают
+# ON DELETE CASCADE, и rooms.views.delete_room_with_bookings удаляет номер
+# одним DELETE. Каскад Django (on_delete=CASCADE в моделях) остаётся для
+# других баз и для удаления с подключёнными сигналами.
+TABLES = ["bookings", "room_month_stats"]
+
+FIND_CONSTRAINTS = """
+SELECT conname FROM pg_constraint
+WHERE conrelid = %s::regclass AND confrelid = 'rooms'::regclass AND contype = 'f'
+"""
+
+REPLACE_CONSTRAINT = """
+ALTER TABLE {table} DROP CONSTRAINT {name},
+    ADD CONSTRAINT {name} FOREIGN KEY (room_id) REFERENCES rooms (id)
+    {on_delete} DEFERRABLE INITIALLY DEFERRED;
+"""
+
+
+def replace_room_constraints(schema_editor, on_delete):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(FIND_CONSTRAINTS, [table])
+            for (name,) in cursor.fetchall():
+                schema_editor.execute(
+                    REPLACE_CONSTRAINT.format(
+                        table=quote(table), name=quote(name), on_delete=on_delete
+                    )
+                )
+
+
+def add_on_delete_cascade(apps, schema_editor):
+    replace_room_constraints(schema_editor, "ON DELETE CASCADE")
+
+
+def remove_on_delete_cascade(apps, schema_editor):
+    replace_room_constraints(schema_editor, "")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0004_room_month_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_on_delete_cascade, remove_on_delete_cascade),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0006_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotentRequest",
+            fields=[
+                (
+                    "key",
+                    models.CharField(
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Ключ",
+                    ),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(max_length=64, verbose_name="Отпечаток запроса"),
+                ),
+                (
+                    "status",
+                    models.PositiveSmallIntegerField(
+                        blank=True, null=True, verbose_name="Код ответа"
+                    ),
+                ),
+                (
+                    "content_type",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Тип ответа"
+                    ),
+                ),
+                (
+                    "content",
+                    models.BinaryField(
+                        blank=True, null=True, verbose_name="Тело ответа"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Действует до"),
+                ),
+            ],
+            options={
+                "verbose_name": "Идемпотентный запрос",
+                "verbose_name_plural": "Идемпотентные запросы",
+                "db_table": "idempotent_requests",
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0007_idempotent_request"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ListVersion",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Список",
+                    ),
+                ),
+                ("version", models.CharField(max_length=32, verbose_name="Метка")),
+                ("changed_at", models.DateTimeField(verbose_name="Дата изменения")),
+            ],
+            options={
+                "verbose_name": "Версия списка",
+                "verbose_name_plural": "Версии списков",
+                "db_table": "list_version_stamps",
+            },
+        ),
+    ]
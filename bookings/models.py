@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from datetime import date
 
 class Booking(models.Model):
@@ -18,9 +19,16 @@ class Booking(models.Model):
         verbose_name = 'Бронирование'
         verbose_name_plural = 'Бронирования'
         ordering = ['date_start']
+        indexes = [
+            # проверка пересечений и список броней номера
+            models.Index(
+                fields=['room', 'date_start', 'date_end'],
+                name='bookings_room_dates_idx'
+            ),
+        ]
     
     def __str__(self):
-        return f"Бронь {self.id}: Номер {self.room.id} с {self.date_start} по {self.date_end}"
+        return f"Бронь {self.id}: Номер {self.room_id} с {self.date_start} по {self.date_end}"
     
     def clean(self):
         errors = []
@@ -40,6 +48,11 @@ class Booking(models.Model):
         super().save(*args, **kwargs)
     
     def check_availability(self):
+        from .intervals import interval_index
+
+        if interval_index is not None and self.pk is None:
+            return interval_index.is_available(self.room_id, self.date_start, self.date_end)
+
         overlapping_bookings = Booking.objects.filter(
             room=self.room,
             date_start__lt=self.date_end,
@@ -52,4 +65,103 @@ class Booking(models.Model):
         return not overlapping_bookings.exists()
     
     def get_duration_days(self):
-        return (self.date_end - self.date_start).days
\ No newline at end of file
+        return (self.date_end - self.date_start).days
+
+class RoomMonthStats(models.Model):
+    """
+    Сводка занятых ночей номера за месяц для /analytics/* (см.
+    bookings.analytics). Ведётся, только если включена настройка
+    ANALYTICS_SUMMARY['ENABLED'].
+    """
+    room = models.ForeignKey(
+        'rooms.Room',
+        on_delete=models.CASCADE,
+        related_name='month_stats',
+        verbose_name="Номер"
+    )
+    month = models.DateField(verbose_name="Месяц")
+    nights = models.PositiveIntegerField(default=0, verbose_name="Ночей")
+    
+    class Meta:
+        db_table = 'room_month_stats'
+        verbose_name = 'Сводка номера за месяц'
+        verbose_name_plural = 'Сводки номеров по месяцам'
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'month'], name='room_month_stats_room_month_uniq'),
+        ]
+        indexes = [
+            # отчёт за период по всем номерам
+            models.Index(fields=['month'], name='room_month_stats_month_idx'),
+        ]
+
+class Job(models.Model):
+    """
+    Отложенная задача очереди (см. bookings.jobs): событие name с
+    данными payload для обработчиков, выполняемых manage.py run_worker.
+    Выполненные задачи удаляются, провалившие все попытки остаются с
+    failed_at.
+    """
+    name = models.CharField(max_length=100, verbose_name="Событие")
+    payload = models.JSONField(default=dict, verbose_name="Данные")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Выполнить после")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Неудачных попыток")
+    worker = models.CharField(max_length=32, blank=True, verbose_name="Воркер")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    failed_at = models.DateTimeField(null=True, blank=True, verbose_name="Отменена")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    
+    class Meta:
+        db_table = 'jobs'
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            # выборка готовых к выполнению задач
+            models.Index(
+                fields=['run_at', 'id'],
+                name='jobs_pending_idx',
+                condition=models.Q(failed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Задача {self.id}: {self.name}"
+
+
+class ListVersion(models.Model):
+    """
+    Версия списка для условных GET (см. hotel_booking.versions): метка
+    меняется при каждом изменении номеров или броней списка
+    """
+    name = models.CharField(max_length=100, primary_key=True, verbose_name="Список")
+    version = models.CharField(max_length=32, verbose_name="Метка")
+    changed_at = models.DateTimeField(verbose_name="Дата изменения")
+
+    class Meta:
+        db_table = 'list_version_stamps'
+        verbose_name = 'Версия списка'
+        verbose_name_plural = 'Версии списков'
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
+
+
+class IdempotentRequest(models.Model):
+    """
+    Ключ Idempotency-Key и сохранённый ответ (см. hotel_booking.idempotency);
+    пока первый запрос выполняется, status пустой. Истёкшие ключи
+    удаляются по индексу expires_at.
+    """
+    key = models.CharField(max_length=64, primary_key=True, verbose_name="Ключ")
+    fingerprint = models.CharField(max_length=64, verbose_name="Отпечаток запроса")
+    status = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Код ответа")
+    content_type = models.CharField(max_length=255, blank=True, verbose_name="Тип ответа")
+    content = models.BinaryField(null=True, blank=True, verbose_name="Тело ответа")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Действует до")
+
+    class Meta:
+        db_table = 'idempotent_requests'
+        verbose_name = 'Идемпотентный запрос'
+        verbose_name_plural = 'Идемпотентные запросы'
+
+    def __str__(self):
+        return f"Ключ {self.key}"
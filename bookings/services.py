@@ -0,0 +1,253 @@
+import bisect
+from collections import defaultdict
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rooms.cache import room_list_cache
+from hotel_booking.versions import changed_on_commit
+from rooms.models import Room
+from .analytics import analytics_summary
+from .jobs import booking_event, publish_on_commit
+from .intervals import interval_index
+from .models import Booking
+
+# SQLSTATE нарушений ограничений в PostgreSQL
+EXCLUSION_VIOLATION = '23P01'
+FOREIGN_KEY_VIOLATION = '23503'
+
+
+class BookingConflict(Exception):
+    """Номер уже забронирован на пересекающийся период"""
+
+
+def is_overlap_violation(error):
+    return getattr(error.__cause__, 'pgcode', None) == EXCLUSION_VIOLATION
+
+
+def is_missing_room_violation(error):
+    return getattr(error.__cause__, 'pgcode', None) == FOREIGN_KEY_VIOLATION
+
+
+# Бронь вставляется, только если номер есть и период свободен
+INSERT_IF_AVAILABLE = """
+INSERT INTO bookings (room_id, date_start, date_end, created_at)
+SELECT id, %s, %s, %s FROM rooms
+WHERE id = %s AND NOT EXISTS (
+    SELECT 1 FROM bookings
+    WHERE room_id = %s AND date_start < %s AND date_end > %s
+)
+"""
+
+
+def insert_if_available(room_id, date_start, date_end, created_at):
+    """id новой брони или None, если номера нет или период занят"""
+    ops = connection.ops
+    start = ops.adapt_datefield_value(date_start)
+    end = ops.adapt_datefield_value(date_end)
+    params = [start, end, ops.adapt_datetimefield_value(created_at), room_id, room_id, end, start]
+    returning = connection.features.can_return_columns_from_insert
+    with connection.cursor() as cursor:
+        cursor.execute(INSERT_IF_AVAILABLE + ('RETURNING id' if returning else ''), params)
+        if returning:
+            row = cursor.fetchone()
+            return row[0] if row else None
+        return cursor.lastrowid if cursor.rowcount else None
+
+
+def create_booking(room_id, date_start, date_end):
+    """
+    Создание бронирования без двойных броней при конкурентных запросах
+
+    Даты проверяются в Python (Booking.clean), а существование номера и
+    свободность периода - в самом INSERT ... SELECT ... WHERE NOT EXISTS,
+    так что удачное создание - один запрос. Второй запрос нужен только
+    при отказе, чтобы отличить отсутствующий номер от занятого периода.
+
+    Проверка и вставка - одна инструкция: на SQLite записи идут по
+    очереди под блокировкой базы, на PostgreSQL пересечение, вставленное
+    конкурентной транзакцией после проверки NOT EXISTS, отклонит
+    ограничение bookings_no_overlap (см. миграцию 0002), а номер,
+    удалённый конкурентной транзакцией, - внешний ключ.
+
+    Исключения:
+    - Room.DoesNotExist: номер не найден
+    - ValidationError: неверные даты
+    - BookingConflict: период пересекается с существующей бронью
+    """
+    created_at = timezone.now()
+    Booking(room_id=room_id, date_start=date_start, date_end=date_end).clean()
+
+    try:
+        with transaction.atomic():
+            booking_id = insert_if_available(room_id, date_start, date_end, created_at)
+            if booking_id is None:
+                if not Room.objects.filter(id=room_id).exists():
+                    raise Room.DoesNotExist("Номер не найден")
+                raise BookingConflict()
+
+            booking = Booking.from_db(
+                connection.alias,
+                ['id', 'room_id', 'date_start', 'date_end', 'created_at'],
+                [booking_id, room_id, date_start, date_end, created_at]
+            )
+            bookings_inserted([booking])
+    except IntegrityError as e:
+        if is_overlap_violation(e):
+            raise BookingConflict() from e
+        if is_missing_room_violation(e):
+            raise Room.DoesNotExist("Номер не найден") from e
+        raise
+
+    return booking
+
+
+def bookings_inserted(bookings):
+    """
+    Побочные действия для броней, вставленных мимо save() (INSERT ...
+    SELECT в create_booking, bulk_create): кэш и версии списков, индекс
+    занятости, сводка аналитики и событие booking.created - то, что для
+    save() делают обработчики post_save. Вызывается в транзакции вставки,
+    всё выполняется после коммита. Сам post_save не отправляется: его
+    обработчики вправе ждать настоящего save().
+    """
+    room_list_cache.invalidate_on_commit()
+    changed_on_commit({b.room_id for b in bookings})
+    if interval_index is not None:
+        transaction.on_commit(lambda: [
+            interval_index.booking_added(b.id, b.room_id, b.date_start, b.date_end)
+            for b in bookings
+        ])
+    if analytics_summary is not None:
+        analytics_summary.bookings_changed([(b.room_id, b.date_start, b.date_end) for b in bookings])
+    publish_on_commit(('booking.created', booking_event(b)) for b in bookings)
+
+
+def conflict_message(date_start, date_end):
+    return f"Номер уже забронирован на период с {date_start} по {date_end}"
+
+
+def reserve(intervals, date_start, date_end):
+    """
+    Добавляет период в отсортированный список непересекающихся
+    (date_start, date_end), если он не пересекается с уже занятыми.
+    """
+    i = bisect.bisect_left(intervals, (date_start,))
+    if i > 0 and intervals[i - 1][1] > date_start:
+        return False
+    if i < len(intervals) and intervals[i][0] < date_end:
+        return False
+    intervals.insert(i, (date_start, date_end))
+    return True
+
+
+def bulk_create_bookings(items, atomic=True):
+    """
+    Пакетное создание бронирований
+
+    items - список (room_id, date_start, date_end). Все затронутые номера
+    блокируются одним запросом, занятость проверяется одним запросом по
+    всем номерам сразу (с учётом броней из этого же пакета), вставка идёт
+    одним bulk_create.
+
+    create_booking номера не блокирует, так что между проверкой и вставкой
+    может появиться пересекающаяся бронь; тогда на PostgreSQL bulk_create
+    отклонит ограничение bookings_no_overlap, и пакет вставляется по одной
+    брони (insert_each): конфликт становится ошибкой своего элемента, а не
+    всего пакета.
+
+    Возвращает (bookings, errors): bookings[i] - созданная бронь или None,
+    errors - {индекс: текст ошибки}. При atomic=True любая ошибка отменяет
+    весь пакет.
+    """
+    bookings = [None] * len(items)
+    errors = {}
+    candidates = []
+
+    for index, (room_id, date_start, date_end) in enumerate(items):
+        booking = Booking(room_id=room_id, date_start=date_start, date_end=date_end)
+        try:
+            booking.clean()
+        except ValidationError as e:
+            errors[index] = '; '.join(e.messages)
+            continue
+        candidates.append((index, booking))
+
+    if not candidates or (atomic and errors):
+        return bookings, errors
+
+    room_ids = {booking.room_id for _, booking in candidates}
+    accepted = []
+    with transaction.atomic():
+        existing_rooms = set(
+            Room.objects.select_for_update()
+            .filter(id__in=room_ids)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+        busy = defaultdict(list)
+        overlapping = Booking.objects.filter(
+            room_id__in=existing_rooms,
+            date_start__lt=max(b.date_end for _, b in candidates),
+            date_end__gt=min(b.date_start for _, b in candidates)
+        ).order_by('date_start').values_list('room_id', 'date_start', 'date_end')
+        for room_id, date_start, date_end in overlapping:
+            busy[room_id].append((date_start, date_end))
+
+        for index, booking in candidates:
+            if booking.room_id not in existing_rooms:
+                errors[index] = "Номер не найден"
+            elif not reserve(busy[booking.room_id], booking.date_start, booking.date_end):
+                errors[index] = conflict_message(booking.date_start, booking.date_end)
+            else:
+                accepted.append((index, booking))
+
+        if atomic and errors:
+            return bookings, errors
+
+        try:
+            with transaction.atomic():
+                created = Booking.objects.bulk_create([booking for _, booking in accepted])
+        except IntegrityError as e:
+            if not is_overlap_violation(e):
+                raise
+            accepted = insert_each(accepted, errors)
+            if atomic and errors:
+                transaction.set_rollback(True)
+                return bookings, errors
+            created = [booking for _, booking in accepted]
+        if created:
+            bookings_inserted(created)
+
+    for index, booking in accepted:
+        bookings[index] = booking
+    return bookings, errors
+
+
+def insert_each(candidates, errors):
+    """
+    Вставка (индекс, бронь) по одной, каждая в своей точке сохранения;
+    номера уже заблокированы, так что отказ - пересечение, оно пишется в
+    errors. Возвращает вставленные (индекс, бронь).
+    """
+    created_at = timezone.now()
+    inserted = []
+    for index, booking in candidates:
+        try:
+            with transaction.atomic():
+                booking_id = insert_if_available(
+                    booking.room_id, booking.date_start, booking.date_end, created_at
+                )
+        except IntegrityError as e:
+            if not is_overlap_violation(e):
+                raise
+            booking_id = None
+        if booking_id is None:
+            errors[index] = conflict_message(booking.date_start, booking.date_end)
+            continue
+        booking.id = booking_id
+        booking.created_at = created_at
+        booking._state.adding = False
+        booking._state.db = connection.alias
+        inserted.append((index, booking))
+    return inserted
@@ -1,7 +1,21 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import AsyncRequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rooms.models import Room
-from bookings.models import Booking
+from bookings.models import Booking, Job
+from bookings import analytics, async_views, services
+from bookings.intervals import IntervalIndex, RoomIntervals
+from bookings.jobs import JobQueue, publish, publish_on_commit
 from datetime import date, timedelta
+from unittest.mock import patch
 
 class BookingTests(TestCase):
     def setUp(self):
@@ -25,3 +39,868 @@ class BookingTests(TestCase):
         self.assertIsNotNone(b2.id)
 
 
+class CreateBookingServiceTests(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(description="Room for tests", price=20)
+        self.start = date.today() + timedelta(days=3)
+        self.end = self.start + timedelta(days=4)
+
+    def test_overlap_raises_conflict(self):
+        services.create_booking(self.room.id, self.start, self.end)
+        with self.assertRaises(services.BookingConflict):
+            services.create_booking(
+                self.room.id,
+                self.start + timedelta(days=1),
+                self.end + timedelta(days=1)
+            )
+        self.assertEqual(Booking.objects.filter(room=self.room).count(), 1)
+
+    def test_other_room_is_independent(self):
+        other = Room.objects.create(description="Other room", price=30)
+        services.create_booking(self.room.id, self.start, self.end)
+        b = services.create_booking(other.id, self.start, self.end)
+        self.assertEqual(b.room_id, other.id)
+
+    def test_missing_room(self):
+        with self.assertRaises(Room.DoesNotExist):
+            services.create_booking(0, self.start, self.end)
+
+    def test_room_deleted_concurrently(self):
+        # PostgreSQL: номер удалён между проверкой и вставкой - нарушение внешнего ключа
+        cause = type("ForeignKeyViolation", (Exception,), {"pgcode": services.FOREIGN_KEY_VIOLATION})()
+        error = IntegrityError("violates foreign key constraint")
+        error.__cause__ = cause
+        with patch("bookings.services.insert_if_available", side_effect=error):
+            response = self.client.post("/bookings/create", {
+                "room_id": self.room.id,
+                "date_start": self.start.isoformat(),
+                "date_end": self.end.isoformat(),
+            })
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["error"], "Номер не найден")
+
+    def test_view_translates_conflict(self):
+        data = {
+            "room_id": self.room.id,
+            "date_start": self.start.isoformat(),
+            "date_end": self.end.isoformat(),
+        }
+        first = self.client.post("/bookings/create", data)
+        self.assertEqual(first.status_code, 201)
+        second = self.client.post("/bookings/create", data)
+        self.assertEqual(second.status_code, 400)
+        self.assertIn("уже забронирован", second.json()["error"])
+
+
+class ListBookingsPaginationTests(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(description="Room for tests", price=20)
+        start = date.today() + timedelta(days=1)
+        for i in range(5):
+            Booking.objects.create(
+                room=self.room,
+                date_start=start + timedelta(days=i * 2),
+                date_end=start + timedelta(days=i * 2 + 1)
+            )
+
+    def test_pages(self):
+        first = self.client.get(
+            "/bookings/list", {"room_id": self.room.id, "limit": 3}
+        ).json()
+        self.assertEqual(len(first["results"]), 3)
+        second = self.client.get(
+            "/bookings/list",
+            {"room_id": self.room.id, "limit": 3, "cursor": first["next_cursor"]}
+        ).json()
+        self.assertEqual(len(second["results"]), 2)
+        self.assertIsNone(second["next_cursor"])
+        full = self.client.get("/bookings/list", {"room_id": self.room.id}).json()
+        self.assertEqual(first["results"] + second["results"], full)
+
+    def test_invalid_cursor_values(self):
+        import base64
+
+        for values in (["notadate", "1"], ["2030-01-01", "x"], [[1], "1"]):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(
+                "/bookings/list", {"room_id": self.room.id, "limit": 3, "cursor": cursor}
+            )
+            self.assertEqual(response.status_code, 400, values)
+
+    def test_stream(self):
+        response = self.client.get(
+            "/bookings/list", {"room_id": self.room.id, "stream": "1"}
+        )
+        body = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([b["duration_days"] for b in body], [1] * 5)
+
+
+def explain(queryset):
+    # на пустых тестовых таблицах PostgreSQL выбрал бы seq scan
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
+
+
+class BookingIndexUsageTests(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(description="Room for tests", price=20)
+        self.start = date.today() + timedelta(days=1)
+        self.end = self.start + timedelta(days=3)
+
+    def test_overlap_check_uses_room_dates_index(self):
+        booking = Booking(room=self.room, date_start=self.start, date_end=self.end)
+        plan = explain(Booking.objects.filter(
+            room=booking.room,
+            date_start__lt=booking.date_end,
+            date_end__gt=booking.date_start
+        ))
+        self.assertIn("bookings_room_dates_idx", plan)
+
+    def test_room_availability_uses_room_dates_index(self):
+        plan = explain(Room.objects.available(self.start, self.end))
+        self.assertIn("bookings_room_dates_idx", plan)
+
+    def test_list_bookings_uses_room_dates_index(self):
+        plan = explain(Booking.objects.filter(room=self.room).order_by("date_start", "id"))
+        self.assertIn("bookings_room_dates_idx", plan)
+
+
+class BulkCreateBookingsTests(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(description="Room for tests", price=20)
+        self.other = Room.objects.create(description="Other room", price=30)
+        self.start = date.today() + timedelta(days=1)
+
+    def item(self, room, offset, nights=2):
+        start = self.start + timedelta(days=offset)
+        return {
+            "room_id": room.id,
+            "date_start": start.isoformat(),
+            "date_end": (start + timedelta(days=nights)).isoformat(),
+        }
+
+    def post(self, items, mode=None):
+        url = "/bookings/bulk_create" + (f"?mode={mode}" if mode else "")
+        return self.client.post(url, json.dumps(items), content_type="application/json")
+
+    def test_atomic_creates_all(self):
+        items = [self.item(self.room, 0), self.item(self.room, 2), self.item(self.other, 0)]
+        # savepoint, lock, availability, savepoint, insert, release, release
+        with self.assertNumQueries(7):
+            response = self.post(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()["booking_ids"]), 3)
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def concurrent_conflict(self, items, mode=None):
+        """
+        Бронь, вставленная create_booking между проверкой занятости и
+        bulk_create: на PostgreSQL её отклоняет bookings_no_overlap
+        """
+        Booking.objects.create(room=self.room, date_start=self.start, date_end=self.start + timedelta(days=1))
+        cause = Exception("conflicting key value violates exclusion constraint")
+        cause.pgcode = services.EXCLUSION_VIOLATION
+        error = IntegrityError()
+        error.__cause__ = cause
+        with patch("bookings.services.reserve", return_value=True), \
+                patch.object(Booking.objects, "bulk_create", side_effect=error):
+            return self.post(items, mode)
+
+    def test_concurrent_conflict_fails_only_its_item(self):
+        response = self.concurrent_conflict([self.item(self.room, 0), self.item(self.other, 0)], "partial")
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertIn("error", results[0])
+        self.assertIn("booking_id", results[1])
+        self.assertTrue(Booking.objects.filter(pk=results[1]["booking_id"], room=self.other).exists())
+
+    def test_concurrent_conflict_in_atomic_mode(self):
+        response = self.concurrent_conflict([self.item(self.other, 0), self.item(self.room, 0)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.json()["errors"]], [1])
+        self.assertFalse(Booking.objects.filter(room=self.other).exists())
+
+    def test_atomic_rolls_back_on_conflict_inside_batch(self):
+        response = self.post([self.item(self.room, 0), self.item(self.room, 1)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e["index"] for e in response.json()["errors"]], [1])
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_partial_reports_per_item(self):
+        services.create_booking(self.room.id, self.start, self.start + timedelta(days=2))
+        items = [
+            self.item(self.room, 1),
+            self.item(self.other, 0),
+            {"room_id": 0, "date_start": "2100-01-01", "date_end": "2100-01-02"},
+            {"room_id": self.other.id, "date_start": "bad", "date_end": "2100-01-02"},
+        ]
+        response = self.post(items, mode="partial")
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertIn("уже забронирован", results[0]["error"])
+        self.assertIn("booking_id", results[1])
+        self.assertEqual(results[2]["error"], "Номер не найден")
+        self.assertIn("YYYY-MM-DD", results[3]["error"])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_invalid_body(self):
+        self.assertEqual(self.post({"room_id": 1}).status_code, 400)
+        self.assertEqual(self.post([], mode="partial").status_code, 400)
+        self.assertEqual(self.post([self.item(self.room, 0)], mode="all").status_code, 400)
+
+
+class RoomIntervalsTests(TestCase):
+    def setUp(self):
+        self.day = date(2030, 1, 1)
+        d = lambda n: self.day + timedelta(days=n)
+        self.intervals = RoomIntervals([(1, d(2), d(4)), (2, d(4), d(5)), (3, d(8), d(10))], 0)
+        self.d = d
+
+    def test_overlaps(self):
+        d = self.d
+        self.assertFalse(self.intervals.overlaps(d(0), d(2)))
+        self.assertTrue(self.intervals.overlaps(d(3), d(4)))
+        self.assertFalse(self.intervals.overlaps(d(5), d(8)))
+        self.assertTrue(self.intervals.overlaps(d(7), d(9)))
+        self.assertFalse(self.intervals.overlaps(d(10), d(20)))
+
+    def test_free_windows(self):
+        d = self.d
+        self.assertEqual(
+            self.intervals.free_windows(d(0), d(12)),
+            [(d(0), d(2)), (d(5), d(8)), (d(10), d(12))]
+        )
+        self.assertEqual(self.intervals.free_windows(d(3), d(12), min_nights=3), [(d(5), d(8))])
+
+    def test_add_and_remove(self):
+        d = self.d
+        self.intervals.add(4, d(5), d(8))
+        self.assertTrue(self.intervals.overlaps(d(6), d(7)))
+        self.intervals.remove(4)
+        self.assertFalse(self.intervals.overlaps(d(6), d(7)))
+
+
+class IntervalIndexTests(TestCase):
+    def setUp(self):
+        self.index = IntervalIndex(ttl=60)
+        self.index.connect()
+        self.addCleanup(self.index.disconnect)
+        self.room = Room.objects.create(description="Room for tests", price=20)
+        self.start = date.today() + timedelta(days=1)
+        Booking.objects.create(
+            room=self.room, date_start=self.start, date_end=self.start + timedelta(days=2)
+        )
+
+    def test_lazy_load_then_memory_only(self):
+        with self.assertNumQueries(1):
+            self.assertFalse(self.index.is_available(self.room.id, self.start, self.start + timedelta(days=1)))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.index.is_available(
+                self.room.id, self.start + timedelta(days=2), self.start + timedelta(days=3)
+            ))
+
+    def test_signals_keep_index_coherent(self):
+        later = self.start + timedelta(days=5)
+        self.index.get(self.room.id)
+        with patch("bookings.services.interval_index", self.index):
+            with self.captureOnCommitCallbacks(execute=True):
+                booking = services.create_booking(self.room.id, later, later + timedelta(days=1))
+        with self.assertNumQueries(0):
+            self.assertFalse(self.index.is_available(self.room.id, later, later + timedelta(days=1)))
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.index.is_available(self.room.id, later, later + timedelta(days=1)))
+
+    def test_created_booking_does_not_fake_post_save(self):
+        from django.db.models.signals import post_save
+
+        received = []
+        post_save.connect(lambda **kwargs: received.append(kwargs), sender=Booking, weak=False,
+                          dispatch_uid="test_fake_post_save")
+        self.addCleanup(post_save.disconnect, sender=Booking, dispatch_uid="test_fake_post_save")
+        later = self.start + timedelta(days=5)
+        services.create_booking(self.room.id, later, later + timedelta(days=1))
+        services.bulk_create_bookings([(self.room.id, later + timedelta(days=2), later + timedelta(days=3))])
+        self.assertEqual(received, [])
+
+    def test_bulk_create_is_tracked(self):
+        later = self.start + timedelta(days=5)
+        self.index.get(self.room.id)
+        with patch("bookings.services.interval_index", self.index):
+            with self.captureOnCommitCallbacks(execute=True):
+                services.bulk_create_bookings([(self.room.id, later, later + timedelta(days=1))])
+        self.assertFalse(self.index.is_available(self.room.id, later, later + timedelta(days=1)))
+
+    def test_check_availability_uses_index(self):
+        later = self.start + timedelta(days=5)
+        with patch("bookings.intervals.interval_index", self.index):
+            self.index.get(self.room.id)
+            with self.assertNumQueries(0):
+                self.assertFalse(Booking(room=self.room, date_start=self.start, date_end=later).check_availability())
+                self.assertTrue(Booking(room=self.room, date_start=later, date_end=later + timedelta(days=1)).check_availability())
+
+    def test_get_many_loads_in_one_query(self):
+        other = Room.objects.create(description="Other room", price=30)
+        end = self.start + timedelta(days=1)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.index.available([self.room.id, other.id], self.start, end), {other.id})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.free_windows_many([self.room.id, other.id], self.start, end),
+                             {self.room.id: [], other.id: [(self.start, end)]})
+
+    def test_room_delete_drops_entry(self):
+        self.index.get(self.room.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.delete()
+        self.assertNotIn(self.room.id, self.index.rooms)
+
+
+class AsyncBookingViewsTests(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.room = Room.objects.create(description="Room for tests", price=20)
+        self.start = date.today() + timedelta(days=2)
+
+    async def create(self, offset=0):
+        start = self.start + timedelta(days=offset)
+        return await async_views.create_booking(self.factory.post("/bookings/create", {
+            "room_id": self.room.id,
+            "date_start": start.isoformat(),
+            "date_end": (start + timedelta(days=2)).isoformat(),
+        }))
+
+    async def test_create_conflict_list_delete(self):
+        response = await self.create()
+        self.assertEqual(response.status_code, 201)
+        booking_id = json.loads(response.content)["booking_id"]
+        self.assertEqual((await self.create(offset=1)).status_code, 400)
+
+        response = await async_views.list_bookings(
+            self.factory.get("/bookings/list", {"room_id": self.room.id})
+        )
+        self.assertEqual([b["booking_id"] for b in json.loads(response.content)], [booking_id])
+
+        response = await async_views.delete_booking(
+            self.factory.post("/bookings/delete", {"booking_id": booking_id})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(await Booking.objects.filter(id=booking_id).aexists())
+
+    async def test_missing_room(self):
+        response = await async_views.list_bookings(
+            self.factory.get("/bookings/list", {"room_id": 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ImportBookingsCommandTests(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(description="Room for tests", price=20)
+        self.other = Room.objects.create(description="Other room", price=30)
+        self.start = date(2020, 1, 10)
+        Booking.objects.bulk_create([Booking(
+            room=self.room, date_start=self.start, date_end=self.start + timedelta(days=3)
+        )])
+
+    def write(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def day(self, offset):
+        return (self.start + timedelta(days=offset)).isoformat()
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_bookings", path, *args, "--chunk-size", "2", stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_rejects_invalid_and_overlapping_rows(self):
+        path = self.write(".csv", "\n".join([
+            "room_id,date_start,date_end",
+            f"{self.room.id},{self.day(3)},{self.day(5)}",   # сразу после существующей
+            f"{self.room.id},{self.day(1)},{self.day(2)}",   # пересекает существующую
+            f"{self.other.id},{self.day(0)},{self.day(4)}",
+            f"{self.other.id},{self.day(2)},{self.day(6)}",  # пересекает строку выше
+            f"{self.room.id},{self.day(4)},{self.day(6)}",   # пересекает строку из другой пачки
+            f"0,{self.day(0)},{self.day(1)}",
+            f"{self.room.id},{self.day(9)},{self.day(8)}",
+            f"{self.room.id},завтра,{self.day(8)}",
+        ]) + "\n")
+        out, err = self.run_import(path)
+
+        self.assertIn("Строк: 8, загружено: 2, отклонено: 6", out)
+        # строки считаются без заголовка
+        for line in (2, 4, 5, 6, 7, 8):
+            self.assertIn(f"Строка {line}:", err)
+        self.assertIn("Номер не найден", err)
+        self.assertEqual(
+            sorted(Booking.objects.values_list("room_id", "date_start")),
+            sorted([
+                (self.room.id, self.start),
+                (self.room.id, self.start + timedelta(days=3)),
+                (self.other.id, self.start),
+            ])
+        )
+
+    def test_jsonl_and_strict(self):
+        path = self.write(".jsonl", "\n".join([
+            json.dumps({"room_id": self.other.id, "date_start": self.day(0), "date_end": self.day(2)}),
+            "не json",
+        ]))
+        with self.assertRaisesMessage(CommandError, "Строка 2"):
+            self.run_import(path, "--strict")
+        self.assertFalse(Booking.objects.filter(room=self.other).exists())
+
+        out, _ = self.run_import(path)
+        self.assertIn("загружено: 1, отклонено: 1", out)
+        self.assertTrue(Booking.objects.filter(room=self.other).exists())
+
+    def test_failed_chunk_leaves_no_phantom_periods(self):
+        from bookings.importer import BookingImporter
+
+        importer = BookingImporter(method="bulk", chunk_size=1)
+        rows = [{"room_id": self.other.id, "date_start": self.day(0), "date_end": self.day(2)}]
+        with patch("bookings.importer.insert_bookings", side_effect=IntegrityError), \
+                patch("bookings.importer.invalidate_caches") as invalidate:
+            with self.assertRaises(IntegrityError):
+                importer.run(rows)
+        invalidate.assert_not_called()
+        self.assertEqual(importer.busy, {self.other.id: []})
+
+        with patch("bookings.importer.invalidate_caches") as invalidate:
+            self.assertEqual(importer.run(rows).imported, 1)
+        invalidate.assert_called_once_with({self.other.id})
+
+    def test_strict_rollback_skips_invalidation(self):
+        from bookings.importer import BookingImporter, ImportRowError
+
+        importer = BookingImporter(method="bulk", chunk_size=1, strict=True)
+        rows = [{"room_id": self.other.id, "date_start": self.day(0), "date_end": self.day(2)}, None]
+        with patch("bookings.importer.invalidate_caches") as invalidate:
+            with self.assertRaises(ImportRowError):
+                importer.run(rows)
+        invalidate.assert_not_called()
+        self.assertEqual(importer.stats.imported, 0)
+        self.assertFalse(Booking.objects.filter(room=self.other).exists())
+
+    def test_copy_requires_postgresql(self):
+        if connection.vendor == "postgresql":
+            self.skipTest("COPY доступен")
+        with self.assertRaises(CommandError):
+            self.run_import(self.write(".csv", ""), "--method", "copy")
+
+    def test_seed(self):
+        out = StringIO()
+        call_command("seed", "--rooms", "5", "--bookings-per-room", "4", "--chunk-size", "3", stdout=out)
+        self.assertIn("Номеров: 5", out.getvalue())
+        seeded = Booking.objects.exclude(room__in=[self.room, self.other])
+        self.assertEqual(seeded.count(), 20)
+        for room_id in set(seeded.values_list("room_id", flat=True)):
+            periods = list(seeded.filter(room_id=room_id).order_by("date_start")
+                           .values_list("date_start", "date_end"))
+            for (_, end), (start, _) in zip(periods, periods[1:]):
+                self.assertLessEqual(end, start)
+
+
+class ExportBookingsTests(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(description="Люкс, с видом", price=150)
+        self.other = Room.objects.create(description="Стандарт", price=100)
+        start = date(2025, 1, 10)
+        self.bookings = Booking.objects.bulk_create([
+            Booking(room=self.room, date_start=start, date_end=start + timedelta(days=3)),
+            Booking(room=self.other, date_start=start + timedelta(days=20), date_end=start + timedelta(days=21)),
+        ])
+
+    def content(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv(self):
+        response = self.client.get("/bookings/export")
+        self.assertIn('filename="bookings.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(self.content(response).decode().splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["booking_id"], str(self.bookings[0].id))
+        self.assertEqual(rows[0]["room_description"], "Люкс, с видом")
+        self.assertEqual(rows[0]["duration_days"], "3")
+        self.assertEqual(rows[0]["revenue"], "450.00")
+
+    def test_jsonl_gzip_and_period(self):
+        response = self.client.get("/bookings/export", {
+            "format": "jsonl", "gzip": "1", "from": "2025-01-20", "to": "2025-02-01"
+        })
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        lines = gzip.decompress(self.content(response)).decode().splitlines()
+        self.assertEqual([json.loads(line)["room_id"] for line in lines], [self.other.id])
+        self.assertEqual(json.loads(lines[0])["revenue"], "100.00")
+
+    def test_empty_csv_has_header(self):
+        response = self.client.get("/bookings/export", {"from": "2030-01-01"})
+        self.assertEqual(self.content(response).decode().strip(), ",".join([
+            "booking_id", "room_id", "room_description", "price_per_night", "date_start",
+            "date_end", "duration_days", "revenue", "created_at",
+        ]))
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get("/bookings/export", {"format": "xml"}).status_code, 400)
+        self.assertEqual(
+            self.client.get("/bookings/export", {"from": "2025-02-01", "to": "2025-01-01"}).status_code, 400
+        )
+
+    async def test_async_view(self):
+        response = await async_views.export_bookings(
+            AsyncRequestFactory().get("/bookings/export", {"format": "jsonl"})
+        )
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_command(self):
+        fd, path = tempfile.mkstemp(suffix=".csv.gz")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        err = StringIO()
+        call_command("export_bookings", "--gzip", "-o", path, "--chunk-size", "1", stderr=err)
+        self.assertIn("Выгружено строк: 2", err.getvalue())
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 2)
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(description="Room", price=100)
+        self.other = Room.objects.create(description="Other", price=50)
+        self.empty = Room.objects.create(description="Empty", price=10)
+        Booking.objects.bulk_create([
+            # 3 ночи в январе и 2 в феврале
+            Booking(room=self.room, date_start=date(2030, 1, 29), date_end=date(2030, 2, 3)),
+            Booking(room=self.room, date_start=date(2030, 3, 1), date_end=date(2030, 3, 11)),
+            Booking(room=self.other, date_start=date(2030, 1, 1), date_end=date(2030, 1, 5)),
+            # вне периода
+            Booking(room=self.other, date_start=date(2029, 12, 1), date_end=date(2029, 12, 5)),
+        ])
+
+    def get(self, path, **params):
+        params.setdefault("from", "2030-01")
+        params.setdefault("to", "2030-02")
+        return self.client.get(path, params)
+
+    def test_revenue_splits_nights_by_month(self):
+        with self.assertNumQueries(1):
+            response = self.get("/analytics/revenue")
+        data = response.json()
+        self.assertEqual(data["total"], {"nights": 9, "revenue": "700.00"})
+        self.assertEqual(data["months"], [
+            {"month": "2030-01", "nights": 7, "revenue": "500.00"},
+            {"month": "2030-02", "nights": 2, "revenue": "200.00"},
+        ])
+        self.assertEqual(data["rooms"], [
+            {"room_id": self.room.id, "nights": 5, "revenue": "500.00"},
+            {"room_id": self.other.id, "nights": 4, "revenue": "200.00"},
+        ])
+
+    def test_occupancy(self):
+        data = self.get("/analytics/occupancy", to="2030-03").json()
+        self.assertEqual(data["rooms_count"], 3)
+        self.assertEqual([m["nights"] for m in data["months"]], [7, 2, 10])
+        self.assertEqual(data["months"][1]["rate"], round(2 / (3 * 28), 4))
+        self.assertEqual(data["rooms"][0], {"room_id": self.room.id, "nights": 15, "rate": round(15 / 90, 4)})
+
+        data = self.get("/analytics/occupancy", room_id=self.other.id).json()
+        self.assertEqual(data["rooms_count"], 1)
+        self.assertEqual(data["months"][0]["rate"], round(4 / 31, 4))
+
+    def test_invalid_params(self):
+        self.assertEqual(self.get("/analytics/revenue", **{"from": ""}).status_code, 400)
+        self.assertEqual(self.get("/analytics/revenue", to="2030-13").status_code, 400)
+        self.assertEqual(self.get("/analytics/revenue", to="2029-12").status_code, 400)
+        self.assertEqual(self.get("/analytics/revenue", to="2033-12").status_code, 400)
+        self.assertEqual(self.get("/analytics/occupancy", room_id="x").status_code, 400)
+        self.assertEqual(self.get("/analytics/occupancy", room_id=999999).status_code, 404)
+
+    def test_summary_matches_live_report(self):
+        live = self.get("/analytics/revenue", **{"from": "2029-12", "to": "2030-03"}).json()
+        summary = analytics.AnalyticsSummary()
+        summary.connect()
+        self.addCleanup(summary.disconnect)
+        with patch("bookings.analytics.analytics_summary", summary):
+            self.assertEqual(analytics.refresh_all(), 3)
+            with self.assertNumQueries(1):
+                response = self.get("/analytics/revenue", **{"from": "2029-12", "to": "2030-03"})
+        self.assertEqual(response.json(), live)
+
+    def test_summary_follows_booking_changes(self):
+        summary = analytics.AnalyticsSummary()
+        summary.connect()
+        self.addCleanup(summary.disconnect)
+        with patch("bookings.analytics.analytics_summary", summary), \
+                patch("bookings.services.analytics_summary", summary):
+            analytics.refresh_all()
+            with self.captureOnCommitCallbacks(execute=True):
+                booking = services.create_booking(self.empty.id, date(2030, 2, 27), date(2030, 3, 2))
+            with self.captureOnCommitCallbacks(execute=True):
+                services.bulk_create_bookings([(self.other.id, date(2030, 2, 10), date(2030, 2, 12))])
+            nights = dict(self.empty.month_stats.values_list('month', 'nights'))
+            self.assertEqual(nights, {date(2030, 2, 1): 2, date(2030, 3, 1): 1})
+            self.assertEqual(self.get("/analytics/revenue").json()["total"]["nights"], 13)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                booking.delete()
+            self.assertFalse(self.empty.month_stats.filter(nights__gt=0).exists())
+            self.assertEqual(self.get("/analytics/revenue").json()["total"]["nights"], 11)
+
+    def test_refresh_command(self):
+        out = StringIO()
+        call_command("refresh_analytics", "--room", str(self.room.id), stdout=out)
+        self.assertIn("Номеров пересчитано: 1", out.getvalue())
+        self.assertEqual(
+            sorted(self.room.month_stats.values_list('month', 'nights')),
+            [(date(2030, 1, 1), 3), (date(2030, 2, 1), 2), (date(2030, 3, 1), 10)]
+        )
+
+
+class BookingAdminTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pass")
+        )
+        self.start = date.today() + timedelta(days=1)
+
+    def create_bookings(self, count):
+        for i in range(count):
+            room = Room.objects.create(description=f"Room {i}", price=100)
+            Booking.objects.create(room=room, date_start=self.start, date_end=self.start + timedelta(days=i % 5 + 1))
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_changelist_does_not_grow_with_rows(self):
+        self.create_bookings(2)
+        small, _ = self.count_queries("/admin/bookings/booking/")
+        self.create_bookings(10)
+        large, response = self.count_queries("/admin/bookings/booking/")
+        self.assertEqual(small, large)
+        self.assertContains(response, '<td class="field-duration_days">5</td>', html=True)
+        # в фильтрах нет списка всех номеров
+        self.assertNotContains(response, "?room_id=")
+
+    def test_room_filter_and_ordering_by_duration(self):
+        self.create_bookings(6)
+        room = Room.objects.get(description="Room 4")
+        _, response = self.count_queries("/admin/bookings/booking/", {"room_id": room.id})
+        self.assertEqual(list(response.context["cl"].result_list), list(room.bookings.all()))
+
+        _, response = self.count_queries("/admin/bookings/booking/", {"o": "6"})
+        durations = [booking.duration.days for booking in response.context["cl"].result_list]
+        self.assertEqual(durations, sorted(durations))
+
+    def test_room_changelist_links_to_bookings(self):
+        self.create_bookings(3)
+        room = Room.objects.get(description="Room 1")
+        _, response = self.count_queries("/admin/rooms/room/")
+        self.assertContains(response, f'?room_id={room.id}">1</a>')
+
+    def test_room_autocomplete(self):
+        self.create_bookings(3)
+        _, response = self.count_queries("/admin/autocomplete/", {
+            "app_label": "bookings", "model_name": "booking", "field_name": "room", "term": "Room 2",
+        })
+        room = Room.objects.get(description="Room 2")
+        self.assertEqual([item["text"] for item in response.json()["results"]], [str(room)])
+
+    def test_paginator_uses_estimate_for_unfiltered_list(self):
+        self.create_bookings(3)
+        with patch("hotel_booking.pagination.estimated_count", return_value=500000):
+            _, response = self.count_queries("/admin/bookings/booking/")
+            self.assertEqual(response.context["cl"].result_count, 500000)
+            _, response = self.count_queries("/admin/bookings/booking/", {"q": "Room 1"})
+            self.assertEqual(response.context["cl"].result_count, 1)
+        # маленькая оценка - точный подсчёт
+        with patch("hotel_booking.pagination.estimated_count", return_value=10):
+            _, response = self.count_queries("/admin/bookings/booking/")
+            self.assertEqual(response.context["cl"].result_count, 3)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.queue = JobQueue(batch_size=10, max_attempts=2, retry_delay=10, lease=300)
+        self.room = Room.objects.create(description="Room", price=100)
+        self.start = date.today() + timedelta(days=1)
+        self.calls = []
+        self.summary = analytics.AnalyticsSummary()
+        self.summary.connect()
+        self.addCleanup(self.summary.disconnect)
+        for target in ("bookings.analytics.analytics_summary", "bookings.services.analytics_summary"):
+            patcher = patch(target, self.summary)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def handle(self, name, func=None):
+        return patch.dict("bookings.jobs.handlers", {name: [func or self.calls.append]})
+
+    def enabled(self):
+        return patch("bookings.jobs.job_queue", self.queue)
+
+    def create_booking(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/bookings/create", {
+                "room_id": self.room.id,
+                "date_start": self.start.isoformat(),
+                "date_end": (self.start + timedelta(days=2)).isoformat(),
+            })
+
+    def nights(self):
+        return sum(self.room.month_stats.values_list("nights", flat=True))
+
+    def test_unknown_event_is_an_error(self):
+        with self.assertRaises(LookupError):
+            publish_on_commit([("no.such.event", {})])
+        with self.enabled(), self.assertRaises(LookupError):
+            publish([("no.such.event", {})])
+        self.assertFalse(Job.objects.exists())
+
+    def test_write_events_without_handlers_are_skipped(self):
+        with self.enabled():
+            booking_id = self.create_booking().json()["booking_id"]
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post("/bookings/delete", {"booking_id": booking_id})
+                self.client.post("/rooms/create", {"description": "New", "price_per_night": 10})
+        # booking.* и room.* никто не слушает: в очереди только сводка
+        self.assertEqual(set(Job.objects.values_list("name", flat=True)), {"analytics.refresh"})
+
+    def test_write_events_reach_handlers(self):
+        events = []
+        subscribed = {
+            name: [lambda payload, name=name: events.append((name, payload))]
+            for name in ("booking.created", "booking.deleted", "room.created", "room.deleted")
+        }
+        with patch.dict("bookings.jobs.handlers", subscribed):
+            booking_id = self.create_booking().json()["booking_id"]
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post("/bookings/delete", {"booking_id": booking_id})
+                room_id = self.client.post(
+                    "/rooms/create", {"description": "New", "price_per_night": 10}
+                ).json()["room_id"]
+                self.client.post("/rooms/delete", {"room_id": room_id})
+        booking = {
+            "booking_id": booking_id,
+            "room_id": self.room.id,
+            "date_start": self.start.isoformat(),
+            "date_end": (self.start + timedelta(days=2)).isoformat(),
+        }
+        self.assertEqual(events, [
+            ("booking.created", booking),
+            ("booking.deleted", booking),
+            ("room.created", {"room_id": room_id}),
+            ("room.deleted", {"room_id": room_id, "bookings_count": 0}),
+        ])
+
+    def test_handlers_run_inline_without_queue(self):
+        self.create_booking()
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(self.nights(), 2)
+
+    def test_worker_runs_queued_jobs(self):
+        with self.enabled():
+            booking_id = self.create_booking().json()["booking_id"]
+            # запрос только ставит задачу, сводка пересчитывается воркером
+            self.assertEqual(self.nights(), 0)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post("/bookings/delete", {"booking_id": booking_id})
+            self.assertEqual(
+                list(Job.objects.values_list("name", flat=True)), ["analytics.refresh", "analytics.refresh"]
+            )
+
+            out = StringIO()
+            call_command("run_worker", "--once", stdout=out)
+        self.assertEqual(self.nights(), 0)
+        self.assertIn("Задач выполнено: 2, с ошибкой: 0", out.getvalue())
+        self.assertIn("в очереди: 0", out.getvalue())
+        self.assertFalse(Job.objects.exists())
+
+        with self.enabled():
+            self.create_booking()
+            self.assertEqual(self.queue.run_batch(), (1, 0))
+        self.assertEqual(self.nights(), 2)
+
+    def test_failed_jobs_are_retried_then_kept(self):
+        def fail(payload):
+            raise RuntimeError("база недоступна")
+
+        with self.enabled(), self.handle("analytics.refresh", fail):
+            self.create_booking()
+            self.assertEqual(self.queue.run_batch(), (0, 1))
+            job = Job.objects.get()
+            self.assertEqual((job.attempts, job.last_error), (1, "RuntimeError: база недоступна"))
+            self.assertIsNone(job.failed_at)
+            # отложена: сейчас выполнять нечего
+            self.assertEqual(self.queue.run_batch(), (0, 0))
+
+            Job.objects.update(run_at=job.created_at)
+            self.assertEqual(self.queue.run_batch(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.failed_at)
+        self.assertEqual(self.queue.stats(), {"pending": 0, "failed": 1})
+
+    def test_claimed_jobs_are_not_taken_twice(self):
+        with self.enabled(), self.handle("test.event"):
+            publish(("test.event", {"n": i}) for i in range(15))
+        first = self.queue.claim(timezone.now())
+        second = self.queue.claim(timezone.now())
+        self.assertEqual(len(first), 10)
+        self.assertEqual(len(second), 5)
+        self.assertFalse({job.id for job in first} & {job.id for job in second})
+        self.assertEqual(self.queue.claim(timezone.now()), [])
+        self.assertEqual(Job.objects.count(), 15)
+
+    def test_job_without_handlers_fails(self):
+        Job.objects.create(name="unknown.event", payload={})
+        self.assertEqual(self.queue.run_batch(), (0, 1))
+        self.assertIn("LookupError", Job.objects.get().last_error)
+
+    def test_async_delete_enqueues_refresh(self):
+        from asgiref.sync import async_to_sync
+
+        booking = Booking.objects.create(
+            room=self.room, date_start=self.start, date_end=self.start + timedelta(days=2)
+        )
+        # async_to_sync из потока теста: ORM представления идёт через то же
+        # соединение, и обработчики on_commit перехватываются
+        with self.enabled(), self.captureOnCommitCallbacks(execute=True):
+            response = async_to_sync(async_views.delete_booking)(
+                AsyncRequestFactory().post("/bookings/delete", {"booking_id": booking.id})
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Job.objects.filter(name="analytics.refresh").count(), 1)
+
+    def test_async_views_publish_write_events(self):
+        from asgiref.sync import async_to_sync
+        from rooms import async_views as room_views
+
+        booking = Booking.objects.create(
+            room=self.room, date_start=self.start, date_end=self.start + timedelta(days=2)
+        )
+        with self.enabled(), self.handle("booking.deleted"), self.handle("room.created"):
+            async_to_sync(async_views.delete_booking)(
+                AsyncRequestFactory().post("/bookings/delete", {"booking_id": booking.id})
+            )
+            async_to_sync(room_views.create_room)(
+                AsyncRequestFactory().post("/rooms/create", {"description": "New", "price_per_night": 10})
+            )
+        self.assertEqual(
+            list(Job.objects.filter(name__in=["booking.deleted", "room.created"])
+                 .order_by("id").values_list("name", flat=True)),
+            ["booking.deleted", "room.created"]
+        )
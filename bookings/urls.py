@@ -1,10 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# под ASGI подключаются асинхронные представления (см. hotel_booking/asgi.py)
+if settings.ASYNC_VIEWS:
+    views = async_views
 
 app_name = 'bookings'
 
 urlpatterns = [
     path('bookings/create', views.create_booking, name='create_booking'),
+    path('bookings/bulk_create', views.bulk_create_bookings, name='bulk_create_bookings'),
     path('bookings/delete', views.delete_booking, name='delete_booking'),
     path('bookings/list', views.list_bookings, name='list_bookings'),
+    path('bookings/export', views.export_bookings, name='export_bookings'),
+    path('analytics/revenue', views.revenue_analytics, name='revenue_analytics'),
+    path('analytics/occupancy', views.occupancy_analytics, name='occupancy_analytics'),
 ] 
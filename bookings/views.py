@@ -1,16 +1,26 @@
-from django.http import JsonResponse
+from django.http import StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.exceptions import ValidationError
 from .models import Booking
+from . import services
+from .analytics import MAX_ANALYTICS_MONTHS, occupancy_report, revenue_report
+from .jobs import booking_event, publish_on_commit
+from .export import CONTENT_TYPES, FORMATS as EXPORT_FORMATS, export_queryset, export_stream
 from rooms.models import Room
+from rooms.cache import room_list_cache
 from datetime import datetime
+import json
+from hotel_booking.idempotency import idempotent
+from hotel_booking.pagination import list_response
+from hotel_booking.responses import FastJsonResponse
+from hotel_booking.versions import changed_on_commit, list_condition, room_version
 
 def error_response(message, status=400):
-    return JsonResponse({"error": message}, status=status)
+    return FastJsonResponse({"error": message}, status=status)
 
 def success_response(data, status=200):
-    return JsonResponse(data, status=status)
+    return FastJsonResponse(data, status=status)
 
 def parse_date(date_string):
     try:
@@ -18,8 +28,128 @@ def parse_date(date_string):
     except ValueError:
         raise ValueError(f"Дата '{date_string}' должна быть в формате YYYY-MM-DD")
 
+BULK_MAX_ITEMS = 1000
+
+def parse_booking_fields(item):
+    """
+    Разбор room_id/date_start/date_end из формы или элемента пакета,
+    при ошибке бросает ValueError
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Элемент должен быть объектом")
+    for field in ('room_id', 'date_start', 'date_end'):
+        if item.get(field) in (None, ''):
+            raise ValueError(f"Поле '{field}' обязательно")
+    try:
+        room_id = int(item['room_id'])
+    except (TypeError, ValueError):
+        raise ValueError("Неверный формат room_id")
+    return room_id, parse_date(str(item['date_start'])), parse_date(str(item['date_end']))
+
+def parse_booking_id(data):
+    booking_id = data.get('booking_id')
+    
+    if not booking_id:
+        raise ValueError("Поле 'booking_id' обязательно")
+    
+    try:
+        return int(booking_id)
+    except ValueError:
+        raise ValueError("Неверный формат booking_id")
+
+def parse_list_room_id(params):
+    room_id = params.get('room_id')
+    
+    if not room_id:
+        raise ValueError("Параметр 'room_id' обязателен")
+    
+    try:
+        return int(room_id)
+    except ValueError:
+        raise ValueError("Неверный формат room_id")
+
+def list_version(request):
+    """Версия броней номера для ETag /bookings/list, None при неверном room_id"""
+    try:
+        return room_version(parse_list_room_id(request.GET))
+    except ValueError:
+        return None
+
+def parse_export_params(params):
+    """
+    Разбор параметров /bookings/export, при ошибке бросает ValueError.
+    Возвращает (format, date_from, date_to, gzip).
+    """
+    output_format = params.get('format', 'csv')
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"format должно быть одним из: {list(EXPORT_FORMATS)}")
+    date_from = params.get('from')
+    date_to = params.get('to')
+    date_from = parse_date(date_from) if date_from else None
+    date_to = parse_date(date_to) if date_to else None
+    if date_from and date_to and date_from >= date_to:
+        raise ValueError("Дата to должна быть позже даты from")
+    compress = params.get('gzip', '').lower() in ('1', 'true')
+    return output_format, date_from, date_to, compress
+
+def parse_month(value, name):
+    if not value:
+        raise ValueError(f"Параметр '{name}' обязателен")
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise ValueError(f"Параметр '{name}' должен быть в формате YYYY-MM")
+
+def parse_analytics_params(params):
+    """
+    Разбор параметров /analytics/*, при ошибке бросает ValueError.
+    Возвращает (первый месяц, последний месяц, room_id или None).
+    """
+    first = parse_month(params.get('from'), 'from')
+    last = parse_month(params.get('to'), 'to')
+    months = (last.year - first.year) * 12 + last.month - first.month + 1
+    if months <= 0:
+        raise ValueError("Месяц to не должен быть раньше from")
+    if months > MAX_ANALYTICS_MONTHS:
+        raise ValueError(f"Период не должен превышать {MAX_ANALYTICS_MONTHS} месяцев")
+    room_id = params.get('room_id')
+    if room_id:
+        try:
+            room_id = int(room_id)
+        except ValueError:
+            raise ValueError("Неверный формат room_id")
+    return first, last, room_id or None
+
+def export_response(content, output_format, compress):
+    filename = f"bookings.{output_format}" + (".gz" if compress else "")
+    response = StreamingHttpResponse(
+        content,
+        content_type='application/gzip' if compress else CONTENT_TYPES[output_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def booking_to_dict(booking):
+    return {
+        "booking_id": booking.id,
+        "date_start": booking.date_start,
+        "date_end": booking.date_end,
+        "duration_days": booking.get_duration_days()
+    }
+
+def create_booking_error(error, date_start, date_end):
+    """Ответ на исключение из services.create_booking"""
+    if isinstance(error, Room.DoesNotExist):
+        return error_response("Номер не найден", status=404)
+    if isinstance(error, services.BookingConflict):
+        return error_response(services.conflict_message(date_start, date_end))
+    if isinstance(error, ValidationError):
+        return error_response('; '.join(error.messages))
+    raise error
+
 @csrf_exempt
 @require_http_methods(["POST"])
+@idempotent
 def create_booking(request):
     """
     Создание нового бронирования
@@ -30,58 +160,23 @@ def create_booking(request):
     - date_start: дата начала бронирования (YYYY-MM-DD)
     - date_end: дата окончания бронирования (YYYY-MM-DD)
     
+    Заголовок Idempotency-Key: повтор с тем же ключом возвращает ответ
+    первого запроса (см. hotel_booking.idempotency).
+    
     Возвращает:
     {"booking_id": 1} - при успехе
     {"error": "текст ошибки"} - при ошибке
     """
     try:
-        room_id = request.POST.get('room_id')
-        date_start = request.POST.get('date_start')
-        date_end = request.POST.get('date_end')
-        
-        if not room_id:
-            return error_response("Поле 'room_id' обязательно")
-        if not date_start:
-            return error_response("Поле 'date_start' обязательно")
-        if not date_end:
-            return error_response("Поле 'date_end' обязательно")
-        
-        try:
-            room_id = int(room_id)
-        except ValueError:
-            return error_response("Неверный формат room_id")
-        
-        try:
-            room = Room.objects.get(id=room_id)
-        except Room.DoesNotExist:
-            return error_response("Номер не найден", status=404)
-        
         try:
-            date_start_parsed = parse_date(date_start)
-            date_end_parsed = parse_date(date_end)
+            room_id, date_start, date_end = parse_booking_fields(request.POST)
         except ValueError as e:
             return error_response(str(e))
         
-
-        booking = Booking(
-            room=room,
-            date_start=date_start_parsed,
-            date_end=date_end_parsed
-        )
-        
         try:
-            booking.clean()
-            
-            if not booking.check_availability():
-                return error_response(
-                    f"Номер уже забронирован на период с {date_start} по {date_end}"
-                )
-            
-            booking.save()
-            
-        except ValidationError as e:
-            error_messages = e.messages if hasattr(e, 'messages') else [str(e)]
-            return error_response('; '.join(error_messages))
+            booking = services.create_booking(room_id, date_start, date_end)
+        except Exception as e:
+            return create_booking_error(e, date_start, date_end)
         
         return success_response({
             "booking_id": booking.id
@@ -90,6 +185,82 @@ def create_booking(request):
     except Exception as e:
         return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+def bulk_create_bookings(request):
+    """
+    Пакетное создание бронирований
+    
+    POST /bookings/bulk_create?mode=atomic|partial
+    Тело запроса: JSON-массив
+    [{"room_id": 1, "date_start": "2023-12-01", "date_end": "2023-12-05"}, ...]
+    
+    mode=atomic (по умолчанию) - создаются все брони или ни одной
+    mode=partial - создаются все корректные брони, для остальных возвращается ошибка
+    Idempotency-Key - как у /bookings/create
+    
+    Возвращает:
+    atomic: {"booking_ids": [1, 2]} или
+            {"error": "...", "errors": [{"index": 0, "error": "текст ошибки"}]}
+    partial: {"results": [{"booking_id": 1}, {"error": "текст ошибки"}]}
+    """
+    try:
+        mode = request.GET.get('mode', 'atomic')
+        if mode not in ['atomic', 'partial']:
+            return error_response("mode должно быть 'atomic' или 'partial'")
+        
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return error_response("Тело запроса должно быть JSON-массивом")
+        if not isinstance(payload, list) or not payload:
+            return error_response("Тело запроса должно быть непустым JSON-массивом")
+        if len(payload) > BULK_MAX_ITEMS:
+            return error_response(f"Не больше {BULK_MAX_ITEMS} бронирований за запрос")
+        
+        parsed = {}
+        errors = {}
+        for index, item in enumerate(payload):
+            try:
+                parsed[index] = parse_booking_fields(item)
+            except ValueError as e:
+                errors[index] = str(e)
+        
+        atomic = mode == 'atomic'
+        if not (atomic and errors):
+            indexes = list(parsed)
+            bookings, service_errors = services.bulk_create_bookings(
+                [parsed[index] for index in indexes],
+                atomic=atomic
+            )
+            errors.update((indexes[i], message) for i, message in service_errors.items())
+            created = {indexes[i]: booking for i, booking in enumerate(bookings) if booking}
+        
+        if atomic:
+            if errors:
+                return FastJsonResponse({
+                    "error": "Бронирования не созданы",
+                    "errors": [
+                        {"index": index, "error": message}
+                        for index, message in sorted(errors.items())
+                    ]
+                }, status=400)
+            return success_response({
+                "booking_ids": [created[index].id for index in range(len(payload))]
+            }, status=201)
+        
+        return success_response({
+            "results": [
+                {"error": errors[index]} if index in errors
+                else {"booking_id": created[index].id}
+                for index in range(len(payload))
+            ]
+        })
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def delete_booking(request):
@@ -105,22 +276,22 @@ def delete_booking(request):
     {"error": "текст ошибки"} - при ошибке
     """
     try:
-        booking_id = request.POST.get('booking_id')
-        
-        if not booking_id:
-            return error_response("Поле 'booking_id' обязательно")
-        
         try:
-            booking_id = int(booking_id)
-        except ValueError:
-            return error_response("Неверный формат booking_id")
+            booking_id = parse_booking_id(request.POST)
+        except ValueError as e:
+            return error_response(str(e))
         
         try:
             booking = Booking.objects.get(id=booking_id)
         except Booking.DoesNotExist:
             return error_response("Бронирование не найдено", status=404)
         
+        # после delete() у брони нет id
+        event = booking_event(booking)
         booking.delete()
+        room_list_cache.invalidate_on_commit()
+        changed_on_commit([booking.room_id])
+        publish_on_commit([('booking.deleted', event)])
         
         return success_response({
             "message": f"Бронирование {booking_id} удалено"
@@ -130,6 +301,7 @@ def delete_booking(request):
         return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
 
 @require_http_methods(["GET"])
+@list_condition(list_version)
 def list_bookings(request):
     """
     Получение списка бронирований номера отеля
@@ -137,38 +309,137 @@ def list_bookings(request):
     GET /bookings/list?room_id=X
     Параметры:
     - room_id: ID номера отеля
+    - limit, cursor: постраничная выдача (см. hotel_booking.pagination)
+    - stream: 1 - потоковая выдача всего списка
+    
+    ETag/Last-Modified - как у /rooms/list, по версии броней номера.
     
     Возвращает:
-    [{"booking_id": 1, "date_start": "2023-12-01", "date_end": "2023-12-05"}]
+    [{"booking_id": 1, "date_start": "2023-12-01", "date_end": "2023-12-05", "duration_days": 4}]
+    или при limit/cursor: {"results": [...], "next_cursor": "..." | null}
     """
     try:
-        room_id = request.GET.get('room_id')
-        
-        if not room_id:
-            return error_response("Параметр 'room_id' обязателен")
-        
         try:
-            room_id = int(room_id)
-        except ValueError:
-            return error_response("Неверный формат room_id")
+            room_id = parse_list_room_id(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
         
         try:
             room = Room.objects.get(id=room_id)
         except Room.DoesNotExist:
             return error_response("Номер не найден", status=404)
         
-        bookings = Booking.objects.filter(room=room).order_by('date_start')
+        try:
+            return list_response(
+                request.GET,
+                Booking.objects.filter(room=room),
+                ['date_start', 'id'],
+                booking_to_dict
+            )
+        except ValueError as e:
+            return error_response(str(e))
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+def export_bookings(request):
+    """
+    Выгрузка всех бронирований с данными номера
+    
+    GET /bookings/export?format=csv&from=YYYY-MM-DD&to=YYYY-MM-DD&gzip=1
+    Параметры:
+    - format: csv (по умолчанию) или jsonl
+    - from, to: необязательный период дат заезда (to не включается)
+    - gzip: 1 - сжать выгрузку
+    
+    Возвращает файл со столбцами booking_id, room_id, room_description,
+    price_per_night, date_start, date_end, duration_days, revenue, created_at
+    """
+    try:
+        try:
+            output_format, date_from, date_to, compress = parse_export_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+        
+        return export_response(
+            export_stream(export_queryset(date_from, date_to), output_format, compress),
+            output_format,
+            compress
+        )
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+def revenue_analytics(request):
+    """
+    Выручка по месяцам и по номерам
+    
+    GET /analytics/revenue?from=YYYY-MM&to=YYYY-MM
+    Параметры:
+    - from, to: первый и последний месяц (включительно, не больше 36 месяцев)
+    - room_id: необязательно, только один номер
+    
+    Ночи брони на стыке месяцев делятся между месяцами, выручка считается
+    по текущей цене номера. В rooms попадают номера с бронями в периоде.
+    
+    Возвращает:
+    {"from": "2023-12", "to": "2024-01",
+     "total": {"nights": 40, "revenue": "200000.00"},
+     "months": [{"month": "2023-12", "nights": 25, "revenue": "125000.00"}, ...],
+     "rooms": [{"room_id": 1, "nights": 12, "revenue": "60000.00"}, ...]}
+    """
+    try:
+        try:
+            first, last, room_id = parse_analytics_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+        
+        if room_id and not Room.objects.filter(id=room_id).exists():
+            return error_response("Номер не найден", status=404)
+        
+        return success_response({
+            "from": first.strftime('%Y-%m'),
+            "to": last.strftime('%Y-%m'),
+            **revenue_report(first, last, room_id)
+        })
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+def occupancy_analytics(request):
+    """
+    Загрузка номеров по месяцам
+    
+    GET /analytics/occupancy?from=YYYY-MM&to=YYYY-MM
+    Параметры: как у /analytics/revenue
+    
+    rate месяца - занятые ночи / (число номеров * дней в месяце), rate
+    номера - его занятые ночи / дней в периоде. В rooms попадают номера
+    с бронями в периоде, у остальных rate = 0.
+    
+    Возвращает:
+    {"from": "2023-12", "to": "2024-01", "rooms_count": 10,
+     "months": [{"month": "2023-12", "nights": 25, "rate": 0.0806}, ...],
+     "rooms": [{"room_id": 1, "nights": 12, "rate": 0.1935}, ...]}
+    """
+    try:
+        try:
+            first, last, room_id = parse_analytics_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
         
-        bookings_data = []
-        for booking in bookings:
-            bookings_data.append({
-                "booking_id": booking.id,
-                "date_start": booking.date_start.strftime('%Y-%m-%d'),
-                "date_end": booking.date_end.strftime('%Y-%m-%d'),
-                "duration_days": booking.get_duration_days()
-            })
+        rooms_count = Room.objects.filter(id=room_id).count() if room_id else Room.objects.count()
+        if room_id and not rooms_count:
+            return error_response("Номер не найден", status=404)
         
-        return success_response(bookings_data)
+        return success_response({
+            "from": first.strftime('%Y-%m'),
+            "to": last.strftime('%Y-%m'),
+            **occupancy_report(first, last, rooms_count, room_id)
+        })
     
     except Exception as e:
         return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
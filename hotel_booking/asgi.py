@@ -2,6 +2,11 @@
 ASGI config for hotel_booking project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+URL patterns are served by the async views unless ASYNC_VIEWS=False is set,
+paths from API_PREFIXES are served with the slim API_MIDDLEWARE stack.
+
+Run with uvicorn:
+    uvicorn hotel_booking.asgi:application --workers 4
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +14,9 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from hotel_booking.handlers import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hotel_booking.settings")
+os.environ.setdefault("ASYNC_VIEWS", "True")
 
 application = get_asgi_application()
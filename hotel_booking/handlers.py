@@ -0,0 +1,141 @@
+"""
+Отдельный стек middleware для JSON API
+
+Представления rooms и bookings не используют сессии, пользователя,
+сообщения, CSRF (все POST - csrf_exempt) и X-Frame-Options, а каждый
+запрос проходит через эти middleware. Поэтому WSGI/ASGI-приложение
+держит два обработчика Django: запросы с путями из API_PREFIXES
+обрабатываются стеком API_MIDDLEWARE, остальные (админка) - полным
+MIDDLEWARE.
+
+Тестовый клиент Django собирает свой обработчик по MIDDLEWARE, так что
+тесты идут через полный стек.
+"""
+
+import logging
+
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('django.request')
+
+
+class ApiMiddlewareMixin:
+    """
+    Обработчик со стеком settings.API_MIDDLEWARE
+
+    BaseHandler.load_middleware читает только settings.MIDDLEWARE, поэтому
+    цепочка собирается здесь тем же способом, но из явного списка.
+    """
+
+    def middleware_paths(self):
+        return settings.API_MIDDLEWARE
+
+    def load_middleware(self, is_async=False):
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        get_response = self._get_response_async if is_async else self._get_response
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(self.middleware_paths()):
+            middleware = import_string(middleware_path)
+            middleware_can_sync = getattr(middleware, 'sync_capable', True)
+            middleware_can_async = getattr(middleware, 'async_capable', False)
+            if not middleware_can_sync and not middleware_can_async:
+                raise RuntimeError(
+                    f"Middleware {middleware_path} must have at least one of "
+                    "sync_capable/async_capable set to True."
+                )
+            if not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
+            try:
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async, handler, handler_is_async,
+                    debug=settings.DEBUG, name=f'middleware {middleware_path}',
+                )
+                mw_instance = middleware(adapted_handler)
+            except MiddlewareNotUsed:
+                logger.debug('MiddlewareNotUsed: %r', middleware_path)
+                continue
+            handler = adapted_handler
+
+            if mw_instance is None:
+                raise ImproperlyConfigured(f'Middleware factory {middleware_path} returned None.')
+
+            if hasattr(mw_instance, 'process_view'):
+                self._view_middleware.insert(0, self.adapt_method_mode(is_async, mw_instance.process_view))
+            if hasattr(mw_instance, 'process_template_response'):
+                self._template_response_middleware.append(
+                    self.adapt_method_mode(is_async, mw_instance.process_template_response)
+                )
+            if hasattr(mw_instance, 'process_exception'):
+                # как в Django: обработка исключений всегда синхронная
+                self._exception_middleware.append(
+                    self.adapt_method_mode(False, mw_instance.process_exception)
+                )
+
+            handler = convert_exception_to_response(mw_instance)
+            handler_is_async = middleware_is_async
+
+        handler = self.adapt_method_mode(is_async, handler, handler_is_async)
+        # присваивается последним: по нему Django понимает, что загрузка завершена
+        self._middleware_chain = handler
+
+
+class ApiWSGIHandler(ApiMiddlewareMixin, WSGIHandler):
+    pass
+
+
+class ApiASGIHandler(ApiMiddlewareMixin, ASGIHandler):
+    pass
+
+
+def is_api_path(path):
+    """Путь совпадает с префиксом или продолжается после него через '/'"""
+    return any(
+        path == prefix or path.startswith(prefix + '/')
+        for prefix in settings.API_PREFIXES
+    )
+
+
+class WSGIDispatcher:
+    def __init__(self):
+        self.site = WSGIHandler()
+        self.api = ApiWSGIHandler()
+
+    def __call__(self, environ, start_response):
+        handler = self.api if is_api_path(environ.get('PATH_INFO', '')) else self.site
+        return handler(environ, start_response)
+
+
+class ASGIDispatcher:
+    def __init__(self):
+        self.site = ASGIHandler()
+        self.api = ApiASGIHandler()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and is_api_path(scope['path']):
+            await self.api(scope, receive, send)
+        else:
+            await self.site(scope, receive, send)
+
+
+def get_wsgi_application():
+    """Как django.core.wsgi.get_wsgi_application, но с API-стеком"""
+    django.setup(set_prefix=False)
+    return WSGIDispatcher()
+
+
+def get_asgi_application():
+    """Как django.core.asgi.get_asgi_application, но с API-стеком"""
+    django.setup(set_prefix=False)
+    return ASGIDispatcher()
@@ -0,0 +1,314 @@
+"""
+Идемпотентные POST-запросы по заголовку Idempotency-Key
+
+Клиент, повторяющий POST после таймаута, передаёт тот же ключ, и вместо
+повторного выполнения получает сохранённый ответ первого запроса (с
+заголовком Idempotent-Replayed: true): номер не создаётся второй раз,
+а бронь не превращается в ошибку "уже забронирован". Повтор не трогает
+таблицы номеров и броней.
+
+Ключ хранится TTL секунд. Повтор может прийти на другой воркер или
+после перезапуска, поэтому хранилище общее (IDEMPOTENCY['BACKEND']):
+- database (по умолчанию) - таблица idempotent_requests, создаётся
+  миграцией; истёкшие ключи удаляются одним DELETE по индексу expires_at
+  раз в PURGE_EVERY новых ключей процесса;
+- cache - кэш Django IDEMPOTENCY['ALIAS'] (Redis или Memcached), вытеснение
+  делает сам кэш. Кэш в памяти процесса (LocMemCache) не годится: повтор
+  на другом воркере или после вытеснения создаст вторую бронь.
+Запись ключа:
+- при первом запросе add кладёт отметку "выполняется" на LOCK_TIMEOUT
+  секунд, так что из одновременных запросов с одним ключом выполняется
+  только один, остальные получают 409;
+- после ответа 2xx/4xx отметка заменяется ответом; после 5xx ключ
+  удаляется, чтобы повтор выполнился заново.
+
+Ключ действует в пределах пути; повтор с тем же ключом и другим телом
+запроса - ошибка 422. Тело сравнивается после разбора (поля формы и
+содержимое файлов или JSON), так что повтор multipart с другой границей
+или JSON с другим порядком ключей - тот же запрос.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .responses import FastJsonResponse
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'database',
+    'ALIAS': 'idempotency',
+    'TTL': 24 * 60 * 60,
+    'LOCK_TIMEOUT': 60,
+}
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+PURGE_EVERY = 1000
+FORM_CONTENT_TYPES = ('multipart/form-data', 'application/x-www-form-urlencoded')
+
+
+class CacheBackend:
+    """Ключи в кэше Django alias; значения - кортежи IdempotencyStore"""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, key):
+        return 'idempotency:' + key
+
+    def add(self, key, value, timeout):
+        return self.cache.add(self.key(key), value, timeout)
+
+    def get(self, key):
+        return self.cache.get(self.key(key))
+
+    def set(self, key, value, timeout):
+        self.cache.set(self.key(key), value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.key(key))
+
+    async def aadd(self, key, value, timeout):
+        return await self.cache.aadd(self.key(key), value, timeout)
+
+    async def aget(self, key):
+        return await self.cache.aget(self.key(key))
+
+    async def aset(self, key, value, timeout):
+        await self.cache.aset(self.key(key), value, timeout)
+
+    async def adelete(self, key):
+        await self.cache.adelete(self.key(key))
+
+
+class DatabaseBackend:
+    """Ключи в таблице idempotent_requests (bookings.models.IdempotentRequest)"""
+
+    def __init__(self, purge_every=PURGE_EVERY):
+        self.purge_every = purge_every
+        self.added = 0
+
+    @property
+    def model(self):
+        from bookings.models import IdempotentRequest
+        return IdempotentRequest
+
+    def fields(self, value, timeout):
+        fingerprint, status, content_type, content = value
+        return {
+            'fingerprint': fingerprint,
+            'status': status,
+            'content_type': content_type or '',
+            'content': content,
+            'expires_at': timezone.now() + timedelta(seconds=timeout),
+        }
+
+    def add(self, key, value, timeout):
+        fields = self.fields(value, timeout)
+        try:
+            with transaction.atomic():
+                self.model.objects.create(key=key, **fields)
+        except IntegrityError:
+            # истёкший ключ занимается заново тем же условным UPDATE,
+            # так что из одновременных запросов его получит только один
+            return bool(
+                self.model.objects.filter(key=key, expires_at__lte=timezone.now()).update(**fields)
+            )
+        self.added += 1
+        if self.added % self.purge_every == 0:
+            self.purge()
+        return True
+
+    def get(self, key):
+        row = (
+            self.model.objects.filter(key=key, expires_at__gt=timezone.now())
+            .values_list('fingerprint', 'status', 'content_type', 'content')
+            .first()
+        )
+        if row is None:
+            return None
+        fingerprint, status, content_type, content = row
+        return fingerprint, status, content_type, content if content is None else bytes(content)
+
+    def set(self, key, value, timeout):
+        self.model.objects.filter(key=key).update(**self.fields(value, timeout))
+
+    def delete(self, key):
+        self.model.objects.filter(key=key).delete()
+
+    def purge(self):
+        """Удаляет истёкшие ключи"""
+        return self.model.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+    async def aadd(self, key, value, timeout):
+        return await sync_to_async(self.add)(key, value, timeout)
+
+    async def aget(self, key):
+        return await sync_to_async(self.get)(key)
+
+    async def aset(self, key, value, timeout):
+        await sync_to_async(self.set)(key, value, timeout)
+
+    async def adelete(self, key):
+        await sync_to_async(self.delete)(key)
+
+
+def file_digest(upload):
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def fingerprint(request):
+    """Отпечаток разобранного тела запроса"""
+    if request.content_type in FORM_CONTENT_TYPES:
+        payload = {
+            'form': sorted(request.POST.lists()),
+            'files': sorted(
+                (name, upload.name, file_digest(upload))
+                for name, uploads in request.FILES.lists()
+                for upload in uploads
+            ),
+        }
+    else:
+        try:
+            payload = {'json': json.loads(request.body)}
+        except ValueError:
+            return hashlib.sha256(request.body).hexdigest()
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, backend, ttl, lock_timeout):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.replays = 0
+
+    def entry(self, request):
+        """(ключ хранилища, отпечаток тела) или None, если заголовка нет"""
+        key = request.headers.get(HEADER)
+        if not key:
+            return None
+        return hashlib.sha256(f'{request.path}\n{key}'.encode()).hexdigest(), fingerprint(request)
+
+    def pending(self, fingerprint):
+        return (fingerprint, None, None, None)
+
+    def stored(self, fingerprint, response):
+        """Значение для кэша или None, если ответ сохранять нельзя"""
+        if response.streaming or response.status_code >= 500:
+            return None
+        return (fingerprint, response.status_code, response['Content-Type'], response.content)
+
+    def replay(self, value, fingerprint):
+        if value is None or value[1] is None:
+            return error_response("Запрос с этим Idempotency-Key ещё выполняется", status=409)
+        stored_fingerprint, status, content_type, content = value
+        if stored_fingerprint != fingerprint:
+            return error_response("Idempotency-Key уже использован для другого запроса", status=422)
+        self.replays += 1
+        response = HttpResponse(content, status=status, content_type=content_type)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def stats(self):
+        return {"replays": self.replays}
+
+
+def error_response(message, status=400):
+    return FastJsonResponse({"error": message}, status=status)
+
+
+def invalid_key(request):
+    if len(request.headers.get(HEADER, '')) > MAX_KEY_LENGTH:
+        return error_response(f"{HEADER} не длиннее {MAX_KEY_LENGTH} символов")
+    return None
+
+
+def idempotent(view):
+    """Декоратор POST-представления (синхронного или асинхронного)"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            store = idempotency_store
+            entry = store.entry(request) if store is not None else None
+            if entry is None:
+                return await view(request, *args, **kwargs)
+            if error := invalid_key(request):
+                return error
+            key, body = entry
+            backend = store.backend
+            if not await backend.aadd(key, store.pending(body), store.lock_timeout):
+                return store.replay(await backend.aget(key), body)
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await backend.adelete(key)
+                raise
+            value = store.stored(body, response)
+            if value is None:
+                await backend.adelete(key)
+            else:
+                await backend.aset(key, value, store.ttl)
+            return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        store = idempotency_store
+        entry = store.entry(request) if store is not None else None
+        if entry is None:
+            return view(request, *args, **kwargs)
+        if error := invalid_key(request):
+            return error
+        key, body = entry
+        backend = store.backend
+        if not backend.add(key, store.pending(body), store.lock_timeout):
+            return store.replay(backend.get(key), body)
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            backend.delete(key)
+            raise
+        value = store.stored(body, response)
+        if value is None:
+            backend.delete(key)
+        else:
+            backend.set(key, value, store.ttl)
+        return response
+
+    return wrapper
+
+
+def build_store():
+    options = {**DEFAULTS, **getattr(settings, 'IDEMPOTENCY', {})}
+    if not options['ENABLED']:
+        return None
+    if options['BACKEND'] == 'database':
+        backend = DatabaseBackend()
+    elif options['BACKEND'] == 'cache':
+        backend = CacheBackend(options['ALIAS'])
+    else:
+        raise ValueError(f"Неизвестный бэкенд IDEMPOTENCY: {options['BACKEND']}")
+    return IdempotencyStore(backend, options['TTL'], options['LOCK_TIMEOUT'])
+
+
+idempotency_store = build_store()
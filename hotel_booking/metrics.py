@@ -0,0 +1,340 @@
+"""
+Метрики запросов в формате Prometheus
+
+MetricsMiddleware для каждого запроса записывает время ответа, число и
+суммарное время SQL-запросов, размер и статус ответа с разбивкой по
+маршруту (rooms/list, bookings/create, ...) и методу; нестандартные
+методы попадают в метку method="other", чтобы клиент не мог плодить
+ряды. GET /metrics отдаёт накопленные значения, статистику кэша списка
+номеров и очереди задач. Число задач - запрос к базе, поэтому оно
+пересчитывается не чаще раза в METRICS['JOB_STATS_TTL'] секунд.
+
+Доступ к /metrics: при заданном METRICS['TOKEN'] - только с заголовком
+Authorization: Bearer <токен>, иначе только с адресов
+METRICS['ALLOWED_IPS'] (по умолчанию локальных).
+
+SQL-запросы считаются обёрткой из connection.execute_wrapper, которая
+ставится на каждое соединение один раз и пишет в счётчики текущего
+запроса через ContextVar. Поэтому учитываются и запросы асинхронных
+представлений, которые Django выполняет в отдельном потоке.
+
+Значения хранятся в памяти процесса: при нескольких воркерах каждый
+отдаёт свои, а Prometheus суммирует их по instance. Для потоковых
+ответов размер не известен, а запросы при чтении потока не учитываются.
+
+Выключается настройкой METRICS['ENABLED'] = False.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_http_methods
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+DEFAULTS = {
+    'ENABLED': True,
+    'TOKEN': '',
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'JOB_STATS_TTL': 15,
+}
+
+current_request = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """Счётчики одного запроса"""
+
+    __slots__ = ('queries', 'query_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+class RouteMetrics:
+    """Накопленные метрики одного маршрута и метода"""
+
+    def __init__(self):
+        self.statuses = defaultdict(int)
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.query_seconds = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self.routes = defaultdict(RouteMetrics)
+        self.lock = threading.Lock()
+
+    def observe(self, route, method, status, duration, request_metrics, size):
+        with self.lock:
+            metrics = self.routes[route, method]
+            metrics.statuses[status] += 1
+            metrics.duration.observe(duration)
+            metrics.queries.observe(request_metrics.queries)
+            metrics.query_seconds += request_metrics.query_seconds
+            if size is not None:
+                metrics.size.observe(size)
+
+    def clear(self):
+        with self.lock:
+            self.routes.clear()
+
+    def render(self):
+        with self.lock:
+            routes = sorted(self.routes.items())
+            lines = []
+
+            header(lines, 'http_requests_total', 'counter', 'Число запросов')
+            for (route, method), metrics in routes:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'http_requests_total{{{labels(route, method)},status="{status}"}} {count}')
+
+            render_histogram(lines, routes, 'http_request_duration_seconds', 'duration',
+                             'Время ответа, секунды')
+            render_histogram(lines, routes, 'http_request_db_queries', 'queries',
+                             'Число SQL-запросов на запрос')
+
+            header(lines, 'http_request_db_seconds_total', 'counter', 'Суммарное время SQL-запросов, секунды')
+            for (route, method), metrics in routes:
+                lines.append(f'http_request_db_seconds_total{{{labels(route, method)}}} {metrics.query_seconds}')
+
+            render_histogram(lines, routes, 'http_response_size_bytes', 'size',
+                             'Размер ответа, байты (без потоковых ответов)')
+
+        render_cache_stats(lines)
+        render_idempotency_stats(lines)
+        render_job_stats(lines)
+        return '\n'.join(lines) + '\n'
+
+
+def metrics_options():
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+def method_label(method):
+    return method if method in METHODS else 'other'
+
+
+def labels(route, method):
+    return f'route="{route}",method="{method}"'
+
+
+def header(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def render_histogram(lines, routes, name, attribute, help_text):
+    header(lines, name, 'histogram', help_text)
+    for (route, method), metrics in routes:
+        histogram = getattr(metrics, attribute)
+        route_labels = labels(route, method)
+        for bound, total in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{route_labels},le="{bound}"}} {total}')
+        lines.append(f'{name}_sum{{{route_labels}}} {histogram.sum}')
+        lines.append(f'{name}_count{{{route_labels}}} {histogram.count}')
+
+
+def render_cache_stats(lines):
+    from rooms.cache import room_list_cache
+
+    stats = room_list_cache.stats()
+    for key in ('hits', 'misses', 'invalidations'):
+        name = f'room_list_cache_{key}_total'
+        header(lines, name, 'counter', f'Кэш GET /rooms/list: {key}')
+        lines.append(f'{name} {stats[key]}')
+
+
+def render_idempotency_stats(lines):
+    from .idempotency import idempotency_store
+
+    if idempotency_store is None:
+        return
+    name = 'idempotency_replays_total'
+    header(lines, name, 'counter', 'Повторы POST, отданные из хранилища Idempotency-Key')
+    lines.append(f'{name} {idempotency_store.stats()["replays"]}')
+
+
+class CachedValue:
+    """Результат compute(), который пересчитывается не чаще раза в ttl секунд"""
+
+    def __init__(self, compute):
+        self.compute = compute
+        self.value = None
+        self.computed_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self, ttl):
+        with self.lock:
+            now = time.monotonic()
+            if self.value is None or now - self.computed_at >= ttl:
+                self.value = self.compute()
+                self.computed_at = now
+            return self.value
+
+    def clear(self):
+        with self.lock:
+            self.value = None
+
+
+def job_stats():
+    from bookings.jobs import job_queue
+
+    return job_queue.stats()
+
+
+cached_job_stats = CachedValue(job_stats)
+
+
+def render_job_stats(lines):
+    from bookings.jobs import job_queue
+
+    if job_queue is None:
+        return
+    stats = cached_job_stats.get(metrics_options()['JOB_STATS_TTL'])
+    for key, help_text in (('pending', 'Задачи в очереди'), ('failed', 'Задачи, отменённые после всех попыток')):
+        name = f'jobs_{key}'
+        header(lines, name, 'gauge', help_text)
+        lines.append(f'{name} {stats[key]}')
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    request_metrics = current_request.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_metrics.queries += 1
+        request_metrics.query_seconds += time.perf_counter() - started
+
+
+def install_query_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Должен стоять первым в MIDDLEWARE, чтобы учитывать весь стек"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics_options()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(
+            install_query_wrapper, dispatch_uid='hotel_booking.metrics'
+        )
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        # соединение могло открыться до подключения сигнала
+        install_query_wrapper(connection)
+        request_metrics = RequestMetrics()
+        token = current_request.set(request_metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.observe(request, response, time.perf_counter() - started, request_metrics)
+        return response
+
+    async def __acall__(self, request):
+        request_metrics = RequestMetrics()
+        token = current_request.set(request_metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.observe(request, response, time.perf_counter() - started, request_metrics)
+        return response
+
+    def observe(self, request, response, duration, request_metrics):
+        registry.observe(
+            route_name(request),
+            method_label(request.method),
+            response.status_code,
+            duration,
+            request_metrics,
+            response_size(response),
+        )
+
+
+def metrics_allowed(request):
+    options = metrics_options()
+    if options['TOKEN']:
+        return constant_time_compare(
+            request.headers.get('Authorization', ''), f"Bearer {options['TOKEN']}"
+        )
+    return request.META.get('REMOTE_ADDR') in options['ALLOWED_IPS']
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """GET /metrics"""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
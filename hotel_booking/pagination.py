@@ -0,0 +1,231 @@
+"""
+Keyset-пагинация и потоковая выдача списков
+
+Списки отдаются в одном из трёх режимов:
+- без параметров: весь список одним JSON-массивом (как раньше);
+- ?limit=N[&cursor=...]: страница {"results": [...], "next_cursor": "..."},
+  следующая страница запрашивается по next_cursor. Курсор хранит значения
+  полей сортировки последней строки, поэтому страница стоит одинаково
+  независимо от того, насколько далеко от начала она находится;
+- ?stream=1[&cursor=...]: JSON-массив отдаётся частями через
+  StreamingHttpResponse, строки читаются из базы пачками через
+  .iterator(), и память воркера не зависит от размера результата.
+
+Для админки - EstimatedCountPaginator: число строк в списке без фильтров
+берётся из статистики PostgreSQL вместо COUNT(*) по всей таблице.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.http import StreamingHttpResponse
+
+from .responses import FastJsonResponse, dumps
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 2000
+# меньше этой оценки строки считаются точно
+ESTIMATE_THRESHOLD = 100000
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Неверный формат cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Неверный формат cursor")
+    return values
+
+
+def ordering_field(queryset, name):
+    """Поле модели или выражение аннотации, по которому идёт сортировка"""
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    return queryset.model._meta.get_field(name)
+
+
+def cursor_values(queryset, ordering, values):
+    """
+    Значения курсора, приведённые к типам полей сортировки (to_python),
+    чтобы подделанный курсор давал ValueError, а не ошибку базы
+    """
+    converted = []
+    for field, value in zip(ordering, values):
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError("Неверный формат cursor")
+        try:
+            converted.append(ordering_field(queryset, field.lstrip('-')).to_python(value))
+        except (ValidationError, TypeError, ValueError):
+            raise ValueError("Неверный формат cursor")
+        if converted[-1] is None:
+            raise ValueError("Неверный формат cursor")
+    return converted
+
+
+def keyset_filter(ordering, values):
+    """
+    Условие "строка идёт после values" для order_by(*ordering).
+    Последнее поле ordering должно быть уникальным (обычно id).
+    """
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def row_key(row, ordering):
+    return [getattr(row, field.lstrip('-')) for field in ordering]
+
+
+def parse_limit(value):
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("Неверный формат limit")
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit должен быть от 1 до {MAX_PAGE_SIZE}")
+    return limit
+
+
+def stream_json_array(rows, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    yield b'['
+    buffer = []
+    separator = b''
+    for row in rows:
+        buffer.append(dumps(serialize(row)))
+        if len(buffer) >= chunk_size:
+            yield separator + b','.join(buffer)
+            buffer = []
+            separator = b','
+    if buffer:
+        yield separator + b','.join(buffer)
+    yield b']'
+
+
+async def astream_json_array(rows, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    yield b'['
+    buffer = []
+    separator = b''
+    async for row in rows:
+        buffer.append(dumps(serialize(row)))
+        if len(buffer) >= chunk_size:
+            yield separator + b','.join(buffer)
+            buffer = []
+            separator = b','
+    if buffer:
+        yield separator + b','.join(buffer)
+    yield b']'
+
+
+def prepare_list(params, queryset, ordering):
+    """
+    Разбор параметров списка. Возвращает (queryset, mode, limit), где
+    mode - 'stream', 'all' или 'page'. При неверных limit/cursor бросает
+    ValueError.
+    """
+    cursor = params.get('cursor')
+    limit = params.get('limit')
+    stream = params.get('stream', '').lower() in ('1', 'true')
+
+    if cursor:
+        values = cursor_values(queryset, ordering, decode_cursor(cursor, len(ordering)))
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    queryset = queryset.order_by(*ordering)
+
+    if stream:
+        return queryset, 'stream', None
+    if limit is None and cursor is None:
+        return queryset, 'all', None
+    limit = parse_limit(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    return queryset[:limit + 1], 'page', limit
+
+
+def page_response(rows, limit, ordering, serialize):
+    """rows - до limit + 1 строк; лишняя строка означает, что есть следующая страница"""
+    next_cursor = encode_cursor(row_key(rows[limit - 1], ordering)) if len(rows) > limit else None
+    return FastJsonResponse({
+        "results": [serialize(row) for row in rows[:limit]],
+        "next_cursor": next_cursor,
+    })
+
+
+def list_response(params, queryset, ordering, serialize):
+    """Ответ со списком в режиме, выбранном параметрами запроса"""
+    queryset, mode, limit = prepare_list(params, queryset, ordering)
+
+    if mode == 'stream':
+        return StreamingHttpResponse(
+            stream_json_array(queryset.iterator(chunk_size=STREAM_CHUNK_SIZE), serialize),
+            content_type='application/json'
+        )
+    if mode == 'all':
+        return FastJsonResponse([serialize(row) for row in queryset])
+    return page_response(list(queryset), limit, ordering, serialize)
+
+
+async def alist_response(params, queryset, ordering, serialize):
+    """Асинхронный вариант list_response для ASGI-представлений"""
+    queryset, mode, limit = prepare_list(params, queryset, ordering)
+
+    if mode == 'stream':
+        return StreamingHttpResponse(
+            astream_json_array(queryset.aiterator(chunk_size=STREAM_CHUNK_SIZE), serialize),
+            content_type='application/json'
+        )
+    rows = [row async for row in queryset]
+    if mode == 'all':
+        return FastJsonResponse([serialize(row) for row in rows])
+    return page_response(rows, limit, ordering, serialize)
+
+
+def estimated_count(queryset):
+    """
+    Оценка числа строк таблицы queryset по pg_class.reltuples или None,
+    если оценки нет (не PostgreSQL или таблица ещё не анализировалась)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для ModelAdmin.paginator на больших таблицах: без фильтров
+    и поиска число строк - оценка estimated_count (от ESTIMATE_THRESHOLD
+    строк), с фильтрами - обычный COUNT(*). Последние страницы по оценке
+    могут оказаться пустыми или неполными.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
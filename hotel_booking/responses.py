@@ -0,0 +1,30 @@
+"""
+JSON-ответы API через orjson
+
+orjson сериализует в несколько раз быстрее json из стандартной
+библиотеки и сам понимает date/datetime/UUID; Decimal отдаётся строкой,
+как и раньше. Результат - bytes в UTF-8, без экранирования кириллицы.
+"""
+
+from decimal import Decimal
+
+import orjson
+from django.http import HttpResponse
+
+
+def default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(data):
+    return orjson.dumps(data, default=default)
+
+
+class FastJsonResponse(HttpResponse):
+    """Замена JsonResponse: любые данные, которые сериализует dumps"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
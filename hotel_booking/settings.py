@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hotel_booking.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +50,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Урезанный стек для путей JSON API (см. hotel_booking/handlers.py):
+# сессии, пользователь, сообщения, CSRF и X-Frame-Options API не нужны
+API_MIDDLEWARE = [
+    'hotel_booking.metrics.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+# сегменты пути: '/rooms' совпадает с /rooms и /rooms/..., но не с /roomsfoo
+API_PREFIXES = ('/rooms', '/bookings', '/analytics', '/metrics')
+
 ROOT_URLCONF = 'hotel_booking.urls'
 
 TEMPLATES = [
@@ -69,6 +80,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'hotel_booking.wsgi.application'
 
+# Асинхронные представления API; asgi.py включает их по умолчанию
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False').lower() == 'true'
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.postgresql',
@@ -88,7 +102,108 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'hotel_password'),
         'HOST': os.environ.get('DB_HOST', 'db'), 
         'PORT': os.environ.get('DB_PORT', '5432'),  
+        # Постоянные соединения: сколько секунд держать соединение между
+        # запросами, 0 - закрывать после каждого запроса
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
+        'OPTIONS': {},
+    }
+}
+
+# Пул соединений psycopg (Django >= 5.1). Соединение возвращается в пул
+# в конце запроса, поэтому CONN_MAX_AGE с пулом не совмещается. Под ASGI
+# постоянные соединения не переживают запрос, там нужен пул.
+if os.environ.get('DB_POOL', 'False').lower() == 'true':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
     }
+
+# Кэш GET /rooms/list (см. rooms/cache.py): local, django или none
+ROOM_LIST_CACHE = {
+    'BACKEND': os.environ.get('ROOM_LIST_CACHE_BACKEND', 'local'),
+    'ALIAS': os.environ.get('ROOM_LIST_CACHE_ALIAS', 'default'),
+    'MAX_ENTRIES': int(os.environ.get('ROOM_LIST_CACHE_MAX_ENTRIES', 256)),
+    'TIMEOUT': int(os.environ.get('ROOM_LIST_CACHE_TIMEOUT', 60)),
+}
+
+# Версии списков для ETag/Last-Modified (см. hotel_booking/versions.py):
+# database (таблица list_version_stamps, миграция bookings 0008), django
+# (общий кэш ALIAS, например Redis из LIST_VERSIONS_CACHE_BACKEND/LOCATION),
+# local (только для одного процесса) или none
+LIST_VERSIONS = {
+    'BACKEND': os.environ.get('LIST_VERSIONS_BACKEND', 'database'),
+    'ALIAS': os.environ.get('LIST_VERSIONS_ALIAS', 'versions'),
+    'LOCAL_TTL': int(os.environ.get('LIST_VERSIONS_LOCAL_TTL', 5)),
+}
+
+# Индекс занятости номеров в памяти процесса (см. bookings/intervals.py)
+BOOKING_INTERVAL_INDEX = {
+    'ENABLED': os.environ.get('BOOKING_INTERVAL_INDEX', 'False').lower() == 'true',
+    'TTL': int(os.environ.get('BOOKING_INTERVAL_INDEX_TTL', 30)),
+}
+
+# Сводка ночей по номерам и месяцам для /analytics/* (см. bookings/analytics.py);
+# после включения заполнить: manage.py refresh_analytics
+ANALYTICS_SUMMARY = {
+    'ENABLED': os.environ.get('ANALYTICS_SUMMARY', 'False').lower() == 'true',
+}
+
+# Календари цен номеров в памяти процесса для /rooms/quote (см. rooms/rates.py)
+RATE_CALENDARS = {
+    'ENABLED': os.environ.get('RATE_CALENDARS', 'True').lower() == 'true',
+    'TTL': int(os.environ.get('RATE_CALENDARS_TTL', 60)),
+    'DAYS': int(os.environ.get('RATE_CALENDARS_DAYS', 400)),
+    'MAX_ROOMS': int(os.environ.get('RATE_CALENDARS_MAX_ROOMS', 5000)),
+}
+
+# Очередь фоновых задач в базе (см. bookings/jobs.py); при включении
+# задачи выполняет manage.py run_worker
+JOB_QUEUE = {
+    'ENABLED': os.environ.get('JOB_QUEUE', 'False').lower() == 'true',
+    'BATCH_SIZE': int(os.environ.get('JOB_QUEUE_BATCH_SIZE', 100)),
+    'MAX_ATTEMPTS': int(os.environ.get('JOB_QUEUE_MAX_ATTEMPTS', 5)),
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+if os.environ.get('LIST_VERSIONS_CACHE_BACKEND'):
+    CACHES['versions'] = {
+        'BACKEND': os.environ['LIST_VERSIONS_CACHE_BACKEND'],
+        'LOCATION': os.environ.get('LIST_VERSIONS_CACHE_LOCATION', ''),
+    }
+
+# Повторы POST по заголовку Idempotency-Key (см. hotel_booking/idempotency.py).
+# Ключи должны быть общими для всех воркеров и процессов: database - таблица
+# idempotent_requests (миграция bookings 0007), cache - кэш ALIAS, например
+# Redis или Memcached из IDEMPOTENCY_CACHE_BACKEND/LOCATION
+IDEMPOTENCY = {
+    'ENABLED': os.environ.get('IDEMPOTENCY', 'True').lower() == 'true',
+    'BACKEND': os.environ.get('IDEMPOTENCY_BACKEND', 'database'),
+    'ALIAS': os.environ.get('IDEMPOTENCY_CACHE_ALIAS', 'idempotency'),
+    'TTL': int(os.environ.get('IDEMPOTENCY_TTL', 24 * 60 * 60)),
+    'LOCK_TIMEOUT': int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60)),
+}
+
+if os.environ.get('IDEMPOTENCY_CACHE_BACKEND'):
+    CACHES['idempotency'] = {
+        'BACKEND': os.environ['IDEMPOTENCY_CACHE_BACKEND'],
+        'LOCATION': os.environ.get('IDEMPOTENCY_CACHE_LOCATION', ''),
+    }
+
+# Метрики запросов для GET /metrics (см. hotel_booking/metrics.py)
+METRICS = {
+    'ENABLED': os.environ.get('METRICS', 'True').lower() == 'true',
+    # Bearer-токен для сборщика; без него /metrics доступен только с ALLOWED_IPS
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+    'ALLOWED_IPS': os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(','),
+    'JOB_STATS_TTL': int(os.environ.get('METRICS_JOB_STATS_TTL', 15)),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -0,0 +1,605 @@
+import json
+import re
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from bookings.models import Booking
+from hotel_booking.handlers import WSGIDispatcher
+from hotel_booking.idempotency import CacheBackend, DatabaseBackend, IdempotencyStore, idempotent
+from hotel_booking.metrics import MetricsMiddleware, registry
+from hotel_booking.responses import FastJsonResponse
+from hotel_booking.versions import DjangoBackend, ListVersions, LocalBackend
+from hotel_booking.versions import DatabaseBackend as VersionsDatabaseBackend
+from rooms.cache import room_list_cache
+from rooms.models import Room
+
+
+def sample(text, name, **labels):
+    """Значение метрики name с указанными метками из вывода /metrics"""
+    for line in text.splitlines():
+        match = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+        if not match or match.group(1) != name:
+            continue
+        line_labels = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ''))
+        if all(line_labels.get(key) == str(value) for key, value in labels.items()):
+            return float(match.group(3))
+    return None
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        room_list_cache.clear()
+        # версии списков из общего кэша - лишние запросы в счётчиках
+        patcher = patch("hotel_booking.versions.list_versions", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def metrics(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return response.content.decode()
+
+    def test_requests_queries_and_sizes(self):
+        Room.objects.create(description="A", price=100)
+        hits = room_list_cache.hits
+        response = self.client.get("/rooms/list?limit=10")
+        self.client.get("/rooms/list?limit=10")
+        self.client.post("/rooms/delete", {"room_id": "abc"})
+
+        text = self.metrics()
+        route = {"route": "rooms/list", "method": "GET"}
+        self.assertEqual(sample(text, "http_requests_total", status=200, **route), 2)
+        self.assertEqual(sample(text, "http_requests_total", route="rooms/delete", status=400), 1)
+        self.assertEqual(sample(text, "http_request_duration_seconds_count", **route), 2)
+        # первый запрос идёт в базу, второй отдаётся из кэша
+        self.assertEqual(sample(text, "http_request_db_queries_sum", **route), 1)
+        self.assertEqual(sample(text, "http_request_db_queries_bucket", le=0, **route), 1)
+        self.assertGreater(sample(text, "http_request_db_seconds_total", **route), 0)
+        self.assertEqual(
+            sample(text, "http_response_size_bytes_sum", **route), 2 * len(response.content)
+        )
+        self.assertEqual(sample(text, "room_list_cache_hits_total"), hits + 1)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for _ in range(3):
+            self.client.get("/rooms/list")
+        text = self.metrics()
+        buckets = [
+            float(value) for value in re.findall(
+                r'http_request_duration_seconds_bucket\{route="rooms/list",method="GET",le="[^"]+"\} (\S+)', text
+            )
+        ]
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertEqual(buckets[-1], 3)
+
+    def test_unmatched_route(self):
+        self.client.get("/no/such/path")
+        self.assertEqual(sample(self.metrics(), "http_requests_total", route="unmatched", status=404), 1)
+
+    async def test_async_middleware(self):
+        async def view(request):
+            await Room.objects.acreate(description="A", price=100)
+            return HttpResponse("ok")
+
+        middleware = MetricsMiddleware(view)
+        response = await middleware(AsyncRequestFactory().get("/rooms/list"))
+        self.assertEqual(response.status_code, 200)
+        text = registry.render()
+        self.assertEqual(sample(text, "http_requests_total", route="unmatched", status=200), 1)
+        self.assertEqual(sample(text, "http_request_db_queries_sum", route="unmatched"), 1)
+
+    def test_unknown_methods_share_label(self):
+        for method in ("BREW", "PROPFIND", "X-ANY"):
+            self.client.generic(method, "/rooms/list")
+        text = self.metrics()
+        self.assertEqual(sample(text, "http_requests_total", route="rooms/list", method="other", status=405), 3)
+        self.assertNotIn('method="BREW"', text)
+
+    def test_access(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.0.0.5").status_code, 403)
+        with override_settings(METRICS={"TOKEN": "secret"}):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            response = self.client.get(
+                "/metrics", REMOTE_ADDR="10.0.0.5", headers={"Authorization": "Bearer secret"}
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get("/metrics", headers={"Authorization": "Bearer other"})
+            self.assertEqual(response.status_code, 403)
+
+    def test_job_stats_are_cached(self):
+        from bookings.jobs import JobQueue
+        from bookings.models import Job
+        from hotel_booking.metrics import cached_job_stats
+
+        cached_job_stats.clear()
+        self.addCleanup(cached_job_stats.clear)
+        Job.objects.create(name="room.created", payload={})
+        with patch("bookings.jobs.job_queue", JobQueue(10, 5, 10, 300)):
+            self.assertEqual(sample(self.metrics(), "jobs_pending"), 1)
+            Job.objects.create(name="room.created", payload={})
+            with CaptureQueriesContext(connection) as queries:
+                text = self.metrics()
+            self.assertEqual(sample(text, "jobs_pending"), 1)
+            self.assertFalse(any("jobs" in query["sql"] for query in queries))
+            with override_settings(METRICS={"JOB_STATS_TTL": 0}):
+                self.assertEqual(sample(self.metrics(), "jobs_pending"), 2)
+
+    @override_settings(METRICS={"ENABLED": False})
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: HttpResponse())
+
+
+class FastJsonResponseTests(TestCase):
+    def test_native_types(self):
+        response = FastJsonResponse(
+            [{"price": Decimal("10.50"), "date": date(2025, 1, 2), "text": "Люкс"}], status=201
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("Люкс".encode(), response.content)
+        self.assertEqual(
+            json.loads(response.content), [{"price": "10.50", "date": "2025-01-02", "text": "Люкс"}]
+        )
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse({"value": object()})
+
+
+class ApiMiddlewareStackTests(TestCase):
+    def setUp(self):
+        # как тестовый клиент: не закрывать соединение внутри транзакции теста
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        self.application = WSGIDispatcher()
+
+    def call(self, path):
+        environ = RequestFactory().get(path).environ
+        result = {}
+
+        def start_response(status, headers):
+            result["status"] = int(status.split()[0])
+            result["headers"] = dict(headers)
+
+        response = self.application(environ, start_response)
+        result["body"] = b"".join(response)
+        response.close()
+        return result
+
+    def test_api_paths_use_slim_stack(self):
+        Room.objects.create(description="A", price=100)
+        result = self.call("/rooms/list")
+        self.assertEqual(result["status"], 200)
+        self.assertEqual(len(json.loads(result["body"])), 1)
+        self.assertNotIn("X-Frame-Options", result["headers"])
+
+    def test_other_paths_use_full_stack(self):
+        result = self.call("/admin/login/")
+        self.assertEqual(result["status"], 200)
+        self.assertIn("X-Frame-Options", result["headers"])
+
+    def test_settings_middleware_is_untouched(self):
+        from django.conf import settings
+
+        with patch.object(type(self.application.api), "middleware_paths", side_effect=ImportError):
+            with self.assertRaises(ImportError):
+                type(self.application.api)()
+        self.assertIn("django.contrib.sessions.middleware.SessionMiddleware", settings.MIDDLEWARE)
+        self.assertNotEqual(settings.MIDDLEWARE, settings.API_MIDDLEWARE)
+
+    def test_prefixes_match_path_segments(self):
+        from hotel_booking.handlers import is_api_path
+
+        for path in ("/metrics", "/rooms/list", "/rooms", "/analytics/revenue"):
+            self.assertTrue(is_api_path(path), path)
+        for path in ("/metricsfoo", "/roomsfoo/list", "/admin/rooms/", "/"):
+            self.assertFalse(is_api_path(path), path)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.store = IdempotencyStore(DatabaseBackend(), ttl=60, lock_timeout=60)
+        patcher = patch("hotel_booking.idempotency.idempotency_store", self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.room = Room.objects.create(description="Room", price=100)
+        self.start = date.today() + timedelta(days=1)
+
+    def book(self, key, **data):
+        data = {
+            "room_id": self.room.id,
+            "date_start": self.start.isoformat(),
+            "date_end": (self.start + timedelta(days=2)).isoformat(),
+            **data,
+        }
+        return self.client.post("/bookings/create", data, headers={"Idempotency-Key": key})
+
+    def test_retry_replays_stored_response(self):
+        first = self.book("key-1")
+        self.assertEqual(first.status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.book("key-1")
+        # только таблица ключей, в номера и брони повтор не ходит
+        self.assertEqual(
+            [query["sql"] for query in queries if not re.search(r"SAVEPOINT|idempotent_requests", query["sql"])], []
+        )
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(self.store.stats()["replays"], 1)
+        self.assertIn("idempotency_replays_total 1", self.client.get("/metrics").content.decode())
+
+    def test_replay_from_another_process(self):
+        # другой процесс: своё хранилище ключей поверх той же таблицы
+        self.assertEqual(self.book("key-1").status_code, 201)
+        other = IdempotencyStore(DatabaseBackend(), ttl=60, lock_timeout=60)
+        with patch("hotel_booking.idempotency.idempotency_store", other):
+            retry = self.book("key-1")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(other.stats()["replays"], 1)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_default_store_is_shared(self):
+        from hotel_booking.idempotency import build_store
+
+        self.assertIsInstance(build_store().backend, DatabaseBackend)
+
+    def test_expired_key_is_taken_over_and_purged(self):
+        from django.utils import timezone
+        from bookings.models import IdempotentRequest
+
+        expired = timezone.now() - timedelta(seconds=1)
+        backend = DatabaseBackend()
+        self.assertTrue(backend.add("k", self.store.pending("a"), 60))
+        self.assertFalse(backend.add("k", self.store.pending("b"), 60))
+        IdempotentRequest.objects.update(expires_at=expired)
+        self.assertIsNone(backend.get("k"))
+        self.assertTrue(backend.add("k", self.store.pending("b"), 60))
+        self.assertEqual(backend.get("k"), ("b", None, "", None))
+
+        IdempotentRequest.objects.update(expires_at=expired)
+        purging = DatabaseBackend(purge_every=1)
+        self.assertTrue(purging.add("other", self.store.pending("c"), 60))
+        self.assertEqual(list(IdempotentRequest.objects.values_list("key", flat=True)), ["other"])
+
+    def test_cache_backend(self):
+        caches['default'].clear()
+        store = IdempotencyStore(CacheBackend('default'), ttl=60, lock_timeout=60)
+        with patch("hotel_booking.idempotency.idempotency_store", store):
+            self.assertEqual(self.book("key-1").status_code, 201)
+            self.assertEqual(self.book("key-1")["Idempotent-Replayed"], "true")
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_fingerprint_uses_parsed_body(self):
+        from django.test.client import encode_multipart
+
+        data = {"description": "A", "price_per_night": "10"}
+
+        def multipart(boundary, data):
+            return RequestFactory().post(
+                "/x", encode_multipart(boundary, data),
+                content_type=f"multipart/form-data; boundary={boundary}"
+            )
+
+        def fingerprint(request):
+            return self.store.entry(request)[1]
+
+        request = RequestFactory().post("/x", data, headers={"Idempotency-Key": "k"})
+        for other in (multipart("other-boundary", dict(reversed(data.items()))),
+                      RequestFactory().post("/x", data)):
+            other.META["HTTP_IDEMPOTENCY_KEY"] = "k"
+            self.assertEqual(fingerprint(other), fingerprint(request))
+        changed = multipart("other-boundary", {**data, "price_per_night": "11"})
+        changed.META["HTTP_IDEMPOTENCY_KEY"] = "k"
+        self.assertNotEqual(fingerprint(changed), fingerprint(request))
+
+        def json_request(body):
+            request = RequestFactory().post("/x", body, content_type="application/json")
+            request.META["HTTP_IDEMPOTENCY_KEY"] = "k"
+            return request
+
+        self.assertEqual(fingerprint(json_request('[{"a": 1, "b": 2}]')),
+                         fingerprint(json_request('[{"b":2,"a":1}]')))
+
+    def test_without_key_or_other_key(self):
+        self.assertEqual(self.book("key-1").status_code, 201)
+        response = self.client.post("/rooms/create", {"description": "A", "price_per_night": 10})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post("/rooms/create", {"description": "A", "price_per_night": 10})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Room.objects.filter(description="A").count(), 2)
+        # тот же ключ на другом пути - другой запрос
+        response = self.client.post(
+            "/rooms/create", {"description": "B", "price_per_night": 10},
+            headers={"Idempotency-Key": "key-1"}
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_key_reused_with_other_body(self):
+        self.book("key-1")
+        response = self.book("key-1", date_end=(self.start + timedelta(days=3)).isoformat())
+        self.assertEqual(response.status_code, 422)
+
+    def test_client_errors_are_stored_and_server_errors_are_not(self):
+        self.assertEqual(self.book("bad", room_id=999999).status_code, 404)
+        self.assertEqual(self.book("bad", room_id=999999)["Idempotent-Replayed"], "true")
+
+        with patch("bookings.services.create_booking", side_effect=RuntimeError("db down")):
+            self.assertEqual(self.book("retry").status_code, 500)
+        self.assertEqual(self.book("retry").status_code, 201)
+
+    def test_request_in_progress(self):
+        request = RequestFactory().post("/x", {"a": 1}, headers={"Idempotency-Key": "k"})
+        key, fingerprint = self.store.entry(request)
+        # первый запрос с этим ключом ещё не ответил
+        self.store.backend.add(key, self.store.pending(fingerprint), 60)
+        view = idempotent(lambda request: HttpResponse("created", status=201))
+        self.assertEqual(view(request).status_code, 409)
+
+    def test_key_too_long(self):
+        self.assertEqual(self.book("k" * 300).status_code, 400)
+
+    async def test_async_view(self):
+        from rooms import async_views
+
+        factory = AsyncRequestFactory()
+
+        def request():
+            return factory.post(
+                "/rooms/create", {"description": "Async", "price_per_night": 10},
+                headers={"Idempotency-Key": "async-1"}
+            )
+        first = await async_views.create_room(request())
+        retry = await async_views.create_room(request())
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(await Room.objects.filter(description="Async").acount(), 1)
+
+
+class ConditionalListTests(TestCase):
+    def setUp(self):
+        self.versions = ListVersions(LocalBackend(ttl=60))
+        self.versions.connect()
+        self.addCleanup(self.versions.disconnect)
+        patcher = patch("hotel_booking.versions.list_versions", self.versions)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        room_list_cache.clear()
+        self.room = Room.objects.create(description="Room", price=100)
+        self.other = Room.objects.create(description="Other", price=100)
+        self.start = date.today() + timedelta(days=1)
+
+    def revalidate(self, path, params, response):
+        return self.client.get(path, params, headers={"If-None-Match": response["ETag"]})
+
+    def bookings(self):
+        return self.client.get("/bookings/list", {"room_id": self.room.id})
+
+    def test_unchanged_list_is_not_modified(self):
+        for path, params in (("/rooms/list", {"limit": 10}), ("/bookings/list", {"room_id": self.room.id})):
+            response = self.client.get(path, params)
+            self.assertEqual(response.status_code, 200)
+            with self.assertNumQueries(0):
+                retry = self.revalidate(path, params, response)
+            self.assertEqual(retry.status_code, 304)
+            self.assertEqual(retry.content, b"")
+        # другие параметры - другой ETag
+        response = self.client.get("/rooms/list", {"limit": 10})
+        self.assertEqual(self.revalidate("/rooms/list", {"limit": 5}, response).status_code, 200)
+
+    def test_writes_change_versions(self):
+        rooms = self.client.get("/rooms/list")
+        bookings = self.bookings()
+        other = self.client.get("/bookings/list", {"room_id": self.other.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/bookings/create", {
+                "room_id": self.room.id,
+                "date_start": self.start.isoformat(),
+                "date_end": (self.start + timedelta(days=1)).isoformat(),
+            })
+        self.assertEqual(self.revalidate("/rooms/list", {}, rooms).status_code, 200)
+        self.assertEqual(self.revalidate("/bookings/list", {"room_id": self.room.id}, bookings).status_code, 200)
+        # брони другого номера не менялись
+        self.assertEqual(
+            self.revalidate("/bookings/list", {"room_id": self.other.id}, other).status_code, 304
+        )
+
+        bookings = self.bookings()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/bookings/delete", {"booking_id": Booking.objects.get().id})
+        self.assertEqual(self.revalidate("/bookings/list", {"room_id": self.room.id}, bookings).status_code, 200)
+
+        bookings = self.bookings()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/bookings/bulk_create",
+                json.dumps([{
+                    "room_id": self.room.id,
+                    "date_start": self.start.isoformat(),
+                    "date_end": (self.start + timedelta(days=1)).isoformat(),
+                }]),
+                content_type="application/json"
+            )
+        self.assertEqual(self.revalidate("/bookings/list", {"room_id": self.room.id}, bookings).status_code, 200)
+
+    def test_last_modified_with_shared_backend(self):
+        self.versions.backend = DjangoBackend("default")
+        response = self.bookings()
+        self.assertIn("Last-Modified", response)
+        retry = self.client.get(
+            "/bookings/list", {"room_id": self.room.id},
+            headers={"If-Modified-Since": response["Last-Modified"]}
+        )
+        self.assertEqual(retry.status_code, 304)
+
+    def test_local_backend_has_no_last_modified(self):
+        self.assertNotIn("Last-Modified", self.bookings())
+
+    def test_local_versions_expire(self):
+        rooms = self.client.get("/rooms/list")
+        self.assertEqual(self.revalidate("/rooms/list", {}, rooms).status_code, 304)
+        # запись в другом процессе этот воркер не видит, но метка устаревает
+        with patch("hotel_booking.versions.time.monotonic", return_value=time.monotonic() + 60):
+            self.assertEqual(self.revalidate("/rooms/list", {}, rooms).status_code, 200)
+
+    def test_default_backend_is_shared(self):
+        from hotel_booking.versions import build_versions
+
+        self.assertIsInstance(build_versions().backend, VersionsDatabaseBackend)
+
+    def test_write_in_another_process(self):
+        self.versions.backend = VersionsDatabaseBackend()
+        bookings = self.bookings()
+        self.assertEqual(
+            self.revalidate("/bookings/list", {"room_id": self.room.id}, bookings).status_code, 304
+        )
+        # import_bookings в другом процессе: своё хранилище версий
+        ListVersions(VersionsDatabaseBackend()).changed([self.room.id])
+        self.assertEqual(
+            self.revalidate("/bookings/list", {"room_id": self.room.id}, bookings).status_code, 200
+        )
+
+    def test_cached_list_follows_shared_version(self):
+        self.versions.backend = VersionsDatabaseBackend()
+        rooms = self.client.get("/rooms/list")
+        # другой процесс поменял номер и версию, локальный кэш этого не видел
+        Room.objects.filter(pk=self.room.pk).update(description="Changed")
+        ListVersions(VersionsDatabaseBackend()).changed([self.room.id])
+        response = self.revalidate("/rooms/list", {}, rooms)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Changed", [room["description"] for room in response.json()])
+
+    def test_failed_bump_does_not_fail_committed_write(self):
+        from django.db import DatabaseError
+
+        with patch.object(self.versions.backend, "bump", side_effect=DatabaseError("versions down")):
+            with self.assertLogs("hotel_booking.versions", "ERROR"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.post("/rooms/create", {"description": "New", "price_per_night": 10})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Room.objects.filter(description="New").exists())
+
+    def test_invalid_room_id_is_not_conditional(self):
+        response = self.client.get("/bookings/list", {"room_id": "x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("ETag", response)
+
+    async def test_async_views(self):
+        from bookings import async_views as booking_views
+        from rooms import async_views as room_views
+
+        factory = AsyncRequestFactory()
+        for view, params in ((room_views.list_rooms, {}), (booking_views.list_bookings, {"room_id": self.room.id})):
+            response = await view(factory.get("/list", params))
+            self.assertEqual(response.status_code, 200)
+            retry = await view(factory.get("/list", params, headers={"If-None-Match": response["ETag"]}))
+            self.assertEqual(retry.status_code, 304)
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов к базе на вызов эндпоинта"""
+
+    def setUp(self):
+        room_list_cache.clear()
+        self.room = Room.objects.create(description="Room", price=100)
+        self.start = date.today() + timedelta(days=1)
+
+    def dates(self, offset=0, nights=1):
+        date_start = self.start + timedelta(days=offset)
+        return {
+            "date_start": date_start.isoformat(),
+            "date_end": (date_start + timedelta(days=nights)).isoformat(),
+        }
+
+    def assertQueryBudget(self, budget, method, path, data=None, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(path, data, **kwargs)
+        # точки сохранения добавляет транзакция TestCase вокруг теста
+        queries = [
+            query["sql"] for query in context.captured_queries
+            if not query["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT"))
+        ]
+        self.assertLessEqual(len(queries), budget, "\n".join(queries))
+        return response
+
+    def test_create_booking(self):
+        response = self.assertQueryBudget(1, "post", "/bookings/create", {"room_id": self.room.id, **self.dates()})
+        self.assertEqual(response.status_code, 201)
+        booking = Booking.objects.get()
+        self.assertEqual(response.json()["booking_id"], booking.id)
+        self.assertEqual(booking.date_start, self.start)
+        self.assertIsNotNone(booking.created_at)
+
+        # отказ: второй запрос различает занятый период и отсутствующий номер
+        response = self.assertQueryBudget(2, "post", "/bookings/create", {"room_id": self.room.id, **self.dates()})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.count(), 1)
+        response = self.assertQueryBudget(2, "post", "/bookings/create", {"room_id": self.room.id + 100, **self.dates()})
+        self.assertEqual(response.status_code, 404)
+        response = self.assertQueryBudget(0, "post", "/bookings/create", {"room_id": self.room.id, **self.dates(nights=0)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_room(self):
+        response = self.assertQueryBudget(1, "post", "/rooms/create", {"description": "New", "price_per_night": "10"})
+        self.assertEqual(response.status_code, 201)
+
+    def test_delete_booking(self):
+        booking = Booking.objects.create(room=self.room, date_start=self.start, date_end=self.start + timedelta(days=1))
+        response = self.assertQueryBudget(2, "post", "/bookings/delete", {"booking_id": booking.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_delete_room(self):
+        for offset in range(3):
+            Booking.objects.create(
+                room=self.room,
+                date_start=self.start + timedelta(days=offset),
+                date_end=self.start + timedelta(days=offset + 1)
+            )
+        # на PostgreSQL каскад в базе (миграции bookings 0005 и rooms 0004),
+        # иначе каскад Django: тарифы и скидки номера выбираются для сигналов
+        # post_delete календарей цен
+        budget = 2 if connection.vendor == "postgresql" else 6
+        response = self.assertQueryBudget(budget, "post", "/rooms/delete", {"room_id": self.room.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("и 3 бронирований", response.json()["message"])
+        self.assertFalse(Room.objects.exists())
+        self.assertFalse(Booking.objects.exists())
+
+        response = self.assertQueryBudget(1, "post", "/rooms/delete", {"room_id": self.room.id})
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_create_bookings(self):
+        items = [{"room_id": self.room.id, **self.dates(offset * 2)} for offset in range(10)]
+        response = self.assertQueryBudget(
+            3, "post", "/bookings/bulk_create", json.dumps(items), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.count(), 10)
+
+    def test_lists(self):
+        from hotel_booking.versions import ROOMS, list_versions, room_version
+
+        Booking.objects.create(room=self.room, date_start=self.start, date_end=self.start + timedelta(days=1))
+        # плюс чтение версии списка из общего кэша (LIST_VERSIONS)
+        list_versions.get(ROOMS)
+        list_versions.get(room_version(self.room.id))
+        self.assertQueryBudget(2, "get", "/rooms/list")
+        self.assertQueryBudget(3, "get", "/bookings/list", {"room_id": self.room.id})
+        self.assertQueryBudget(1, "get", "/rooms/available", self.dates(offset=5))
@@ -18,6 +18,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
+from .metrics import metrics_view
 
 def api_info(request):
     return JsonResponse({
@@ -27,13 +28,25 @@ def api_info(request):
             "rooms": {
                 "create": "POST /rooms/create",
                 "list": "GET /rooms/list", 
+                "available": "GET /rooms/available",
+                "search": "GET /rooms/search",
+                "calendar": "GET /rooms/calendar",
+                "free_slots": "GET /rooms/free_slots",
+                "quote": "GET /rooms/quote",
                 "delete": "POST /rooms/delete"
             },
             "bookings": {
                 "create": "POST /bookings/create",
+                "bulk_create": "POST /bookings/bulk_create",
                 "list": "GET /bookings/list",
+                "export": "GET /bookings/export",
                 "delete": "POST /bookings/delete"
-            }
+            },
+            "analytics": {
+                "revenue": "GET /analytics/revenue",
+                "occupancy": "GET /analytics/occupancy"
+            },
+            "metrics": "GET /metrics"
         },
         "example": "curl -X POST -d 'description=Люкс' -d 'price_per_night=5000' http://localhost:9000/rooms/create"
     })
@@ -41,6 +54,7 @@ def api_info(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', api_info, name='api_info'),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('rooms.urls')),
     path('', include('bookings.urls')),
 ]
@@ -0,0 +1,265 @@
+"""
+Версии списков для условных GET (ETag / Last-Modified)
+
+Клиенты, опрашивающие GET /rooms/list и GET /bookings/list, получают
+ETag и Last-Modified, и повтор с If-None-Match / If-Modified-Since при
+неизменном списке получает 304 без запроса списка и сериализации.
+
+Версии ведутся на запись, а не считаются по базе:
+- "rooms" - общая, меняется при любом изменении номеров и броней
+  (в списке номеров есть число броней);
+- "room:<id>" - брони одного номера.
+Версия - (метка, время изменения или None). Создание и изменение номеров и
+броней отслеживается сигналом post_save (он не мешает быстрому
+каскадному удалению), удаления и вставки броней мимо save()
+(bookings.services.bookings_inserted) - явными вызовами
+changed/changed_on_commit.
+
+Бэкенд задаётся настройкой LIST_VERSIONS:
+- "database" (по умолчанию): таблица list_version_stamps (создаётся
+  миграцией), одно чтение по первичному ключу на проверку, одна вставка
+  с обновлением на запись. Версии общие для всех воркеров и процессов:
+  записи из другого воркера, import_bookings, seed и run_worker меняют
+  ETag у всех. Last-Modified точен до секунды, точная проверка - по ETag;
+- "django": то же в кэше Django с алиасом ALIAS (Redis, Memcached);
+- "local": версии в памяти процесса, только для одного процесса. Воркер
+  не знает о записях, сделанных в других процессах, и отдавал бы 304 на
+  устаревший список, поэтому каждая версия живёт не дольше LOCAL_TTL
+  секунд, после чего получает новую метку - устаревший ответ
+  подтверждается не дольше этого срока. Last-Modified не отдаётся:
+  время изменения, которое видит один воркер, для других неверно;
+- "none": условные GET выключены.
+
+Версии меняются уже после коммита записи, поэтому ошибка хранилища
+версий не превращает сохранённую запись в ответ 500: она пишется в лог,
+и до следующей записи клиенты могут получать 304 на прежний список.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.views.decorators.http import condition
+
+DEFAULTS = {
+    'BACKEND': 'database',
+    'ALIAS': 'versions',
+    'LOCAL_TTL': 5,
+}
+
+ROOMS = 'rooms'
+
+logger = logging.getLogger(__name__)
+
+
+def room_version(room_id):
+    return f'room:{room_id}'
+
+
+class LocalBackend:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.epoch = uuid.uuid4().hex[:8]
+        self.counter = 0
+        # имя -> (версия, time.monotonic() её выдачи)
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def new_version(self):
+        self.counter += 1
+        return (f'{self.epoch}.{self.counter}', None), time.monotonic()
+
+    def get(self, name):
+        with self.lock:
+            entry = self.versions.get(name)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                entry = self.versions[name] = self.new_version()
+            return entry[0]
+
+    def bump(self, names):
+        with self.lock:
+            entry = self.new_version()
+            for name in names:
+                self.versions[name] = entry
+
+
+class DjangoBackend:
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, name):
+        return f'versions:{name}'
+
+    def get(self, name):
+        key = self.key(name)
+        version = self.cache.get(key)
+        if version is None:
+            # ключ вытеснен или ещё не создан: новая метка, старые ETag не совпадут
+            version = (uuid.uuid4().hex[:12], time.time())
+            if not self.cache.add(key, version, None):
+                version = self.cache.get(key)
+        return version
+
+    def bump(self, names):
+        version = (uuid.uuid4().hex[:12], time.time())
+        self.cache.set_many({self.key(name): version for name in names}, None)
+
+
+class DatabaseBackend:
+    """Версии в таблице list_version_stamps (bookings.models.ListVersion)"""
+
+    @property
+    def model(self):
+        from bookings.models import ListVersion
+        return ListVersion
+
+    def new_version(self):
+        return uuid.uuid4().hex[:12], datetime.now(timezone.utc)
+
+    def read(self, name):
+        return self.model.objects.filter(name=name).values_list('version', 'changed_at').first()
+
+    def get(self, name):
+        row = self.read(name)
+        if row is None:
+            # версии ещё нет: новая метка, старые ETag не совпадут
+            version, changed_at = self.new_version()
+            self.model.objects.bulk_create(
+                [self.model(name=name, version=version, changed_at=changed_at)], ignore_conflicts=True
+            )
+            row = self.read(name)
+        version, changed_at = row
+        return version, changed_at.timestamp()
+
+    def bump(self, names):
+        version, changed_at = self.new_version()
+        self.model.objects.bulk_create(
+            [self.model(name=name, version=version, changed_at=changed_at) for name in names],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['version', 'changed_at'],
+        )
+
+
+class ListVersions:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, name):
+        return self.backend.get(name)
+
+    def changed(self, room_ids=()):
+        """Номера room_ids или их брони изменились"""
+        names = [ROOMS, *(room_version(room_id) for room_id in room_ids)]
+        try:
+            self.backend.bump(names)
+        except Exception:
+            logger.exception("Не удалось обновить версии списков %s", names)
+
+    def changed_on_commit(self, room_ids=()):
+        room_ids = list(room_ids)
+        transaction.on_commit(lambda: self.changed(room_ids))
+
+    def on_room_saved(self, sender, instance, **kwargs):
+        self.changed_on_commit([instance.pk])
+
+    def on_booking_saved(self, sender, instance, **kwargs):
+        self.changed_on_commit([instance.room_id])
+
+    def connect(self):
+        post_save.connect(self.on_room_saved, sender='rooms.Room')
+        post_save.connect(self.on_booking_saved, sender='bookings.Booking')
+
+    def disconnect(self):
+        post_save.disconnect(self.on_room_saved, sender='rooms.Room')
+        post_save.disconnect(self.on_booking_saved, sender='bookings.Booking')
+
+
+def build_versions():
+    options = {**DEFAULTS, **getattr(settings, 'LIST_VERSIONS', {})}
+    if options['BACKEND'] == 'database':
+        return ListVersions(DatabaseBackend())
+    if options['BACKEND'] == 'local':
+        return ListVersions(LocalBackend(options['LOCAL_TTL']))
+    if options['BACKEND'] == 'django':
+        return ListVersions(DjangoBackend(options['ALIAS']))
+    if options['BACKEND'] == 'none':
+        return None
+    raise ValueError(f"Неизвестный бэкенд LIST_VERSIONS: {options['BACKEND']}")
+
+
+list_versions = build_versions()
+
+
+def changed(room_ids=()):
+    """Для записей без post_save (удалений и bulk_create) вне транзакции"""
+    if list_versions is not None:
+        list_versions.changed(room_ids)
+
+
+async def achanged(room_ids=()):
+    """changed для асинхронных представлений: общий кэш может ходить в базу"""
+    if list_versions is not None:
+        await sync_to_async(list_versions.changed)(room_ids)
+
+
+def changed_on_commit(room_ids=()):
+    """То же, что changed, после коммита текущей транзакции"""
+    if list_versions is not None:
+        list_versions.changed_on_commit(room_ids)
+
+
+def list_condition(version_name):
+    """
+    condition() с ETag и Last-Modified по версии version_name(request);
+    если version_name вернул None, запрос обрабатывается без проверки.
+    ETag зависит от версии, пути и строки запроса.
+    """
+    def version(request):
+        # condition() вызывает обе функции, версия читается один раз
+        if not hasattr(request, 'list_version'):
+            name = version_name(request) if list_versions is not None else None
+            request.list_version = list_versions.get(name) if name else None
+        return request.list_version
+
+    def etag(request, *args, **kwargs):
+        current = version(request)
+        if current is None:
+            return None
+        query = request.META.get('QUERY_STRING', '')
+        return '"' + hashlib.sha1(f'{current[0]}\n{request.path}?{query}'.encode()).hexdigest() + '"'
+
+    def last_modified(request, *args, **kwargs):
+        current = version(request)
+        if current is None or current[1] is None:
+            return None
+        return datetime.fromtimestamp(current[1], tz=timezone.utc)
+
+    def decorator(view):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(view)
+        if not iscoroutinefunction(view):
+            return conditional
+
+        # condition() вызывает etag/last_modified синхронно, а общий кэш
+        # может ходить в базу: версия читается заранее в потоке
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            await sync_to_async(version)(request)
+            return await conditional(request, *args, **kwargs)
+
+        return async_wrapper
+
+    return decorator
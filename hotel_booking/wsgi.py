@@ -2,6 +2,7 @@
 WSGI config for hotel_booking project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+Paths from API_PREFIXES are served with the slim API_MIDDLEWARE stack.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
@@ -9,7 +10,7 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from hotel_booking.handlers import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hotel_booking.settings")
 
@@ -1,5 +1,21 @@
 from django.contrib import admin
-from .models import Room
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils.html import format_html
+from hotel_booking.pagination import EstimatedCountPaginator
+from .models import Room, RoomRate, StayDiscount
+from .search import search_rooms
+
+class RoomRateInline(admin.TabularInline):
+    model = RoomRate
+    extra = 0
+
+
+class StayDiscountInline(admin.TabularInline):
+    model = StayDiscount
+    extra = 0
+
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
@@ -8,10 +24,38 @@ class RoomAdmin(admin.ModelAdmin):
     search_fields = ("description",)
     ordering = ("-created_at",)
     readonly_fields = ("created_at",)
+    inlines = (RoomRateInline, StayDiscountInline)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # подзапрос, а не with_bookings_count(): GROUP BY по JOIN с bookings
+        # агрегирует брони всех номеров, подзапрос считается только для
+        # номеров текущей страницы по индексу bookings (room_id, ...)
+        from bookings.models import Booking
+
+        counts = (
+            Booking.objects.filter(room=OuterRef("pk"))
+            .order_by()
+            .values("room")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return super().get_queryset(request).annotate(
+            bookings_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        # полнотекстовый поиск по индексу вместо ILIKE по search_fields
+        if not search_term.strip():
+            return queryset, False
+        return search_rooms(queryset, search_term), False
 
     def bookings_count(self, obj):
-        return obj.bookings.count()
+        url = reverse("admin:bookings_booking_changelist") + f"?room_id={obj.pk}"
+        return format_html('<a href="{}">{}</a>', url, obj.bookings_count)
     bookings_count.short_description = "Количество бронирований"
+    bookings_count.admin_order_field = "bookings_count"
 
     def price_display(self, obj):
 
@@ -23,3 +67,11 @@ class RoomAdmin(admin.ModelAdmin):
     price_display.short_description = "Цена за ночь"
     price_display.admin_order_field = "price"
 
+
+@admin.register(StayDiscount)
+class StayDiscountAdmin(admin.ModelAdmin):
+    """Скидки без номера действуют на все номера"""
+    list_display = ("id", "room", "min_nights", "percent")
+    list_select_related = ("room",)
+    autocomplete_fields = ("room",)
+    ordering = ("min_nights",)
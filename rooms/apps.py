@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class RoomsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "rooms"
+
+    def ready(self):
+        from .rates import rate_calendars
+
+        if rate_calendars is not None:
+            rate_calendars.connect()
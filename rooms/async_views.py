@@ -0,0 +1,154 @@
+"""
+Асинхронные варианты представлений rooms.views для запуска под ASGI
+
+Разбор параметров и формат ответов общие с синхронными представлениями.
+Подключаются вместо них при ASYNC_VIEWS = True (см. rooms/urls.py).
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from hotel_booking.idempotency import idempotent
+from hotel_booking.pagination import alist_response
+from hotel_booking.versions import ROOMS, list_condition
+from bookings.intervals import interval_index
+from bookings.jobs import apublish
+from .cache import room_list_cache
+from .models import Room
+from .views import (
+    available_queryset,
+    indexed_available,
+    delete_room_with_bookings,
+    error_response,
+    parse_available_params,
+    parse_new_room,
+    parse_ordering,
+    parse_room_id,
+    parse_search_params,
+    room_to_dict,
+    search_queryset,
+    success_response,
+)
+# без асинхронного варианта: расчёт упирается в CPU, Django выполнит его в потоке
+from .views import room_calendar, room_free_slots, room_quote  # noqa: F401
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+async def create_room(request):
+    """POST /rooms/create, см. rooms.views.create_room"""
+    try:
+        try:
+            description, price = parse_new_room(request.POST)
+        except ValueError as e:
+            return error_response(str(e))
+
+        room = await Room.objects.acreate(
+            description=description,
+            price=price
+        )
+        # вне транзакции: запись уже зафиксирована
+        room_list_cache.invalidate()
+        await apublish([('room.created', {"room_id": room.id})])
+
+        return success_response({
+            "room_id": room.id
+        }, status=201)
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def delete_room(request):
+    """POST /rooms/delete, см. rooms.views.delete_room"""
+    try:
+        try:
+            room_id = parse_room_id(request.POST)
+        except ValueError as e:
+            return error_response(str(e))
+
+        # транзакции в async ORM нет, удаление идёт в потоке
+        try:
+            bookings_count = await sync_to_async(delete_room_with_bookings)(room_id)
+        except Room.DoesNotExist:
+            return error_response("Номер не найден", status=404)
+
+        return success_response({
+            "message": f"Номер {room_id} и {bookings_count} бронирований удалены"
+        })
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+@list_condition(lambda request: ROOMS)
+async def list_rooms(request):
+    """GET /rooms/list, см. rooms.views.list_rooms"""
+    try:
+        cache_key = room_list_cache.make_key(request.GET, request.list_version)
+        if cache_key:
+            content = room_list_cache.get(cache_key)
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+
+        try:
+            ordering = parse_ordering(request.GET)
+            response = await alist_response(
+                request.GET,
+                Room.objects.with_bookings_count(),
+                ordering,
+                room_to_dict
+            )
+        except ValueError as e:
+            return error_response(str(e))
+
+        if cache_key and response.status_code == 200:
+            room_list_cache.set(cache_key, response.content)
+        return response
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+async def available_rooms(request):
+    """GET /rooms/available, см. rooms.views.available_rooms"""
+    try:
+        try:
+            params = parse_available_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+
+        if interval_index is not None:
+            rooms = await sync_to_async(indexed_available)(*params)
+            return success_response([room_to_dict(room) for room in rooms])
+
+        rooms = available_queryset(*params)
+
+        return success_response([room_to_dict(room) async for room in rooms])
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+async def room_search(request):
+    """GET /rooms/search, см. rooms.views.room_search"""
+    try:
+        try:
+            params = parse_search_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+
+        rooms = search_queryset(*params)
+
+        return success_response([room_to_dict(room) async for room in rooms])
+
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+async def cache_stats(request):
+    """GET /rooms/cache_stats, см. rooms.views.cache_stats"""
+    return success_response(room_list_cache.stats())
@@ -0,0 +1,179 @@
+"""
+Read-through кэш ответов GET /rooms/list
+
+Ключ ответа включает версию кэша и параметры запроса. Любая запись,
+меняющая список (создание/удаление номера или брони), после коммита
+увеличивает версию, и старые записи больше не читаются. При включённых
+версиях списков (hotel_booking.versions) в ключ входит и общая версия
+списка номеров, по которой считается ETag: запись в другом процессе
+меняет ключ, и тело под новым ETag не берётся из устаревшей записи
+локального кэша.
+
+Бэкенд задаётся настройкой ROOM_LIST_CACHE:
+- "local" (по умолчанию): LRU в памяти процесса. Версия тоже локальная,
+  поэтому при нескольких воркерах запись в одном из них не сбрасывает
+  кэш остальных раньше TIMEOUT;
+- "django": кэш Django с алиасом ALIAS (Redis, Memcached, ...), версия
+  общая для всех воркеров;
+- "none": кэш выключен.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+DEFAULTS = {
+    'BACKEND': 'local',
+    'ALIAS': 'default',
+    'MAX_ENTRIES': 256,
+    'TIMEOUT': 60,
+}
+
+VERSION_KEY = 'rooms:list:version'
+KEY_PARAMS = ('sort_by', 'order', 'limit', 'cursor')
+
+
+class LocalBackend:
+    """LRU с ограничением по числу записей и времени жизни"""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.version = 1
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_version(self):
+        return self.version
+
+    def bump_version(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class DjangoBackend:
+    def __init__(self, alias, timeout):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def get_version(self):
+        version = self.cache.get(VERSION_KEY)
+        if version is None:
+            self.cache.add(VERSION_KEY, 1, None)
+            version = self.cache.get(VERSION_KEY, 1)
+        return version
+
+    def bump_version(self):
+        try:
+            self.cache.incr(VERSION_KEY)
+        except ValueError:
+            self.cache.set(VERSION_KEY, 2, None)
+
+    def clear(self):
+        self.bump_version()
+
+
+class RoomListCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def make_key(self, params, list_version=None):
+        """
+        Ключ для параметров запроса или None, если ответ не кэшируется;
+        list_version - версия списка номеров из hotel_booking.versions
+        """
+        if self.backend is None or params.get('stream'):
+            return None
+        version = self.backend.get_version()
+        if list_version is not None:
+            version = f'{version}.{list_version[0]}'
+        values = ':'.join(params.get(name, '') for name in KEY_PARAMS)
+        return f'rooms:list:{version}:{values}'
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def invalidate(self):
+        if self.backend is not None:
+            self.invalidations += 1
+            self.backend.bump_version()
+
+    def invalidate_on_commit(self):
+        transaction.on_commit(self.invalidate)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def build_cache():
+    options = {**DEFAULTS, **getattr(settings, 'ROOM_LIST_CACHE', {})}
+    if options['BACKEND'] == 'local':
+        backend = LocalBackend(options['MAX_ENTRIES'], options['TIMEOUT'])
+    elif options['BACKEND'] == 'django':
+        backend = DjangoBackend(options['ALIAS'], options['TIMEOUT'])
+    elif options['BACKEND'] == 'none':
+        backend = None
+    else:
+        raise ValueError(f"Неизвестный бэкенд ROOM_LIST_CACHE: {options['BACKEND']}")
+    return RoomListCache(backend)
+
+
+room_list_cache = build_cache()
@@ -0,0 +1,74 @@
+"""
+Календарь занятости номеров
+
+Занятость номера за период хранится битовой маской в int: бит i означает,
+что номер занят в ночь с from + i. Бронь заполняется одним сдвигом,
+а не циклом по дням, поэтому стоимость расчёта зависит от числа броней,
+а не от длины периода. Загрузка по дням считается разностным массивом:
++1 в день заезда, -1 в день выезда и накопленная сумма.
+"""
+
+from itertools import accumulate
+
+from django.db.models import FilteredRelation, Q
+
+from .models import Room
+
+MAX_CALENDAR_DAYS = 366
+
+
+def fill(mask, first_day, last_day):
+    """Заполняет дни [first_day, last_day) в маске"""
+    return mask | (((1 << (last_day - first_day)) - 1) << first_day)
+
+
+def mask_to_bitmap(mask, days):
+    """Маска -> строка '0'/'1', первый символ - первый день периода"""
+    return format(mask, f'0{days}b')[::-1] if days else ''
+
+
+def mask_to_runs(mask):
+    """Маска -> список (первый день, день после последнего) подряд идущих занятых дней"""
+    runs = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        length = (shifted ^ (shifted + 1)).bit_length() - 1
+        runs.append((start, start + length))
+        mask &= ~(((1 << length) - 1) << start)
+    return runs
+
+
+def occupancy_calendar(date_from, date_to):
+    """
+    Занятость всех номеров в [date_from, date_to) одним запросом
+
+    Возвращает (masks, counts): masks - {room_id: маска} для всех номеров,
+    counts - число занятых номеров по дням.
+    """
+    days = (date_to - date_from).days
+    rows = (
+        Room.objects
+        .annotate(window=FilteredRelation(
+            'bookings',
+            condition=Q(bookings__date_start__lt=date_to, bookings__date_end__gt=date_from)
+        ))
+        .order_by('id')
+        .values_list('id', 'window__date_start', 'window__date_end')
+    )
+
+    masks = {}
+    diff = [0] * (days + 1)
+    base = date_from.toordinal()
+    for room_id, date_start, date_end in rows:
+        mask = masks.get(room_id, 0)
+        if date_start is not None:
+            first_day = max(date_start.toordinal() - base, 0)
+            last_day = min(date_end.toordinal() - base, days)
+            mask = fill(mask, first_day, last_day)
+            diff[first_day] += 1
+            diff[last_day] -= 1
+        masks[room_id] = mask
+
+    counts = list(accumulate(diff[:days]))
+    return masks, counts
@@ -0,0 +1,161 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Только для PostgreSQL: внешние ключи тарифов и скидок на rooms получают
+# ON DELETE CASCADE, как брони в bookings 0005, чтобы номер по-прежнему
+# удалялся одним DELETE. Копия помощника из bookings 0005: миграции не
+# зависят от кода приложения.
+TABLES = ["room_rates", "stay_discounts"]
+
+FIND_CONSTRAINTS = """
+SELECT conname FROM pg_constraint
+WHERE conrelid = %s::regclass AND confrelid = 'rooms'::regclass AND contype = 'f'
+"""
+
+REPLACE_CONSTRAINT = """
+ALTER TABLE {table} DROP CONSTRAINT {name},
+    ADD CONSTRAINT {name} FOREIGN KEY (room_id) REFERENCES rooms (id)
+    {on_delete} DEFERRABLE INITIALLY DEFERRED;
+"""
+
+
+def replace_room_constraints(schema_editor, on_delete):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(FIND_CONSTRAINTS, [table])
+            for (name,) in cursor.fetchall():
+                schema_editor.execute(
+                    REPLACE_CONSTRAINT.format(
+                        table=quote(table), name=quote(name), on_delete=on_delete
+                    )
+                )
+
+
+def add_on_delete_cascade(apps, schema_editor):
+    replace_room_constraints(schema_editor, "ON DELETE CASCADE")
+
+
+def remove_on_delete_cascade(apps, schema_editor):
+    replace_room_constraints(schema_editor, "")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0003_room_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoomRate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date_start", models.DateField(verbose_name="Дата начала")),
+                ("date_end", models.DateField(verbose_name="Дата окончания")),
+                (
+                    "price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Цена за ночь"
+                    ),
+                ),
+                (
+                    "weekdays",
+                    models.PositiveSmallIntegerField(
+                        default=127,
+                        help_text="Битовая маска: 1 - понедельник, 2 - вторник, ..., 64 - воскресенье; 96 - выходные",
+                        verbose_name="Дни недели",
+                    ),
+                ),
+                (
+                    "priority",
+                    models.SmallIntegerField(default=0, verbose_name="Приоритет"),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rates",
+                        to="rooms.room",
+                        verbose_name="Номер",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Тариф номера",
+                "verbose_name_plural": "Тарифы номеров",
+                "db_table": "room_rates",
+                "indexes": [
+                    models.Index(
+                        fields=["room", "date_start"], name="room_rates_room_start_idx"
+                    )
+                ],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(("date_end__gt", models.F("date_start"))),
+                        name="room_rates_dates_order",
+                    ),
+                    models.CheckConstraint(
+                        condition=models.Q(("weekdays__gt", 0), ("weekdays__lte", 127)),
+                        name="room_rates_weekdays_mask",
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="StayDiscount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("min_nights", models.PositiveIntegerField(verbose_name="От ночей")),
+                (
+                    "percent",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=5, verbose_name="Скидка, %"
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stay_discounts",
+                        to="rooms.room",
+                        verbose_name="Номер",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Скидка за длительность",
+                "verbose_name_plural": "Скидки за длительность",
+                "db_table": "stay_discounts",
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(("percent__gt", 0), ("percent__lte", 100)),
+                        name="stay_discounts_percent_range",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(add_on_delete_cascade, remove_on_delete_cascade),
+    ]
@@ -0,0 +1,92 @@
+from django.db import migrations
+
+
+# Индексы полнотекстового поиска по описанию (см. rooms/search.py),
+# столбец и таблица не описаны в моделях.
+#
+# На SQLite триггеры привязаны к таблице rooms: если будущая миграция
+# заставит Django пересоздать rooms (большинство AlterField на SQLite),
+# триггеры нужно будет создать заново.
+POSTGRESQL_FORWARDS = [
+    """
+    ALTER TABLE rooms ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('russian', description)) STORED
+    """,
+    "CREATE INDEX rooms_search_vector_idx ON rooms USING gin (search_vector)",
+]
+
+POSTGRESQL_BACKWARDS = [
+    "ALTER TABLE rooms DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE rooms_fts USING fts5(
+        description, content='rooms', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER rooms_fts_insert AFTER INSERT ON rooms BEGIN
+        INSERT INTO rooms_fts (rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER rooms_fts_delete AFTER DELETE ON rooms BEGIN
+        INSERT INTO rooms_fts (rooms_fts, rowid, description)
+            VALUES ('delete', old.id, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER rooms_fts_update AFTER UPDATE OF description ON rooms BEGIN
+        INSERT INTO rooms_fts (rooms_fts, rowid, description)
+            VALUES ('delete', old.id, old.description);
+        INSERT INTO rooms_fts (rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    "INSERT INTO rooms_fts (rooms_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS rooms_fts_insert",
+    "DROP TRIGGER IF EXISTS rooms_fts_delete",
+    "DROP TRIGGER IF EXISTS rooms_fts_update",
+    "DROP TABLE IF EXISTS rooms_fts",
+]
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any(option == "ENABLE_FTS5" for (option,) in cursor.fetchall())
+
+
+def run(schema_editor, postgresql, sqlite):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        statements = postgresql
+    elif connection.vendor == "sqlite" and has_fts5(connection):
+        statements = sqlite
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def add_search(apps, schema_editor):
+    run(schema_editor, POSTGRESQL_FORWARDS, SQLITE_FORWARDS)
+
+
+def remove_search(apps, schema_editor):
+    run(schema_editor, POSTGRESQL_BACKWARDS, SQLITE_BACKWARDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0004_room_rates_and_stay_discounts"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search, remove_search),
+    ]
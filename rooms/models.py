@@ -1,10 +1,30 @@
 from django.db import models
 
+
+class RoomQuerySet(models.QuerySet):
+    def available(self, date_start, date_end):
+        """Номера без броней, пересекающих период (один запрос с NOT EXISTS)"""
+        from bookings.models import Booking
+
+        overlapping_bookings = Booking.objects.filter(
+            room=models.OuterRef('pk'),
+            date_start__lt=date_end,
+            date_end__gt=date_start
+        )
+        return self.filter(~models.Exists(overlapping_bookings))
+
+    def with_bookings_count(self):
+        """Количество броней считается в том же запросе, что и список номеров"""
+        return self.annotate(bookings_count=models.Count('bookings'))
+
+
 class Room(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = RoomQuerySet.as_manager()
+
     def __str__(self):
         return f"Room {self.pk}: {self.description[:50]}"
 
@@ -14,17 +34,107 @@ class Room(models.Model):
         verbose_name = 'Номер отеля'
         verbose_name_plural = 'Номера отелей'
         ordering = ['-created_at']
+        indexes = [
+            # сортировки и keyset-пагинация списка номеров
+            models.Index(fields=['price', 'id'], name='rooms_price_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='rooms_created_at_id_idx'),
+        ]
         
     
     def get_bookings_count(self):
         return self.bookings.count()
     
     def is_available(self, date_start, date_end):
+        from bookings.intervals import interval_index
         from bookings.models import Booking
         
+        if interval_index is not None:
+            return interval_index.is_available(self.pk, date_start, date_end)
+        
         overlapping_bookings = Booking.objects.filter(
             room=self,
             date_start__lt=date_end,
             date_end__gt=date_start
         )
-        return not overlapping_bookings.exists()
\ No newline at end of file
+        return not overlapping_bookings.exists()
+
+# дни недели для RoomRate.weekdays: бит date.weekday(), понедельник - 0
+ALL_WEEKDAYS = 0b1111111
+WEEKEND = 0b1100000
+
+
+class RoomRate(models.Model):
+    """
+    Цена номера за ночь на период [date_start, date_end) в выбранные дни
+    недели (сезоны, выходные). Без подходящего тарифа ночь стоит
+    Room.price; из нескольких подходящих действует тариф с большим
+    priority, при равном - созданный позже (см. rooms.rates).
+    """
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name='rates',
+        verbose_name="Номер"
+    )
+    date_start = models.DateField(verbose_name="Дата начала")
+    date_end = models.DateField(verbose_name="Дата окончания")
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Цена за ночь")
+    weekdays = models.PositiveSmallIntegerField(
+        default=ALL_WEEKDAYS,
+        verbose_name="Дни недели",
+        help_text="Битовая маска: 1 - понедельник, 2 - вторник, ..., 64 - воскресенье; 96 - выходные"
+    )
+    priority = models.SmallIntegerField(default=0, verbose_name="Приоритет")
+
+    class Meta:
+        db_table = 'room_rates'
+        verbose_name = 'Тариф номера'
+        verbose_name_plural = 'Тарифы номеров'
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(date_end__gt=models.F('date_start')),
+                name='room_rates_dates_order',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(weekdays__gt=0, weekdays__lte=ALL_WEEKDAYS),
+                name='room_rates_weekdays_mask',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['room', 'date_start'], name='room_rates_room_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"Тариф {self.id}: Номер {self.room_id} с {self.date_start} по {self.date_end}"
+
+
+class StayDiscount(models.Model):
+    """
+    Скидка в процентах за проживание от min_nights ночей. Без номера -
+    для всех номеров; из подходящих скидок действует наибольшая.
+    """
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='stay_discounts',
+        verbose_name="Номер"
+    )
+    min_nights = models.PositiveIntegerField(verbose_name="От ночей")
+    percent = models.DecimalField(max_digits=5, decimal_places=2, verbose_name="Скидка, %")
+
+    class Meta:
+        db_table = 'stay_discounts'
+        verbose_name = 'Скидка за длительность'
+        verbose_name_plural = 'Скидки за длительность'
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(percent__gt=0, percent__lte=100),
+                name='stay_discounts_percent_range',
+            ),
+        ]
+
+    def __str__(self):
+        scope = f"номер {self.room_id}" if self.room_id else "все номера"
+        return f"{self.percent}% от {self.min_nights} ночей ({scope})"
@@ -0,0 +1,232 @@
+"""
+Стоимость проживания по тарифам (GET /rooms/quote)
+
+Ночь стоит Room.price, если на её дату нет тарифа RoomRate (сезон,
+выходные и т.п.). Итог проживания - сумма цен ночей за вычетом
+наибольшей подходящей скидки StayDiscount за длительность.
+
+Для номера строится план цен: календарь цен ночей в копейках на DAYS
+дней вперёд в виде префиксных сумм (array('q'), 8 байт на день), так что
+сумма любого периода внутри календаря - разность двух элементов, O(1)
+при любом числе ночей. Периоды за пределами календаря считаются по
+тарифам напрямую.
+
+Планы хранятся в памяти процесса (настройка RATE_CALENDARS), не больше
+MAX_ROOMS номеров: загружаются пачкой недостающих номеров тремя
+запросами, сбрасываются сигналами моделей после коммита, а изменения из
+других процессов подхватываются не позже чем через TTL секунд. Без
+кэша план строится на каждый запрос без календаря.
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import accumulate
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+
+from .models import ALL_WEEKDAYS, Room, RoomRate, StayDiscount
+
+DEFAULTS = {
+    'ENABLED': True,
+    'TTL': 60,
+    'DAYS': 400,
+    'MAX_ROOMS': 5000,
+}
+
+MAX_QUOTE_NIGHTS = 366
+MAX_QUOTE_ROOMS = 1000
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def to_cents(price):
+    return int(price * 100)
+
+
+def from_cents(cents):
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+def night_prices(base, rates, date_from, date_to):
+    """
+    Цены ночей [date_from, date_to) в копейках; rates - (date_start,
+    date_end, цена в копейках, weekdays) по возрастанию приоритета
+    """
+    days = (date_to - date_from).days
+    prices = [base] * days
+    first_weekday = date_from.weekday()
+    for start, end, price, weekdays in rates:
+        first = max((start - date_from).days, 0)
+        last = min((end - date_from).days, days)
+        if first >= last:
+            continue
+        if weekdays == ALL_WEEKDAYS:
+            prices[first:last] = [price] * (last - first)
+            continue
+        # дни одного дня недели идут с шагом 7
+        for weekday in range(7):
+            if weekdays >> weekday & 1:
+                day = first + (weekday - first_weekday - first) % 7
+                prices[day:last:7] = [price] * len(range(day, last, 7))
+    return prices
+
+
+class RatePlan:
+    """Цены одного номера: базовая, тарифы, скидки и календарь сумм"""
+
+    __slots__ = ('base', 'rates', 'discounts', 'origin', 'prefix', 'loaded_at')
+
+    def __init__(self, base, rates, discounts, origin=None, days=0, loaded_at=0):
+        self.base = base
+        self.rates = rates
+        self.discounts = discounts
+        self.origin = origin
+        self.prefix = None
+        if days:
+            prices = night_prices(base, rates, origin, origin + timedelta(days=days))
+            self.prefix = array('q', accumulate(prices, initial=0))
+        self.loaded_at = loaded_at
+
+    def subtotal(self, date_start, date_end):
+        """Сумма цен ночей [date_start, date_end) в копейках"""
+        if self.prefix is not None:
+            first = (date_start - self.origin).days
+            last = (date_end - self.origin).days
+            if first >= 0 and last < len(self.prefix):
+                return self.prefix[last] - self.prefix[first]
+        return sum(night_prices(self.base, self.rates, date_start, date_end))
+
+    def discount_percent(self, nights):
+        return max((percent for min_nights, percent in self.discounts if min_nights <= nights), default=None)
+
+    def quote(self, date_start, date_end):
+        subtotal = self.subtotal(date_start, date_end)
+        percent = self.discount_percent((date_end - date_start).days)
+        discount = (subtotal * percent / 100).quantize(Decimal(1), ROUND_HALF_UP) if percent else 0
+        return {
+            "subtotal": from_cents(subtotal),
+            "discount_percent": percent or ZERO,
+            "discount": from_cents(discount),
+            "total": from_cents(subtotal - discount),
+        }
+
+
+def load_plans(room_ids, origin=None, days=0, loaded_at=0):
+    """Планы существующих номеров из room_ids: {room_id: RatePlan}, три запроса"""
+    prices = dict(Room.objects.filter(id__in=room_ids).values_list('id', 'price'))
+    if not prices:
+        return {}
+    rates = defaultdict(list)
+    for room_id, start, end, price, weekdays in (
+        RoomRate.objects.filter(room_id__in=prices)
+        .order_by('priority', 'id')
+        .values_list('room_id', 'date_start', 'date_end', 'price', 'weekdays')
+    ):
+        rates[room_id].append((start, end, to_cents(price), weekdays))
+    discounts = defaultdict(list)
+    common = []
+    for room_id, min_nights, percent in (
+        StayDiscount.objects.filter(Q(room_id__in=prices) | Q(room__isnull=True))
+        .values_list('room_id', 'min_nights', 'percent')
+    ):
+        (discounts[room_id] if room_id else common).append((min_nights, percent))
+    return {
+        room_id: RatePlan(to_cents(price), rates[room_id], common + discounts[room_id], origin, days, loaded_at)
+        for room_id, price in prices.items()
+    }
+
+
+class RateCalendars:
+    def __init__(self, ttl, days, max_rooms):
+        self.ttl = ttl
+        self.days = days
+        self.max_rooms = max_rooms
+        self.plans = OrderedDict()
+        # счётчик изменений: загрузка, начатая до изменения, не сохраняется
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get_many(self, room_ids):
+        plans = {}
+        missing = []
+        now = time.monotonic()
+        with self.lock:
+            for room_id in room_ids:
+                plan = self.plans.get(room_id)
+                if plan is None or now - plan.loaded_at > self.ttl:
+                    missing.append(room_id)
+                else:
+                    self.plans.move_to_end(room_id)
+                    plans[room_id] = plan
+            generation = self.generation
+        if missing:
+            loaded = load_plans(missing, date.today(), self.days, now)
+            with self.lock:
+                if self.generation == generation:
+                    self.plans.update(loaded)
+                    while len(self.plans) > self.max_rooms:
+                        self.plans.popitem(last=False)
+            plans.update(loaded)
+        return plans
+
+    def invalidate(self, room_id=None):
+        """Сброс плана номера, без room_id - всех планов"""
+        with self.lock:
+            self.generation += 1
+            if room_id is None:
+                self.plans.clear()
+            else:
+                self.plans.pop(room_id, None)
+
+    def invalidate_on_commit(self, room_id=None):
+        transaction.on_commit(lambda: self.invalidate(room_id))
+
+    def on_room_saved(self, sender, instance, **kwargs):
+        self.invalidate_on_commit(instance.pk)
+
+    def on_rate_changed(self, sender, instance, **kwargs):
+        # скидка без номера действует на все номера
+        self.invalidate_on_commit(instance.room_id)
+
+    def connect(self):
+        # удаление номера сбрасывает план явно (rooms.views.delete_room_with_bookings):
+        # обработчик post_delete у Room отключил бы каскадное удаление в базе
+        post_save.connect(self.on_room_saved, sender=Room)
+        for model in (RoomRate, StayDiscount):
+            post_save.connect(self.on_rate_changed, sender=model)
+            post_delete.connect(self.on_rate_changed, sender=model)
+
+    def disconnect(self):
+        post_save.disconnect(self.on_room_saved, sender=Room)
+        for model in (RoomRate, StayDiscount):
+            post_save.disconnect(self.on_rate_changed, sender=model)
+            post_delete.disconnect(self.on_rate_changed, sender=model)
+
+
+def build_calendars():
+    options = {**DEFAULTS, **getattr(settings, 'RATE_CALENDARS', {})}
+    if not options['ENABLED']:
+        return None
+    return RateCalendars(options['TTL'], options['DAYS'], options['MAX_ROOMS'])
+
+
+rate_calendars = build_calendars()
+
+
+def rate_plans(room_ids):
+    """Планы существующих номеров из room_ids, из кэша, если он включён"""
+    if rate_calendars is not None:
+        return rate_calendars.get_many(room_ids)
+    return load_plans(room_ids)
+
+
+def invalidate_on_commit(room_id=None):
+    if rate_calendars is not None:
+        rate_calendars.invalidate_on_commit(room_id)
@@ -0,0 +1,84 @@
+"""
+Полнотекстовый поиск номеров по описанию (GET /rooms/search и поиск в
+списке номеров админки)
+
+Вместо ILIKE '%слово%', который просматривает всю таблицу:
+- PostgreSQL: генерируемый столбец rooms.search_vector =
+  to_tsvector('russian', description) с GIN-индексом (миграция rooms
+  0005), словоформы совпадают ("люксы" найдёт "люкс"), порядок - по
+  ts_rank;
+- SQLite: таблица FTS5 rooms_fts над rooms, которую ведут триггеры,
+  порядок - по id (bm25 в коррелированном подзапросе заново вычисляет
+  MATCH для каждой строки, а соединение с rooms_fts не выразить в ORM);
+- без FTS5 и на других базах - icontains по description.
+Номер подходит, если в описании есть все слова запроса, каждое - как
+начало слова (для автодополнения в админке). Столбец и таблица
+создаются миграцией вне моделей, поэтому в запросы они попадают через
+RawSQL.
+"""
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+MAX_QUERY_LENGTH = 200
+
+TS_QUERY = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+FTS_MATCH = 'SELECT rowid FROM rooms_fts WHERE rooms_fts MATCH %s'
+
+# алиас базы -> есть ли rooms_fts
+fts_tables = {}
+
+
+def words(text):
+    # только буквы и цифры: операторы языков запросов из ввода не проходят
+    return re.findall(r'[^\W_]+', text)
+
+
+def ts_query(text):
+    return ' & '.join(f'{word}:*' for word in words(text))
+
+
+def fts5_query(text):
+    return ' '.join(f'"{word}"*' for word in words(text))
+
+
+def has_fts_table(connection):
+    if connection.alias not in fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rooms_fts'")
+            fts_tables[connection.alias] = cursor.fetchone() is not None
+    return fts_tables[connection.alias]
+
+
+def search_backend(connection):
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and has_fts_table(connection):
+        return 'fts5'
+    return 'like'
+
+
+def search_rooms(queryset, text):
+    """
+    Номера queryset, описание которых подходит под text, по убыванию
+    релевантности (на PostgreSQL) и по id
+    """
+    backend = search_backend(connections[queryset.db])
+    if backend != 'like' and not words(text):
+        return queryset.none()
+    if backend == 'postgresql':
+        query = ts_query(text)
+        return queryset.filter(
+            RawSQL(f'rooms.search_vector @@ {TS_QUERY}', [query], output_field=BooleanField())
+        ).alias(
+            rank=RawSQL(f'ts_rank(rooms.search_vector, {TS_QUERY})', [query], output_field=FloatField())
+        ).order_by('-rank', 'id')
+    if backend == 'fts5':
+        return queryset.filter(
+            RawSQL(f'rooms.id IN ({FTS_MATCH})', [fts5_query(text)], output_field=BooleanField())
+        ).order_by('id')
+    return queryset.filter(description__icontains=text).order_by('id')
@@ -0,0 +1,73 @@
+"""
+Поиск ближайших свободных окон (GET /rooms/free_slots)
+
+Брони всех номеров, пересекающие период, читаются одним запросом,
+отсортированными по (номер, заезд), и промежутки между ними находятся
+одним проходом по броням номера (bookings.intervals.free_windows).
+Из окон всех номеров отбираются limit самых ранних через кучу
+размера limit, так что память не зависит от числа броней.
+
+С включённым индексом занятости (bookings.intervals) из базы читаются
+только номера, а окна считаются по периодам в памяти.
+"""
+
+import heapq
+from itertools import groupby, islice
+
+from django.db.models import FilteredRelation, Q
+
+from bookings.intervals import free_windows, interval_index
+from .models import Room
+
+MAX_SLOT_DAYS = 366
+SLOTS_CHUNK_SIZE = 5000
+
+
+def room_windows(rows, date_from, date_to, nights):
+    """(date_start, room_id, date_end, price) окон всех номеров"""
+    for (room_id, price), group in groupby(rows, key=lambda row: row[:2]):
+        # у номера без броней в периоде одна строка с пустыми датами
+        periods = ((date_start, date_end) for _, _, date_start, date_end in group if date_start is not None)
+        for date_start, date_end in free_windows(periods, date_from, date_to, nights):
+            yield date_start, room_id, date_end, price
+
+
+def indexed_windows(rooms, date_from, date_to, nights):
+    """То же, что room_windows, по индексу занятости; rooms - (room_id, price)"""
+    rooms = iter(rooms)
+    while chunk := list(islice(rooms, SLOTS_CHUNK_SIZE)):
+        windows = interval_index.free_windows_many(
+            [room_id for room_id, _ in chunk], date_from, date_to, nights
+        )
+        for room_id, price in chunk:
+            for date_start, date_end in windows[room_id]:
+                yield date_start, room_id, date_end, price
+
+
+def free_slots(date_from, date_to, nights, limit):
+    """
+    limit самых ранних свободных окон не короче nights ночей внутри
+    [date_from, date_to) по всем номерам
+
+    Возвращает список (date_start, room_id, date_end, price) по
+    возрастанию date_start, затем room_id.
+    """
+    if interval_index is not None:
+        rooms = Room.objects.order_by('id').values_list('id', 'price')
+        return heapq.nsmallest(limit, indexed_windows(
+            rooms.iterator(chunk_size=SLOTS_CHUNK_SIZE), date_from, date_to, nights
+        ))
+
+    rows = (
+        Room.objects
+        .annotate(window=FilteredRelation(
+            'bookings',
+            condition=Q(bookings__date_start__lt=date_to, bookings__date_end__gt=date_from)
+        ))
+        .order_by('id', 'window__date_start')
+        .values_list('id', 'price', 'window__date_start', 'window__date_end')
+    )
+    return heapq.nsmallest(
+        limit,
+        room_windows(rows.iterator(chunk_size=SLOTS_CHUNK_SIZE), date_from, date_to, nights)
+    )
@@ -1,5 +1,13 @@
-from django.test import TestCase
+import base64
+import json
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from rooms import async_views
 from rooms.models import Room 
+from rooms.cache import room_list_cache
+from datetime import date, timedelta
+from unittest.mock import patch
 
 class RoomTests(TestCase):
     def test_create_room(self):
@@ -7,3 +15,600 @@ class RoomTests(TestCase):
         self.assertIsNotNone(r.id)
         self.assertEqual(r.description, "Test room")
         self.assertEqual(str(r.price), "10")
+
+
+class AvailableRoomsTests(TestCase):
+    def setUp(self):
+        from bookings.models import Booking
+
+        self.start = date.today() + timedelta(days=10)
+        self.end = self.start + timedelta(days=3)
+        self.cheap = Room.objects.create(description="Cheap", price=100)
+        self.expensive = Room.objects.create(description="Expensive", price=900)
+        self.busy = Room.objects.create(description="Busy", price=500)
+        Booking.objects.create(
+            room=self.busy,
+            date_start=self.start - timedelta(days=1),
+            date_end=self.start + timedelta(days=1)
+        )
+
+    def get(self, **params):
+        params.setdefault("date_start", self.start.isoformat())
+        params.setdefault("date_end", self.end.isoformat())
+        return self.client.get("/rooms/available", params)
+
+    def test_excludes_overlapping_rooms(self):
+        response = self.get(sort_by="price_per_night", order="desc")
+        self.assertEqual(response.status_code, 200)
+        ids = [r["room_id"] for r in response.json()]
+        self.assertEqual(ids, [self.expensive.id, self.cheap.id])
+
+    def test_adjacent_booking_is_available(self):
+        response = self.get(date_start=(self.start + timedelta(days=1)).isoformat())
+        ids = {r["room_id"] for r in response.json()}
+        self.assertIn(self.busy.id, ids)
+
+    def test_price_filters(self):
+        response = self.get(price_min="50", price_max="200")
+        self.assertEqual([r["room_id"] for r in response.json()], [self.cheap.id])
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.get()
+
+    def test_interval_index(self):
+        from bookings.intervals import IntervalIndex
+
+        index = IntervalIndex(ttl=60)
+        with patch("rooms.views.interval_index", index):
+            response = self.get(sort_by="price_per_night", order="desc")
+            self.assertEqual([r["room_id"] for r in response.json()], [self.expensive.id, self.cheap.id])
+            self.assertEqual([r["room_id"] for r in self.get(limit="1").json()], [self.cheap.id])
+            # индекс прогрет: читаются только номера
+            with CaptureQueriesContext(connection) as queries:
+                self.get(price_min="50", price_max="200")
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("bookings_booking", queries[0]["sql"])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.get(date_end=self.start.isoformat()).status_code, 400)
+        self.assertEqual(self.get(sort_by="description").status_code, 400)
+        self.assertEqual(self.get(price_min="abc").status_code, 400)
+        self.assertEqual(self.get(limit="0").status_code, 400)
+
+
+class RoomListQueryCountTests(TestCase):
+    def setUp(self):
+        room_list_cache.clear()
+        # условные GET (hotel_booking.versions) проверяются отдельно
+        patcher = patch("hotel_booking.versions.list_versions", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_rooms(self, count):
+        from bookings.models import Booking
+
+        start = date.today() + timedelta(days=1)
+        for i in range(count):
+            room = Room.objects.create(description=f"Room {i}", price=100 + i)
+            for j in range(i % 3):
+                Booking.objects.create(
+                    room=room,
+                    date_start=start + timedelta(days=j * 2),
+                    date_end=start + timedelta(days=j * 2 + 1)
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_list_rooms_is_single_query(self):
+        self.create_rooms(6)
+        with self.assertNumQueries(1):
+            response = self.client.get("/rooms/list")
+        counts = sorted(r["bookings_count"] for r in response.json())
+        self.assertEqual(counts, [0, 0, 1, 1, 2, 2])
+
+    def test_admin_changelist_does_not_grow_with_rooms(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "pass")
+        )
+        self.create_rooms(2)
+        small, _ = self.count_queries("/admin/rooms/room/")
+        self.create_rooms(8)
+        large, response = self.count_queries("/admin/rooms/room/")
+        self.assertEqual(small, large)
+        self.assertContains(response, "Room 7")
+
+
+class RoomListPaginationTests(TestCase):
+    def setUp(self):
+        room_list_cache.clear()
+        # одинаковые цены, чтобы порядок внутри страницы решал id
+        for i in range(7):
+            Room.objects.create(description=f"Room {i}", price=100 + i // 3)
+
+    def walk(self, **params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, limit=3)
+            if cursor:
+                query["cursor"] = cursor
+            page = self.client.get("/rooms/list", query).json()
+            ids.extend(r["room_id"] for r in page["results"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_cursor_walk_matches_full_list(self):
+        for params in (
+            {},
+            {"order": "desc"},
+            {"sort_by": "price_per_night"},
+            {"sort_by": "price_per_night", "order": "desc"},
+        ):
+            full = [r["room_id"] for r in self.client.get("/rooms/list", params).json()]
+            self.assertEqual(self.walk(**params), full)
+            self.assertEqual(len(full), 7)
+
+    def test_stream(self):
+        response = self.client.get("/rooms/list", {"stream": "1", "order": "desc"})
+        self.assertTrue(response.streaming)
+        body = json.loads(b"".join(response.streaming_content))
+        full = self.client.get("/rooms/list", {"order": "desc"}).json()
+        self.assertEqual(body, full)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/rooms/list", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_values_are_validated(self):
+        from hotel_booking.pagination import encode_cursor
+
+        for params, values in (
+            ({}, [{"a": 1}, "1"]),
+            ({}, ["2024-01-01", "x"]),
+            ({}, [None, "1"]),
+            ({"sort_by": "price_per_night"}, ["abc", "1"]),
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get("/rooms/list", {**params, "limit": 3, "cursor": cursor})
+            self.assertEqual(response.status_code, 400, values)
+            self.assertEqual(response.json()["error"], "Неверный формат cursor")
+        # курсор из encode_cursor по-прежнему принимается
+        room = Room.objects.order_by("price", "id").first()
+        response = self.client.get("/rooms/list", {
+            "sort_by": "price_per_night", "limit": 3, "cursor": encode_cursor([room.price, room.id])
+        })
+        self.assertEqual(response.status_code, 200)
+
+
+def explain(queryset):
+    # на пустых тестовых таблицах PostgreSQL выбрал бы seq scan
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
+
+
+class RoomIndexUsageTests(TestCase):
+    def test_sorted_listing_uses_index(self):
+        for ordering, index in (
+            (("price", "id"), "rooms_price_id_idx"),
+            (("-price", "-id"), "rooms_price_id_idx"),
+            (("created_at", "id"), "rooms_created_at_id_idx"),
+            (("-created_at", "-id"), "rooms_created_at_id_idx"),
+        ):
+            plan = explain(Room.objects.order_by(*ordering)[:100])
+            self.assertIn(index, plan)
+
+
+class RoomListCacheTests(TestCase):
+    def setUp(self):
+        room_list_cache.clear()
+        # условные GET (hotel_booking.versions) проверяются отдельно
+        patcher = patch("hotel_booking.versions.list_versions", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.room = Room.objects.create(description="Cached room", price=100)
+
+    def list_ids(self):
+        return [r["room_id"] for r in self.client.get("/rooms/list").json()]
+
+    def test_second_request_is_served_from_cache(self):
+        self.list_ids()
+        hits = room_list_cache.hits
+        with self.assertNumQueries(0):
+            self.assertEqual(self.list_ids(), [self.room.id])
+        self.assertEqual(room_list_cache.hits, hits + 1)
+
+    def test_create_and_delete_room_invalidate(self):
+        self.list_ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/rooms/create", {"description": "New", "price_per_night": "200"}
+            )
+        new_id = response.json()["room_id"]
+        self.assertEqual(self.list_ids(), [self.room.id, new_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/rooms/delete", {"room_id": new_id})
+        self.assertEqual(self.list_ids(), [self.room.id])
+
+    def test_booking_invalidates_counts(self):
+        self.client.get("/rooms/list")
+        start = date.today() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/bookings/create", {
+                "room_id": self.room.id,
+                "date_start": start.isoformat(),
+                "date_end": (start + timedelta(days=1)).isoformat(),
+            })
+        rooms = self.client.get("/rooms/list").json()
+        self.assertEqual(rooms[0]["bookings_count"], 1)
+
+    def test_stats_endpoint(self):
+        self.client.get("/rooms/list")
+        stats = self.client.get("/rooms/cache_stats").json()
+        self.assertEqual(stats["backend"], "LocalBackend")
+        self.assertGreaterEqual(stats["misses"], 1)
+
+
+class AsyncRoomViewsTests(TestCase):
+    def setUp(self):
+        room_list_cache.clear()
+        self.factory = AsyncRequestFactory()
+
+    async def test_create_list_delete(self):
+        response = await async_views.create_room(self.factory.post(
+            "/rooms/create", {"description": "Async room", "price_per_night": "150"}
+        ))
+        self.assertEqual(response.status_code, 201)
+        room_id = json.loads(response.content)["room_id"]
+
+        response = await async_views.list_rooms(self.factory.get("/rooms/list", {"limit": 10}))
+        page = json.loads(response.content)
+        self.assertEqual([r["room_id"] for r in page["results"]], [room_id])
+
+        response = await async_views.delete_room(
+            self.factory.post("/rooms/delete", {"room_id": room_id})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(await Room.objects.filter(id=room_id).aexists())
+
+    async def test_available_and_stream(self):
+        await Room.objects.acreate(description="A", price=100)
+        start = date.today() + timedelta(days=3)
+        response = await async_views.available_rooms(self.factory.get("/rooms/available", {
+            "date_start": start.isoformat(),
+            "date_end": (start + timedelta(days=2)).isoformat(),
+        }))
+        self.assertEqual(len(json.loads(response.content)), 1)
+
+        response = await async_views.list_rooms(self.factory.get("/rooms/list", {"stream": "1"}))
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(json.loads(body)), 1)
+
+    async def test_errors(self):
+        response = await async_views.delete_room(self.factory.post("/rooms/delete", {"room_id": 0}))
+        self.assertEqual(response.status_code, 404)
+        response = await async_views.create_room(self.factory.post("/rooms/create", {}))
+        self.assertEqual(response.status_code, 400)
+
+
+class RoomCalendarTests(TestCase):
+    def setUp(self):
+        from bookings.models import Booking
+
+        self.start = date.today() + timedelta(days=1)
+        d = lambda n: self.start + timedelta(days=n)
+        self.busy = Room.objects.create(description="Busy", price=100)
+        self.free = Room.objects.create(description="Free", price=100)
+        # до начала периода, подряд идущие брони и бронь за концом периода
+        Booking.objects.create(room=self.busy, date_start=self.start, date_end=d(2))
+        Booking.objects.create(room=self.busy, date_start=d(2), date_end=d(3))
+        Booking.objects.create(room=self.busy, date_start=d(5), date_end=d(9))
+        self.d = d
+
+    def get(self, **params):
+        params.setdefault("from", self.d(1).isoformat())
+        params.setdefault("to", self.d(7).isoformat())
+        return self.client.get("/rooms/calendar", params)
+
+    def test_ranges_are_clipped_and_merged(self):
+        with self.assertNumQueries(1):
+            response = self.get()
+        rooms = {r["room_id"]: r["occupied"] for r in response.json()["rooms"]}
+        d = lambda n: self.d(n).isoformat()
+        self.assertEqual(rooms[self.busy.id], [[d(1), d(3)], [d(5), d(7)]])
+        self.assertEqual(rooms[self.free.id], [])
+
+    def test_bitmap_and_occupancy(self):
+        data = self.get(format="bitmap").json()
+        rooms = {r["room_id"]: r["occupied"] for r in data["rooms"]}
+        self.assertEqual(rooms[self.busy.id], "110011")
+        self.assertEqual(rooms[self.free.id], "000000")
+        self.assertEqual([day["occupied_rooms"] for day in data["occupancy"]], [1, 1, 0, 0, 1, 1])
+        self.assertEqual(data["occupancy"][0]["rate"], 0.5)
+
+    def test_invalid_period(self):
+        self.assertEqual(self.get(to=self.d(1).isoformat()).status_code, 400)
+        self.assertEqual(self.get(to=self.d(400).isoformat()).status_code, 400)
+        self.assertEqual(self.get(format="csv").status_code, 400)
+
+
+class RoomFreeSlotsTests(TestCase):
+    def setUp(self):
+        from bookings.models import Booking
+
+        self.start = date.today() + timedelta(days=1)
+        d = lambda n: self.start + timedelta(days=n)
+        self.busy = Room.objects.create(description="Busy", price=100)
+        self.free = Room.objects.create(description="Free", price=200)
+        # бронь до начала периода, окно на 2 ночи, окно на 4 ночи, хвост периода
+        Booking.objects.create(room=self.busy, date_start=self.start, date_end=d(2))
+        Booking.objects.create(room=self.busy, date_start=d(4), date_end=d(5))
+        Booking.objects.create(room=self.busy, date_start=d(9), date_end=d(12))
+        self.d = d
+
+    def get(self, **params):
+        params.setdefault("from", self.d(1).isoformat())
+        params.setdefault("to", self.d(14).isoformat())
+        return self.client.get("/rooms/free_slots", params)
+
+    def slots(self, **params):
+        return [
+            (slot["room_id"], slot["date_start"], slot["date_end"], slot["nights"])
+            for slot in self.get(**params).json()["slots"]
+        ]
+
+    def test_windows_between_bookings(self):
+        d = lambda n: self.d(n).isoformat()
+        with self.assertNumQueries(1):
+            slots = self.slots(nights=1)
+        self.assertEqual(slots, [
+            (self.free.id, d(1), d(14), 13),
+            (self.busy.id, d(2), d(4), 2),
+            (self.busy.id, d(5), d(9), 4),
+            (self.busy.id, d(12), d(14), 2),
+        ])
+
+    def test_min_nights_and_limit(self):
+        d = lambda n: self.d(n).isoformat()
+        self.assertEqual(self.slots(nights=3), [
+            (self.free.id, d(1), d(14), 13),
+            (self.busy.id, d(5), d(9), 4),
+        ])
+        self.assertEqual(self.slots(nights=3, limit=1), [(self.free.id, d(1), d(14), 13)])
+        self.assertEqual(self.slots(nights=5, **{"from": d(2)}), [(self.free.id, d(2), d(14), 12)])
+
+    def test_interval_index(self):
+        from bookings.intervals import IntervalIndex
+
+        expected = self.slots(nights=1)
+        index = IntervalIndex(ttl=60)
+        with patch("rooms.slots.interval_index", index):
+            self.assertEqual(self.slots(nights=1), expected)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.slots(nights=3, limit=1), expected[:1])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("bookings_booking", queries[0]["sql"])
+
+    def test_defaults_to_today(self):
+        response = self.client.get("/rooms/free_slots", {"nights": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["from"], date.today().isoformat())
+
+    def test_invalid_params(self):
+        self.assertEqual(self.get().status_code, 400)
+        self.assertEqual(self.get(nights=0).status_code, 400)
+        self.assertEqual(self.get(nights="x").status_code, 400)
+        self.assertEqual(self.get(nights=2, to=self.d(1).isoformat()).status_code, 400)
+        self.assertEqual(self.get(nights=2, to=self.d(400).isoformat()).status_code, 400)
+
+
+class RoomQuoteTests(TestCase):
+    def setUp(self):
+        from unittest.mock import patch
+        from rooms.rates import RateCalendars
+
+        self.calendars = RateCalendars(ttl=60, days=400, max_rooms=100)
+        self.calendars.connect()
+        self.addCleanup(self.calendars.disconnect)
+        patcher = patch("rooms.rates.rate_calendars", self.calendars)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.room = Room.objects.create(description="Room", price=100)
+        self.other = Room.objects.create(description="Other", price="80.50")
+        # понедельник через неделю-две
+        self.monday = date.today() + timedelta(days=7 - date.today().weekday() + 7)
+
+    def d(self, days):
+        return (self.monday + timedelta(days=days)).isoformat()
+
+    def quote(self, start, end, **params):
+        params.setdefault("room_id", self.room.id)
+        return self.client.get("/rooms/quote", {"date_start": self.d(start), "date_end": self.d(end), **params})
+
+    def add_rate(self, start, end, price, **kwargs):
+        from rooms.models import RoomRate
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return RoomRate.objects.create(
+                room=kwargs.pop("room", self.room),
+                date_start=self.monday + timedelta(days=start),
+                date_end=self.monday + timedelta(days=end),
+                price=price,
+                **kwargs
+            )
+
+    def add_discount(self, min_nights, percent, room=None):
+        from rooms.models import StayDiscount
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return StayDiscount.objects.create(room=room, min_nights=min_nights, percent=percent)
+
+    def test_base_price(self):
+        response = self.quote(0, 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "room_id": self.room.id,
+            "date_start": self.d(0),
+            "date_end": self.d(3),
+            "nights": 3,
+            "subtotal": "300.00",
+            "discount_percent": "0.00",
+            "discount": "0.00",
+            "total": "300.00",
+        })
+
+    def test_seasons_weekends_and_discounts(self):
+        from rooms.models import WEEKEND
+
+        # сезон на вторую неделю, выходные дороже сезона
+        self.add_rate(7, 14, 150)
+        self.add_rate(0, 28, 200, weekdays=WEEKEND, priority=1)
+        # неделя 1: 5 * 100 + 2 * 200, неделя 2: 5 * 150 + 2 * 200
+        self.assertEqual(self.quote(0, 14).json()["subtotal"], "2050.00")
+        # пятница - понедельник: 2 * 200 + 100 + 150
+        self.assertEqual(self.quote(4, 8).json()["subtotal"], "650.00")
+
+        self.add_discount(7, 5)
+        self.add_discount(14, "12.50", room=self.room)
+        self.add_discount(3, 50, room=self.other)
+        data = self.quote(0, 14).json()
+        self.assertEqual(
+            (data["discount_percent"], data["discount"], data["total"]),
+            ("12.50", "256.25", "1793.75")
+        )
+        data = self.quote(0, 7).json()
+        self.assertEqual((data["discount_percent"], data["total"]), ("5.00", "855.00"))
+        self.assertEqual(self.quote(0, 6).json()["discount"], "0.00")
+
+    def test_calendar_matches_direct_sum(self):
+        from rooms.models import WEEKEND
+        from rooms.rates import load_plans
+
+        self.add_rate(3, 40, 120)
+        self.add_rate(20, 30, 90, weekdays=0b0010101, priority=2)
+        self.add_rate(-10, 500, 300, weekdays=WEEKEND, priority=1)
+        calendar = self.calendars.get_many([self.room.id])[self.room.id]
+        direct = load_plans([self.room.id])[self.room.id]
+        self.assertIsNone(direct.prefix)
+        for start in range(-3, 420, 13):
+            for nights in (1, 2, 6, 30):
+                date_start = self.monday + timedelta(days=start)
+                date_end = date_start + timedelta(days=nights)
+                self.assertEqual(
+                    calendar.subtotal(date_start, date_end), direct.subtotal(date_start, date_end),
+                    (start, nights)
+                )
+
+    def test_batch(self):
+        response = self.quote(0, 2, room_id="", room_ids=f"{self.other.id},{self.room.id},999999")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["nights"], 2)
+        self.assertEqual(
+            [(quote["room_id"], quote["total"]) for quote in data["quotes"]],
+            [(self.other.id, "161.00"), (self.room.id, "200.00")]
+        )
+        self.assertEqual(data["not_found"], [999999])
+
+    def test_cached_plans_and_invalidation(self):
+        self.quote(0, 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.quote(0, 2).json()["total"], "200.00")
+
+        rate = self.add_rate(0, 1, 40)
+        self.assertEqual(self.quote(0, 2).json()["total"], "140.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            rate.delete()
+        self.assertEqual(self.quote(0, 2).json()["total"], "200.00")
+
+        self.room.price = 110
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.save()
+        self.assertEqual(self.quote(0, 2).json()["total"], "220.00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/rooms/delete", {"room_id": self.room.id})
+        self.assertEqual(self.quote(0, 2).status_code, 404)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.quote(0, 2, room_id=999999).status_code, 404)
+        self.assertEqual(self.quote(0, 2, room_id="").status_code, 400)
+        self.assertEqual(self.quote(2, 2).status_code, 400)
+        self.assertEqual(self.quote(0, 400).status_code, 400)
+        self.assertEqual(self.quote(0, 2, room_ids="1,x").status_code, 400)
+        self.assertEqual(self.quote(0, 2, room_ids=",".join(map(str, range(1001)))).status_code, 400)
+        self.assertEqual(self.client.get("/rooms/quote", {"room_id": self.room.id}).status_code, 400)
+
+
+class RoomSearchTests(TestCase):
+    def setUp(self):
+        self.suite = Room.objects.create(description="Люкс с видом на море", price=9000)
+        self.family = Room.objects.create(description="Семейный номер, вид на парк", price=5000)
+        self.cheap = Room.objects.create(description="Стандарт без окна", price=2000)
+
+    def search(self, **params):
+        response = self.client.get("/rooms/search", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [room["room_id"] for room in response.json()]
+
+    def test_uses_full_text_index(self):
+        from rooms.search import search_backend
+
+        self.assertIn(search_backend(connection), ("postgresql", "fts5"))
+        with CaptureQueriesContext(connection) as ctx:
+            self.search(q="море")
+        self.assertEqual(len(ctx), 1)
+        self.assertNotIn("LIKE", ctx.captured_queries[0]["sql"].upper())
+
+    def test_matches_all_words_by_prefix(self):
+        self.assertEqual(self.search(q="люкс"), [self.suite.id])
+        self.assertEqual(self.search(q="ЛЮКС МОР"), [self.suite.id])
+        self.assertEqual(sorted(self.search(q="вид")), [self.suite.id, self.family.id])
+        self.assertEqual(self.search(q="вид окна"), [])
+        # операторы языка запросов - просто текст
+        self.assertEqual(self.search(q='"люкс" OR NOT (парк*)'), [])
+        self.assertEqual(self.search(q="* & |"), [])
+
+    def test_index_follows_changes(self):
+        self.cheap.description = "Стандарт с видом на горы"
+        self.cheap.save()
+        chalet = Room.objects.create(description="Горный шале", price=7000)
+        self.suite.delete()
+        self.assertEqual(sorted(self.search(q="гор")), [self.cheap.id, chalet.id])
+        self.assertEqual(self.search(q="люкс"), [])
+
+    def test_filters(self):
+        from bookings.models import Booking
+
+        start = date.today() + timedelta(days=1)
+        Booking.objects.create(room=self.family, date_start=start, date_end=start + timedelta(days=2))
+        dates = {"date_start": start.isoformat(), "date_end": (start + timedelta(days=1)).isoformat()}
+        self.assertEqual(self.search(q="вид", **dates), [self.suite.id])
+        self.assertEqual(self.search(q="вид", price_max="6000"), [self.family.id])
+        self.assertEqual(self.search(q="вид", price_min="6000", limit=1), [self.suite.id])
+
+    def test_invalid_params(self):
+        for params in ({}, {"q": "  "}, {"q": "x" * 201}, {"q": "вид", "date_start": "2030-01-01"},
+                       {"q": "вид", "date_start": "2030-01-02", "date_end": "2030-01-01"},
+                       {"q": "вид", "price_min": "x"}, {"q": "вид", "limit": "0"}):
+            self.assertEqual(self.client.get("/rooms/search", params).status_code, 400, params)
+
+    def test_admin_search(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        response = self.client.get("/admin/rooms/room/", {"q": "море"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.suite])
+
+    async def test_async_view(self):
+        response = await async_views.room_search(AsyncRequestFactory().get("/rooms/search", {"q": "парк"}))
+        self.assertEqual([room["room_id"] for room in json.loads(response.content)], [self.family.id])
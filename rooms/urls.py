@@ -1,5 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# под ASGI подключаются асинхронные представления (см. hotel_booking/asgi.py)
+if settings.ASYNC_VIEWS:
+    views = async_views
 
 app_name = 'rooms'
 
@@ -7,4 +12,10 @@ urlpatterns = [
     path('rooms/create', views.create_room, name='create_room'),
     path('rooms/delete', views.delete_room, name='delete_room'),
     path('rooms/list', views.list_rooms, name='list_rooms'),
+    path('rooms/available', views.available_rooms, name='available_rooms'),
+    path('rooms/search', views.room_search, name='room_search'),
+    path('rooms/calendar', views.room_calendar, name='room_calendar'),
+    path('rooms/free_slots', views.room_free_slots, name='room_free_slots'),
+    path('rooms/quote', views.room_quote, name='room_quote'),
+    path('rooms/cache_stats', views.cache_stats, name='cache_stats'),
 ]
\ No newline at end of file
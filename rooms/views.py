@@ -1,50 +1,316 @@
-from django.http import JsonResponse
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, pre_delete
 from .models import Room
+from .cache import room_list_cache
+from .calendar import MAX_CALENDAR_DAYS, mask_to_bitmap, mask_to_runs, occupancy_calendar
+from .rates import MAX_QUOTE_NIGHTS, MAX_QUOTE_ROOMS, rate_plans
+from .rates import invalidate_on_commit as invalidate_rates_on_commit
+from .search import MAX_QUERY_LENGTH, search_rooms
+from .slots import MAX_SLOT_DAYS, free_slots
 from decimal import Decimal, InvalidOperation
+from datetime import date, datetime, timedelta
+from hotel_booking.idempotency import idempotent
+from hotel_booking.pagination import DEFAULT_PAGE_SIZE, list_response, parse_limit
+from hotel_booking.responses import FastJsonResponse
+from hotel_booking.versions import ROOMS, changed_on_commit, list_condition
+from bookings.intervals import interval_index
+from bookings.jobs import publish_on_commit
+
+# Параметр sort_by API -> поле модели
+SORT_FIELDS = {
+    'price_per_night': 'price',
+    'created_at': 'created_at',
+}
 
 
 def error_response(message, status=400):
-    return JsonResponse({"error": message}, status=status)
+    return FastJsonResponse({"error": message}, status=status)
 
 def success_response(data, status=200):
-    return JsonResponse(data, status=status)
+    return FastJsonResponse(data, status=status)
 
-@csrf_exempt
-@require_http_methods(["POST"])
+def parse_date(date_string):
+    try:
+        return datetime.strptime(date_string, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Дата '{date_string}' должна быть в формате YYYY-MM-DD")
 
-# rooms/views.py (заменить функцию room_create этим кодом)
+def parse_ordering(params):
+    """
+    Разбор sort_by/order, общий для списков номеров.
+    Возвращает аргументы для order_by или бросает ValueError.
+    """
+    sort_by = params.get('sort_by', 'created_at')
+    order = params.get('order', 'asc')
 
-def json_error(msg, code=400):
-    return JsonResponse({"error": msg}, status=code)
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"sort_by должно быть одним из: {list(SORT_FIELDS)}")
 
-@require_http_methods(["POST"])
+    if order not in ['asc', 'desc']:
+        raise ValueError("order должно быть 'asc' или 'desc'")
+
+    order_prefix = '' if order == 'asc' else '-'
+    return [f'{order_prefix}{SORT_FIELDS[sort_by]}', f'{order_prefix}id']
+
+def room_to_dict(room):
+    data = {
+        "room_id": room.id,
+        "description": room.description,
+        "price_per_night": room.price,
+        "created_at": room.created_at,
+    }
+    if hasattr(room, 'bookings_count'):
+        data["bookings_count"] = room.bookings_count
+    return data
+
+def parse_price(value):
+    try:
+        return Decimal(value)
+    except (InvalidOperation, ValueError):
+        raise ValueError("Неверный формат цены")
+
+def parse_new_room(data):
+    """Разбор полей нового номера, при ошибке бросает ValueError"""
+    description = data.get('description')
+    price_per_night = data.get('price_per_night')
+    
+    if not description:
+        raise ValueError("Поле 'description' обязательно")
+    
+    if not price_per_night:
+        raise ValueError("Поле 'price_per_night' обязательно")
+    
+    price = parse_price(price_per_night)
+    if price <= 0:
+        raise ValueError("Цена должна быть положительной")
+    return description, price
+
+def parse_room_id(data):
+    room_id = data.get('room_id')
+    
+    if not room_id:
+        raise ValueError("Поле 'room_id' обязательно")
+    
+    try:
+        return int(room_id)
+    except ValueError:
+        raise ValueError("Неверный формат room_id")
+
+def parse_available_params(params):
+    """
+    Разбор параметров /rooms/available, при ошибке бросает ValueError.
+    Возвращает (date_start, date_end, price_min, price_max, ordering, limit).
+    """
+    date_start = params.get('date_start')
+    date_end = params.get('date_end')
+    
+    if not date_start:
+        raise ValueError("Параметр 'date_start' обязателен")
+    if not date_end:
+        raise ValueError("Параметр 'date_end' обязателен")
+    
+    date_start = parse_date(date_start)
+    date_end = parse_date(date_end)
+    ordering = parse_ordering(params)
+    price_min = params.get('price_min')
+    price_max = params.get('price_max')
+    if price_min:
+        price_min = parse_price(price_min)
+    if price_max:
+        price_max = parse_price(price_max)
+    
+    if date_start >= date_end:
+        raise ValueError("Дата окончания должна быть позже даты начала")
+    
+    limit = parse_limit(params.get('limit', DEFAULT_PAGE_SIZE))
+    return date_start, date_end, price_min, price_max, ordering, limit
+
+def parse_free_slots_params(params):
+    """
+    Разбор параметров /rooms/free_slots, при ошибке бросает ValueError.
+    Возвращает (date_from, date_to, nights, limit).
+    """
+    nights = params.get('nights')
+    if not nights:
+        raise ValueError("Параметр 'nights' обязателен")
+    try:
+        nights = int(nights)
+    except ValueError:
+        raise ValueError("Неверный формат nights")
+    if nights <= 0:
+        raise ValueError("nights должно быть положительным")
+    
+    date_from = params.get('from')
+    date_from = parse_date(date_from) if date_from else date.today()
+    date_to = params.get('to')
+    date_to = parse_date(date_to) if date_to else date_from + timedelta(days=MAX_SLOT_DAYS)
+    
+    days = (date_to - date_from).days
+    if days <= 0:
+        raise ValueError("Дата окончания должна быть позже даты начала")
+    if days > MAX_SLOT_DAYS:
+        raise ValueError(f"Период не должен превышать {MAX_SLOT_DAYS} дней")
+    
+    limit = parse_limit(params.get('limit', DEFAULT_PAGE_SIZE))
+    return date_from, date_to, nights, limit
+
+def parse_quote_params(params):
+    """
+    Разбор параметров /rooms/quote, при ошибке бросает ValueError.
+    Возвращает (room_ids, date_start, date_end, batch).
+    """
+    room_ids = params.get('room_ids')
+    batch = room_ids is not None
+    if batch:
+        try:
+            room_ids = list(dict.fromkeys(int(room_id) for room_id in room_ids.split(',')))
+        except ValueError:
+            raise ValueError("room_ids - номера через запятую")
+        if len(room_ids) > MAX_QUOTE_ROOMS:
+            raise ValueError(f"Не больше {MAX_QUOTE_ROOMS} номеров в room_ids")
+    else:
+        room_ids = [parse_room_id(params)]
+    
+    date_start = params.get('date_start')
+    date_end = params.get('date_end')
+    if not date_start:
+        raise ValueError("Параметр 'date_start' обязателен")
+    if not date_end:
+        raise ValueError("Параметр 'date_end' обязателен")
+    date_start = parse_date(date_start)
+    date_end = parse_date(date_end)
+    
+    nights = (date_end - date_start).days
+    if nights <= 0:
+        raise ValueError("Дата окончания должна быть позже даты начала")
+    if nights > MAX_QUOTE_NIGHTS:
+        raise ValueError(f"Проживание не должно превышать {MAX_QUOTE_NIGHTS} ночей")
+    return room_ids, date_start, date_end, batch
+
+def parse_search_params(params):
+    """
+    Разбор параметров /rooms/search, при ошибке бросает ValueError.
+    Возвращает (q, date_start, date_end, price_min, price_max, limit),
+    даты - None, если не заданы.
+    """
+    q = params.get('q', '').strip()
+    if not q:
+        raise ValueError("Параметр 'q' обязателен")
+    if len(q) > MAX_QUERY_LENGTH:
+        raise ValueError(f"q не длиннее {MAX_QUERY_LENGTH} символов")
+    
+    date_start = params.get('date_start')
+    date_end = params.get('date_end')
+    if bool(date_start) != bool(date_end):
+        raise ValueError("Параметры 'date_start' и 'date_end' задаются вместе")
+    if date_start:
+        date_start = parse_date(date_start)
+        date_end = parse_date(date_end)
+        if date_start >= date_end:
+            raise ValueError("Дата окончания должна быть позже даты начала")
+    else:
+        date_start = date_end = None
+    
+    price_min = params.get('price_min')
+    price_max = params.get('price_max')
+    price_min = parse_price(price_min) if price_min else None
+    price_max = parse_price(price_max) if price_max else None
+    
+    limit = parse_limit(params.get('limit', DEFAULT_PAGE_SIZE))
+    return q, date_start, date_end, price_min, price_max, limit
+
+def search_queryset(q, date_start, date_end, price_min, price_max, limit):
+    rooms = Room.objects.all()
+    if date_start:
+        rooms = rooms.available(date_start, date_end)
+    if price_min:
+        rooms = rooms.filter(price__gte=price_min)
+    if price_max:
+        rooms = rooms.filter(price__lte=price_max)
+    return search_rooms(rooms, q)[:limit]
+
+def available_queryset(date_start, date_end, price_min, price_max, ordering, limit):
+    rooms = Room.objects.available(date_start, date_end)
+    if price_min:
+        rooms = rooms.filter(price__gte=price_min)
+    if price_max:
+        rooms = rooms.filter(price__lte=price_max)
+    return rooms.order_by(*ordering)[:limit]
+
+AVAILABLE_CHUNK_SIZE = 1000
+
+def indexed_available(date_start, date_end, price_min, price_max, ordering, limit):
+    """
+    То же, что available_queryset, по индексу занятости: номера подходящей
+    цены читаются из базы пачками в нужном порядке, занятость проверяется
+    в памяти, пока не наберётся limit свободных
+    """
+    rooms = Room.objects.all()
+    if price_min:
+        rooms = rooms.filter(price__gte=price_min)
+    if price_max:
+        rooms = rooms.filter(price__lte=price_max)
+    rooms = rooms.order_by(*ordering)
+    chunk_size = max(limit, AVAILABLE_CHUNK_SIZE)
+    found = []
+    offset = 0
+    while len(found) < limit:
+        chunk = list(rooms[offset:offset + chunk_size])
+        if not chunk:
+            break
+        free = interval_index.available([room.id for room in chunk], date_start, date_end)
+        found.extend(room for room in chunk if room.id in free)
+        if len(chunk) < chunk_size:
+            break
+        offset += chunk_size
+    return found[:limit]
+
+def cascades_in_db():
+    """
+    Удалять номер одним DELETE с каскадом в базе: на PostgreSQL внешние
+    ключи на rooms объявлены ON DELETE CASCADE (миграции bookings 0005 и
+    rooms 0004), и так можно, только если удаление номера и броней никто
+    не слушает (сигналы включённых индекса занятости и сводки аналитики).
+    Тарифы и скидки номера не проверяются: календарь цен удалённого
+    номера сбрасывается явно.
+    """
+    from bookings.models import Booking, RoomMonthStats
+
+    if connection.vendor != 'postgresql':
+        return False
+    return not any(
+        signal.has_listeners(model)
+        for signal in (pre_delete, post_delete)
+        for model in (Room, Booking, RoomMonthStats)
+    )
 
-# def create_room(request):
-#     # Поддерживаем form-data и JSON
-#     data = request.POST or (json.loads(request.body.decode()) if request.body else {})
-#     description = data.get("description")
-#     # Поддерживаем два варианта имени: price и price_per_night
-#     price = data.get("price")
-#     if price is None:
-#         price = data.get("price_per_night")
-
-#     if not description:
-#         return json_error("description is required")
-#     try:
-#         # конвертируем в Decimal/float; используем float здесь — модель хранит DecimalField
-#         price = float(price)
-#         if price <= 0:
-#             raise ValueError()
-#     except Exception:
-#         return json_error("price must be a positive number")
-
-#     room = Room.objects.create(description=description, price=price)
-#     return JsonResponse({"room_id": room.id}, status=201)
+def delete_room_with_bookings(room_id):
+    """
+    Удаляет номер с бронями, возвращает число удалённых броней
+    (Room.DoesNotExist, если номера нет)
 
+    Номер и число его броней читаются одним запросом; дальше либо один
+    DELETE с каскадом в базе, либо каскад Django (см. cascades_in_db).
+    """
+    with transaction.atomic():
+        room = Room.objects.with_bookings_count().get(id=room_id)
+        if cascades_in_db():
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM rooms WHERE id = %s', [room_id])
+        else:
+            room.delete()
+        room_list_cache.invalidate_on_commit()
+        changed_on_commit([room_id])
+        invalidate_rates_on_commit(room_id)
+        publish_on_commit([('room.deleted', {"room_id": room_id, "bookings_count": room.bookings_count})])
+    return room.bookings_count
 
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
 def create_room(request):
     """
     Создание нового номера отеля
@@ -54,31 +320,25 @@ def create_room(request):
     - description: текстовое описание номера
     - price_per_night: цена за ночь (число)
     
+    Заголовок Idempotency-Key: повтор с тем же ключом возвращает ответ
+    первого запроса (см. hotel_booking.idempotency).
+    
     Возвращает:
     {"room_id": 1} - при успехе
     {"error": "текст ошибки"} - при ошибке
     """
     try:
-        description = request.POST.get('description')
-        price_per_night = request.POST.get('price_per_night')
-        
-        if not description:
-            return error_response("Поле 'description' обязательно")
-        
-        if not price_per_night:
-            return error_response("Поле 'price_per_night' обязательно")
-        
         try:
-            price = Decimal(price_per_night)
-            if price <= 0:
-                return error_response("Цена должна быть положительной")
-        except (InvalidOperation, ValueError):
-            return error_response("Неверный формат цены")
+            description, price = parse_new_room(request.POST)
+        except ValueError as e:
+            return error_response(str(e))
         
         room = Room.objects.create(
             description=description,
-            price_per_night=price
+            price=price
         )
+        room_list_cache.invalidate_on_commit()
+        publish_on_commit([('room.created', {"room_id": room.id})])
         
         return success_response({
             "room_id": room.id
@@ -89,7 +349,6 @@ def create_room(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
-
 def delete_room(request):
     """
     Удаление номера отеля и всех его бронирований
@@ -103,25 +362,16 @@ def delete_room(request):
     {"error": "текст ошибки"} - при ошибке
     """
     try:
-        room_id = request.POST.get('room_id')
-        
-        if not room_id:
-            return error_response("Поле 'room_id' обязательно")
-        
         try:
-            room_id = int(room_id)
-        except ValueError:
-            return error_response("Неверный формат room_id")
+            room_id = parse_room_id(request.POST)
+        except ValueError as e:
+            return error_response(str(e))
         
         try:
-            room = Room.objects.get(id=room_id)
+            bookings_count = delete_room_with_bookings(room_id)
         except Room.DoesNotExist:
             return error_response("Номер не найден", status=404)
         
-        with transaction.atomic():
-            bookings_count = room.get_bookings_count()
-            room.delete()
-        
         return success_response({
             "message": f"Номер {room_id} и {bookings_count} бронирований удалены"
         })
@@ -130,6 +380,7 @@ def delete_room(request):
         return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
 
 @require_http_methods(["GET"])
+@list_condition(lambda request: ROOMS)
 def list_rooms(request):
     """
     Получение списка номеров с сортировкой
@@ -138,35 +389,290 @@ def list_rooms(request):
     Параметры:
     - sort_by: поле для сортировки (price_per_night или created_at)
     - order: порядок сортировки (asc или desc)
+    - limit, cursor: постраничная выдача (см. hotel_booking.pagination)
+    - stream: 1 - потоковая выдача всего списка
+    
+    Ответы кэшируются до первого изменения номеров или броней (см. rooms.cache).
+    ETag/Last-Modified: при неизменном списке If-None-Match или
+    If-Modified-Since дают 304 (см. hotel_booking.versions).
+    
+    Возвращает:
+    [{"room_id": 1, "description": "...", "price_per_night": "5000.00", "created_at": "...", "bookings_count": 0}]
+    или при limit/cursor: {"results": [...], "next_cursor": "..." | null}
+    """
+    try:
+        cache_key = room_list_cache.make_key(request.GET, request.list_version)
+        if cache_key:
+            content = room_list_cache.get(cache_key)
+            if content is not None:
+                return HttpResponse(content, content_type='application/json')
+        
+        try:
+            ordering = parse_ordering(request.GET)
+            response = list_response(
+                request.GET,
+                Room.objects.with_bookings_count(),
+                ordering,
+                room_to_dict
+            )
+        except ValueError as e:
+            return error_response(str(e))
+        
+        if cache_key and response.status_code == 200:
+            room_list_cache.set(cache_key, response.content)
+        return response
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+def available_rooms(request):
+    """
+    Поиск свободных номеров на период
+    
+    GET /rooms/available?date_start=YYYY-MM-DD&date_end=YYYY-MM-DD
+    Параметры:
+    - date_start, date_end: период проживания (дата выезда не включается)
+    - price_min, price_max: необязательные границы цены за ночь
+    - sort_by, order: как в /rooms/list
+    - limit: максимум номеров в ответе (по умолчанию 100, не больше 1000)
+    
+    Возвращает:
+    [{"room_id": 1, "description": "...", "price_per_night": "5000.00", "created_at": "..."}]
+    """
+    try:
+        try:
+            params = parse_available_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+        
+        if interval_index is not None:
+            rooms = indexed_available(*params)
+        else:
+            rooms = available_queryset(*params)
+        
+        return success_response([room_to_dict(room) for room in rooms])
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+def room_search(request):
+    """
+    Полнотекстовый поиск номеров по описанию
+    
+    GET /rooms/search?q=люкс с видом
+    Параметры:
+    - q: слова для поиска (не длиннее 200 символов)
+    - date_start, date_end: только свободные на этот период номера
+    - price_min, price_max: необязательные границы цены за ночь
+    - limit: максимум номеров в ответе (по умолчанию 100, не больше 1000)
+    
+    Поиск идёт по индексу, номера упорядочены по релевантности на
+    PostgreSQL и по id на SQLite (см. rooms.search).
     
     Возвращает:
     [{"room_id": 1, "description": "...", "price_per_night": "5000.00", "created_at": "..."}]
     """
     try:
-        sort_by = request.GET.get('sort_by', 'created_at')
-        order = request.GET.get('order', 'asc')
-        
-        valid_sort_fields = ['price_per_night', 'created_at']
-        if sort_by not in valid_sort_fields:
-            return error_response(f"sort_by должно быть одним из: {valid_sort_fields}")
-        
-        if order not in ['asc', 'desc']:
-            return error_response("order должно быть 'asc' или 'desc'")
-        
-        order_prefix = '' if order == 'asc' else '-'
-        rooms = Room.objects.all().order_by(f'{order_prefix}{sort_by}')
-        
-        rooms_data = []
-        for room in rooms:
-            rooms_data.append({
-                "room_id": room.id,
-                "description": room.description,
-                "price_per_night": str(room.price_per_night),
-                "created_at": room.created_at.isoformat(),
-                "bookings_count": room.get_bookings_count()
+        try:
+            params = parse_search_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+        
+        rooms = search_queryset(*params)
+        
+        return success_response([room_to_dict(room) for room in rooms])
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+def room_calendar(request):
+    """
+    Календарь занятости всех номеров
+    
+    GET /rooms/calendar?from=YYYY-MM-DD&to=YYYY-MM-DD
+    Параметры:
+    - from, to: период (дата to не включается, не больше 366 дней)
+    - format: ranges (по умолчанию) - занятые периоды номера,
+              bitmap - строка из 0/1 по дням периода
+    
+    Возвращает:
+    {"from": "...", "to": "...",
+     "rooms": [{"room_id": 1, "occupied": [["2023-12-01", "2023-12-05"]]}],
+     "occupancy": [{"date": "2023-12-01", "occupied_rooms": 1, "rate": 0.5}]}
+    """
+    try:
+        date_from = request.GET.get('from')
+        date_to = request.GET.get('to')
+        output_format = request.GET.get('format', 'ranges')
+        
+        if not date_from:
+            return error_response("Параметр 'from' обязателен")
+        if not date_to:
+            return error_response("Параметр 'to' обязателен")
+        if output_format not in ['ranges', 'bitmap']:
+            return error_response("format должно быть 'ranges' или 'bitmap'")
+        
+        try:
+            date_from = parse_date(date_from)
+            date_to = parse_date(date_to)
+        except ValueError as e:
+            return error_response(str(e))
+        
+        days = (date_to - date_from).days
+        if days <= 0:
+            return error_response("Дата окончания должна быть позже даты начала")
+        if days > MAX_CALENDAR_DAYS:
+            return error_response(f"Период не должен превышать {MAX_CALENDAR_DAYS} дней")
+        
+        masks, counts = occupancy_calendar(date_from, date_to)
+        labels = [(date_from + timedelta(days=day)).isoformat() for day in range(days + 1)]
+        
+        if output_format == 'bitmap':
+            rooms_data = [
+                {"room_id": room_id, "occupied": mask_to_bitmap(mask, days)}
+                for room_id, mask in masks.items()
+            ]
+        else:
+            rooms_data = [
+                {"room_id": room_id, "occupied": [
+                    [labels[first], labels[last]] for first, last in mask_to_runs(mask)
+                ]}
+                for room_id, mask in masks.items()
+            ]
+        
+        total = len(masks)
+        return success_response({
+            "from": date_from.isoformat(),
+            "to": date_to.isoformat(),
+            "rooms": rooms_data,
+            "occupancy": [
+                {
+                    "date": labels[day],
+                    "occupied_rooms": count,
+                    "rate": round(count / total, 4) if total else 0
+                }
+                for day, count in enumerate(counts)
+            ]
+        })
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+def room_free_slots(request):
+    """
+    Ближайшие свободные окна на несколько ночей по всем номерам
+    
+    GET /rooms/free_slots?nights=3
+    Параметры:
+    - nights: минимальное число ночей подряд
+    - from, to: где искать (по умолчанию с сегодняшнего дня на 366 дней,
+                дата to не включается, не больше 366 дней)
+    - limit: максимум окон в ответе (по умолчанию 100, не больше 1000)
+    
+    Окно - свободный промежуток номера между бронями: заехать можно
+    в date_start, выехать не позже date_end. Окна упорядочены по
+    date_start, затем по room_id.
+    
+    Возвращает:
+    {"nights": 3, "from": "...", "to": "...",
+     "slots": [{"room_id": 1, "date_start": "2023-12-05", "date_end": "2023-12-09",
+                "nights": 4, "price_per_night": "5000.00"}]}
+    """
+    try:
+        try:
+            date_from, date_to, nights, limit = parse_free_slots_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+        
+        slots = free_slots(date_from, date_to, nights, limit)
+        
+        return success_response({
+            "nights": nights,
+            "from": date_from,
+            "to": date_to,
+            "slots": [
+                {
+                    "room_id": room_id,
+                    "date_start": date_start,
+                    "date_end": date_end,
+                    "nights": (date_end - date_start).days,
+                    "price_per_night": price
+                }
+                for date_start, room_id, date_end, price in slots
+            ]
+        })
+    
+    except Exception as e:
+        return error_response(f"Внутренняя ошибка: {str(e)}", status=500)
+
+@require_http_methods(["GET"])
+def cache_stats(request):
+    """
+    Счётчики кэша списка номеров текущего процесса
+    
+    GET /rooms/cache_stats
+    
+    Возвращает:
+    {"backend": "LocalBackend", "hits": 10, "misses": 2, "invalidations": 1}
+    """
+    return success_response(room_list_cache.stats())
+
+@require_http_methods(["GET"])
+def room_quote(request):
+    """
+    Стоимость проживания с учётом тарифов и скидок за длительность
+    
+    GET /rooms/quote?room_id=1&date_start=YYYY-MM-DD&date_end=YYYY-MM-DD
+    GET /rooms/quote?room_ids=1,2,3&date_start=...&date_end=...
+    Параметры:
+    - room_id: номер, или room_ids: до 1000 номеров через запятую
+    - date_start, date_end: заезд и выезд (не больше 366 ночей)
+    
+    Цена ночи - тариф номера на эту дату или price_per_night номера,
+    скидка - наибольшая из подходящих по числу ночей (см. rooms.rates).
+    
+    Возвращает:
+    {"room_id": 1, "date_start": "...", "date_end": "...", "nights": 3,
+     "subtotal": "15000.00", "discount_percent": "0.00", "discount": "0.00",
+     "total": "15000.00"}
+    с room_ids - {"date_start": "...", "date_end": "...", "nights": 3,
+     "quotes": [{"room_id": 1, "subtotal": ..., ...}], "not_found": [5]}
+    """
+    try:
+        try:
+            room_ids, date_start, date_end, batch = parse_quote_params(request.GET)
+        except ValueError as e:
+            return error_response(str(e))
+        
+        plans = rate_plans(room_ids)
+        nights = (date_end - date_start).days
+        
+        if not batch:
+            plan = plans.get(room_ids[0])
+            if plan is None:
+                return error_response("Номер не найден", status=404)
+            return success_response({
+                "room_id": room_ids[0],
+                "date_start": date_start,
+                "date_end": date_end,
+                "nights": nights,
+                **plan.quote(date_start, date_end)
             })
         
-        return success_response(rooms_data)
+        return success_response({
+            "date_start": date_start,
+            "date_end": date_end,
+            "nights": nights,
+            "quotes": [
+                {"room_id": room_id, **plans[room_id].quote(date_start, date_end)}
+                for room_id in room_ids if room_id in plans
+            ],
+            "not_found": [room_id for room_id in room_ids if room_id not in plans],
+        })
     
     except Exception as e:
         return error_response(f"Внутренняя ошибка: {str(e)}", status=500)